@@ -1,8 +1,17 @@
 import os
-import json
+import re
 import time
 from groq import Groq
 from dotenv import load_dotenv
+from local_scorer import score_company, DEFAULT_CONFIDENCE_THRESHOLD
+import headline_cache
+import checkpoints
+import snapshots
+import news_store
+import text_workers
+from prompts import build_company_prompt, render_messages, format_headlines, COMPANY_PROMPT_VERSION, HEADLINE_PROMPT_VERSION
+from llm_router import build_router
+from rate_limit import groq_limiter
 
 # Load environment variables
 load_dotenv()
@@ -14,109 +23,43 @@ if not GROQ_API_KEY:
 
 client = Groq(api_key=GROQ_API_KEY)
 
-def analyze_sentiment_for_company(company_data, ticker):
+# Model used for sentiment scoring (part of the stage cache key, so changing it re-runs scoring only)
+SENTIMENT_MODEL = os.getenv("SENTIMENT_MODEL", "llama-3.1-8b-instant")
+
+# Sentiment requests go through the router (timeouts, latency tracking, hedging across endpoints)
+router = build_router()
+
+def analyze_sentiment_for_company(company_data, ticker, collapse_duplicates=True, prompt=None):
     """
     Analyze sentiment for a single company based on ALL article headlines and sources
+    
+    Near-duplicate (syndicated) headlines are collapsed into one line with a copy
+    count unless collapse_duplicates is False. prompt is a build_company_prompt
+    result rendered ahead of time (see text_workers.py).
     """
     # Get article details
     articles = company_data.get('article_details', [])
     
     if not articles:
-        return {"ticker": ticker, "sentiment_score": 0, "articles_analyzed": 0}
+        return {"ticker": ticker, "sentiment_score": 0, "articles_analyzed": 0, "scored_by": "none"}
     
     print(f"  📰 Analyzing ALL {len(articles)} article headlines for {ticker}...")
     
-    # Prepare ALL articles for analysis (not just first 15)
-    article_info = []
-    for i, article in enumerate(articles, 1):  # Process ALL articles
-        headline = article.get('headline', 'No headline')
-        source = article.get('source', 'Unknown source')
-        datetime_val = article.get('datetime', 0)
-        
-        if headline and headline != 'No headline':
-            article_info.append({
-                'number': i,
-                'headline': headline,
-                'source': source,
-                'datetime': datetime_val
-            })
-    
-    if not article_info:
-        print(f"  ❌ No valid articles found for {ticker}")
-        return {"ticker": ticker, "sentiment_score": 0, "articles_analyzed": 0}
+    # Build the prompt from the active template (ALL articles, near-duplicates grouped)
+    if prompt is None:
+        prompt = build_company_prompt(company_data, ticker, collapse_duplicates=collapse_duplicates)
     
-    # Create comprehensive headline analysis prompt
-    articles_list = []
-    for article in article_info:
-        articles_list.append(f"{article['number']}. {article['headline']} ({article['source']})")
+    if prompt["messages"] is None:
+        print(f"  ❌ No valid articles found for {ticker}")
+        return {"ticker": ticker, "sentiment_score": 0, "articles_analyzed": 0, "scored_by": "none"}
     
-    articles_text = "\n".join(articles_list)
+    if prompt["distinct_stories"] < prompt["total_articles"]:
+        print(f"  🧹 Collapsed {prompt['total_articles']} headlines into {prompt['distinct_stories']} distinct stories")
     
-    user_content = f"""
-COMPANY FOR SENTIMENT ANALYSIS: {ticker}
-EARNINGS DATE: {company_data.get('earnings_date', 'Unknown')}
-EARNINGS DAY: {company_data.get('earnings_day', 'Unknown')}
-TOTAL ARTICLES: {len(article_info)}
-
-Analyze the sentiment toward {ticker} based on these {len(article_info)} news article headlines:
-
-{articles_text}
-
-ANALYSIS INSTRUCTIONS:
-1. Analyze EVERY headline for sentiment indicators toward {ticker}
-2. Look for positive keywords: growth, beat, strong, up, gains, bullish, upgrade, buy, outperform, exceeds, positive, rally, surge
-3. Look for negative keywords: loss, miss, down, decline, falls, bearish, downgrade, sell, underperform, concerns, drops, plunge
-4. Consider source credibility (Yahoo, MarketWatch, SeekingAlpha more reliable than unknown sources)
-5. Weight earnings-related news more heavily than general market news
-6. Consider overall volume of coverage (more articles = more market attention)
-
-SENTIMENT SCORING GUIDELINES:
-- Very Positive (+8 to +10): Multiple positive headlines, earnings beats, strong growth mentions, bullish analyst coverage
-- Positive (+4 to +7): More positive than negative headlines, meeting expectations, favorable trends
-- Slightly Positive (+1 to +3): Mild positive indicators, stable outlook, neutral-to-good news
-- Neutral (0): Mixed headlines that balance out, or purely factual reporting
-- Slightly Negative (-1 to -3): Mild concerns, cautious outlook, some disappointing news
-- Negative (-4 to -7): More negative headlines, missing expectations, bearish sentiment
-- Very Negative (-8 to -10): Predominantly negative headlines, major problems, very poor outlook
-
-IMPORTANT: Analyze based ONLY on the headlines provided. Return only a single integer from -10 to +10.
-"""
-
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are an expert financial news sentiment analyst. Analyze sentiment based on news headlines and sources.
-
-You must provide nuanced, realistic sentiment scores that reflect the actual tone of the headlines. Do NOT default to neutral (0) unless the headlines truly have no sentiment bias.
-
-ANALYSIS PROCESS:
-1. Read every headline carefully for sentiment indicators
-2. Identify positive/negative keywords and phrases
-3. Consider the overall tone and implications
-4. Weight based on source credibility and article volume
-5. Provide a meaningful sentiment score that reflects reality
-
-SCORING REQUIREMENTS:
-- Use the full range from -10 to +10
-- Be specific and granular in your scoring
-- Positive headlines should get positive scores
-- Negative headlines should get negative scores
-- Only use 0 for truly neutral or perfectly balanced coverage
-
-Return only a single integer from -10 to +10."""
-                },
-                {
-                    "role": "user",
-                    "content": user_content
-                }
-            ],
-            model="llama-3.1-8b-instant"
-        )
-        
         # Get the response text directly (no web browsing tools)
-        response_text = chat_completion.choices[0].message.content
+        groq_limiter.acquire()
+        response_text = router.chat(prompt["messages"], model=SENTIMENT_MODEL)
         if response_text:
             response_text = response_text.strip()
         else:
@@ -141,13 +84,15 @@ Return only a single integer from -10 to +10."""
             else:
                 score = 0
             
-        print(f"  🤖 LLM analyzed {len(article_info)} headlines and returned score: {score:+d}")
+        print(f"  🤖 LLM analyzed {prompt['total_articles']} headlines and returned score: {score:+d}")
             
         return {
             "ticker": ticker, 
             "sentiment_score": score,
-            "articles_analyzed": len(article_info),
-            "total_articles_available": len(articles)
+            "articles_analyzed": prompt["total_articles"],
+            "total_articles_available": len(articles),
+            "scored_by": "llm",
+            "prompt_version": prompt["version"]
         }
         
     except Exception as e:
@@ -156,64 +101,293 @@ Return only a single integer from -10 to +10."""
             "ticker": ticker, 
             "sentiment_score": 0,
             "articles_analyzed": 0,
-            "total_articles_available": len(articles)
+            "total_articles_available": len(articles),
+            "scored_by": "llm",
+            "error": True
         }
 
-def process_earnings_sentiment(json_filename="earnings_news_urls.json"):
+# Maximum number of new headlines sent in one headline-scoring request
+HEADLINE_BATCH_SIZE = 50
+
+def score_new_headlines(articles, ticker):
     """
-    Process all companies from the earnings JSON file and calculate sentiment scores
+    Score individual headlines with the LLM (one request per HEADLINE_BATCH_SIZE headlines)
+    
+    Args:
+        articles (list): Article dicts that have no cached score yet
+        ticker (str): Ticker the headlines belong to
+    
+    Returns:
+        list: (article, score) pairs for every headline the LLM returned a score for
     """
-    print(f"Loading earnings data from {json_filename}...")
+    scored = []
     
-    # Load the earnings data
-    with open(json_filename, 'r', encoding='utf-8') as f:
-        earnings_data = json.load(f)
+    for start in range(0, len(articles), HEADLINE_BATCH_SIZE):
+        batch = articles[start:start + HEADLINE_BATCH_SIZE]
+        groq_limiter.acquire()
+        response_text = router.chat(
+            render_messages("headline", HEADLINE_PROMPT_VERSION, ticker=ticker, headlines_text=format_headlines(batch)),
+            model=SENTIMENT_MODEL
+        )
+        for match in re.finditer(r'^\s*(\d+)\s*[:.)-]\s*([+-]?\d+)', response_text, re.MULTILINE):
+            index = int(match.group(1))
+            if 1 <= index <= len(batch):
+                # Headlines the model skipped stay uncached and are retried on the next refresh
+                scored.append((batch[index - 1], max(-10, min(10, int(match.group(2))))))
+    
+    return scored
+
+def analyze_sentiment_incremental(company_data, ticker, cache):
+    """
+    Score a company from per-headline scores, only sending headlines not yet in the cache to the LLM
     
-    companies = earnings_data.get('companies', {})
-    print(f"Found {len(companies)} companies to analyze")
+    Args:
+        company_data (dict): Company record from earnings_news_urls.json
+        ticker (str): Ticker symbol
+        cache (dict): Headline cache from headline_cache.load_cache (updated in place)
+    """
+    articles = [article for article in company_data.get('article_details', [])
+                if article.get('headline') and article.get('headline') != 'No headline']
     
-    sentiment_results = []
+    if not articles:
+        return {"ticker": ticker, "sentiment_score": 0, "articles_analyzed": 0, "scored_by": "none"}
+    
+    cached, uncached = headline_cache.split_cached(articles, cache, ticker, HEADLINE_PROMPT_VERSION)
+    print(f"  🗂️  {len(cached)} headlines cached, {len(uncached)} new headlines to score for {ticker}")
+    
+    new_scores = []
+    error = False
+    if uncached:
+        try:
+            new_scores = score_new_headlines(uncached, ticker)
+            headline_cache.store_scores(cache, new_scores, ticker, HEADLINE_PROMPT_VERSION)
+        except Exception as e:
+            print(f"  ❌ Error scoring new headlines for {ticker}: {str(e)}")
+            error = True
     
-    # Filter companies with articles for deep analysis
-    companies_with_articles = {ticker: data for ticker, data in companies.items() 
-                             if data.get('article_count', 0) > 0}
+    scored = cached + new_scores
+    score = headline_cache.aggregate_scores(scored)
+    
+    result = {
+        "ticker": ticker,
+        "sentiment_score": score,
+        "articles_analyzed": len(scored),
+        "total_articles_available": len(company_data.get('article_details', [])),
+        "new_headlines_scored": len(new_scores),
+        "scored_by": "headlines"
+    }
+    if error:
+        result["error"] = True
+    return result
+
+def score_company_record(ticker, company_data, cascade=False, confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD, cache=None, prepared=None):
+    """
+    Score one company record with the configured strategy
     
-    print(f"Companies with articles for deep analysis: {len(companies_with_articles)}")
-    print(f"Companies without articles (will receive neutral score): {len(companies) - len(companies_with_articles)}")
+    Args:
+        ticker (str): Ticker symbol
+        company_data (dict): Company record from earnings_news_urls.json
+        cascade (bool): Try the local scorer first and only escalate unclear companies
+        confidence_threshold (float): Minimum local confidence needed to skip the LLM
+        cache (dict): Headline cache for incremental scoring (None = score all headlines in one request)
+        prepared (dict): Local score and prompt computed ahead in the text worker pool (see text_workers.py)
     
-    for i, (ticker, company_data) in enumerate(companies.items(), 1):
-        print(f"\n🔍 Analyzing {ticker}... ({i}/{len(companies)})")
+    Returns:
+        dict: Sentiment result including which path ("none", "local", "llm", "headlines") produced it
+    """
+    if company_data.get('article_count', 0) == 0:
+        print(f"  📄 No articles found for {ticker}, assigning neutral score")
+        result = {
+            "ticker": ticker, 
+            "sentiment_score": 0,
+            "articles_analyzed": 0,
+            "total_articles_available": 0,
+            "scored_by": "none"
+        }
+    else:
+        prepared = prepared or {}
+        local = (prepared.get("local") or score_company(company_data)) if cascade else None
         
-        if company_data.get('article_count', 0) == 0:
-            print(f"  📄 No articles found for {ticker}, assigning neutral score")
+        if local and local['confidence'] >= confidence_threshold and not local['mixed']:
+            # Clear-cut coverage - the local scorer is trusted, no LLM round-trip
+            print(f"  ⚡ Local score {local['sentiment_score']:+d} (confidence {local['confidence']:.2f}), skipping LLM")
             result = {
-                "ticker": ticker, 
-                "sentiment_score": 0,
-                "articles_analyzed": 0,
-                "total_articles_available": 0
+                "ticker": ticker,
+                "sentiment_score": local['sentiment_score'],
+                "articles_analyzed": local['positive_headlines'] + local['negative_headlines'] + local['neutral_headlines'],
+                "total_articles_available": len(company_data.get('article_details', [])),
+                "scored_by": "local",
+                "local_confidence": local['confidence']
             }
         else:
-            # Perform deep analysis with full article content
-            result = analyze_sentiment_for_company(company_data, ticker)
+            if local:
+                reason = "mixed headlines" if local['mixed'] else f"confidence {local['confidence']:.2f}"
+                print(f"  ↗️  Escalating {ticker} to LLM ({reason})")
+            
+            if cache is not None:
+                result = analyze_sentiment_incremental(company_data, ticker, cache)
+                if result.get("new_headlines_scored"):
+                    headline_cache.save_cache_if_due(cache)
+            else:
+                # Perform deep analysis with full article content
+                result = analyze_sentiment_for_company(company_data, ticker, prompt=prepared.get("prompt"))
+            if local:
+                result["local_confidence"] = local['confidence']
+    
+    return result
+
+def used_llm(result):
+    """
+    Whether producing a result cost an LLM request
+    """
+    return result.get("scored_by") == "llm" or bool(result.get("new_headlines_scored"))
+
+def failed(result):
+    """
+    Whether scoring failed (LLM error), so the result must not be checkpointed or cached as final
+    """
+    return bool(result.get("error"))
+
+def save_headline_cache(cache, results):
+    """
+    Write the headline cache at the end of a run, if any result scored new headlines
+    
+    During the run score_company_record only saves it every headline_cache.SAVE_INTERVAL_SECONDS.
+    """
+    if cache is not None and any(result.get("new_headlines_scored") for result in results):
+        headline_cache.save_cache(cache)
+
+def write_sentiment_results(sentiment_results, analysis_date, earnings_week, output_filename="earnings_sentiment_analysis.json", **extra):
+    """
+    Write sentiment results atomically (temp file + rename) so readers never see a partial file
+    """
+    output_data = {
+        "analysis_date": analysis_date,
+        "earnings_week": earnings_week,
+        "total_companies_analyzed": len(sentiment_results),
+        "sentiment_results": sentiment_results
+    }
+    output_data.update(extra)
+    
+    return snapshots.atomic_write_json(output_filename, output_data)
+
+def process_earnings_sentiment(json_filename="earnings_news_urls.json", cascade=False, confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD, incremental=False, resume=False, deadline=None):
+    """
+    Process all companies from the earnings JSON file and calculate sentiment scores
+    
+    Args:
+        json_filename (str): News file produced by main.save_urls_to_json
+        cascade (bool): Score locally first and only send low-confidence or mixed companies to the LLM
+        confidence_threshold (float): Minimum local confidence needed to skip the LLM in cascade mode
+        incremental (bool): Aggregate cached per-headline scores and only score newly arrived headlines
+        resume (bool): Reuse results checkpointed by an interrupted run over the same input snapshot
+        deadline (Deadline): Optional run deadline; when the sentiment budget is used up the remaining
+            tickers keep their result from the current snapshot (marked stale) and the output is partial
+    """
+    print(f"Loading earnings data from {json_filename}...")
+    
+    # Companies are streamed from the file (either schema version), one at a time
+    earnings_data = news_store.read_header(json_filename)
+    if earnings_data is None:
+        raise FileNotFoundError(json_filename)
+    
+    # First pass identifies the input snapshot; only the ticker list is kept
+    tickers = []
+    companies_with_articles = 0
+    
+    def identity_items():
+        nonlocal companies_with_articles
+        for ticker, company_data in news_store.iter_companies(json_filename):
+            tickers.append(ticker)
+            if company_data.get('article_count', 0) > 0:
+                companies_with_articles += 1
+            yield ticker, company_data
+    
+    # Every scored ticker is checkpointed so an interrupted run can pick up where it stopped
+    run_id = checkpoints.snapshot_id_from_items(identity_items(), {
+        "cascade": cascade,
+        "confidence_threshold": confidence_threshold,
+        "incremental": incremental,
+        "prompt_version": HEADLINE_PROMPT_VERSION if incremental else COMPANY_PROMPT_VERSION
+    })
+    print(f"Found {len(tickers)} companies to analyze")
+    
+    sentiment_results = []
+    llm_calls = 0
+    cache = headline_cache.load_cache() if incremental else None
+    
+    completed = checkpoints.load_completed(run_id) if resume else {}
+    checkpoint_file = checkpoints.start_log(run_id, resume=resume)
+    if completed:
+        print(f"♻️  Resuming run {run_id}: {len(completed)} companies already completed")
+    
+    print(f"Companies with articles for deep analysis: {companies_with_articles}")
+    print(f"Companies without articles (will receive neutral score): {len(tickers) - companies_with_articles}")
+    
+    # Results from the current snapshot, for tickers this run does not get to (or whose news is stale)
+    stale_news = set(earnings_data.get('stale_tickers', []))
+    previous_results = {}
+    if deadline is not None or stale_news:
+        previous = snapshots.read_json(snapshots.resolve_current()["sentiment_path"]) or {}
+        previous_results = {result['ticker']: result for result in previous.get('sentiment_results', [])}
+    stale_tickers = []
+    failed_tickers = []
+    
+    # Lexicon scores and prompts are prepared a block ahead in the text worker pool
+    skip = set(completed) | {ticker for ticker in stale_news if ticker in previous_results}
+    companies = text_workers.prepared_stream(news_store.iter_companies(json_filename, records=True),
+                                             local=cascade, prompt=not incremental, skip=skip)
+    for i, (ticker, company_data, prepared) in enumerate(companies, 1):
+        if deadline is not None and deadline.expired("sentiment"):
+            for remaining in tickers[i - 1:]:
+                if remaining in completed:
+                    sentiment_results.append(completed[remaining])
+                else:
+                    stale_tickers.append(remaining)
+            break
+        
+        if ticker in stale_news and ticker in previous_results:
+            # News was not refreshed, so the previous score still applies
+            stale_tickers.append(ticker)
+            continue
+        
+        print(f"\n🔍 Analyzing {ticker}... ({i}/{len(tickers)})")
+        
+        if ticker in completed:
+            result = completed[ticker]
+            sentiment_results.append(result)
+            print(f"  ♻️  Checkpointed score for {ticker}: {result['sentiment_score']:+d}")
+            continue
+        
+        result = score_company_record(ticker, company_data, cascade, confidence_threshold, cache, prepared=prepared)
+        if used_llm(result):
+            llm_calls += 1
         
         sentiment_results.append(result)
+        if failed(result):
+            # Not checkpointed, so a resumed run scores this ticker again
+            failed_tickers.append(ticker)
+        else:
+            checkpoints.append_result(run_id, result)
         
         print(f"  📊 Final score for {ticker}: {result['sentiment_score']:+d}")
         
-        # Add delay to be respectful to APIs
-        time.sleep(2)
+        # Add delay to be respectful to APIs (only needed after an LLM call)
+        if used_llm(result):
+            time.sleep(2)
     
-    # Save results to file
-    output_filename = "earnings_sentiment_analysis.json"
-    output_data = {
-        "analysis_date": earnings_data.get('generated_at'),
-        "earnings_week": earnings_data.get('earnings_week'),
-        "total_companies_analyzed": len(sentiment_results),
-        "sentiment_results": sentiment_results
-    }
+    save_headline_cache(cache, sentiment_results)
+    
+    partial = {}
+    if stale_tickers or stale_news:
+        for ticker in stale_tickers:
+            if ticker in previous_results:
+                sentiment_results.append(dict(previous_results[ticker], stale=True))
+        partial = {"partial": True, "stale_tickers": sorted(set(stale_tickers) | stale_news)}
+        print(f"⏰ {len(stale_tickers)} companies kept their previous score (partial run)")
     
-    with open(output_filename, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    # Save results to file
+    output_filename = write_sentiment_results(sentiment_results, earnings_data.get('generated_at'), earnings_data.get('earnings_week'), **partial)
     
     # Calculate analysis statistics
     total_articles_fetched = sum(r.get('articles_fetched', 0) for r in sentiment_results)
@@ -223,6 +397,15 @@ def process_earnings_sentiment(json_filename="earnings_news_urls.json"):
     print(f"\n✅ Deep sentiment analysis complete!")
     print(f"📊 Companies analyzed: {len(sentiment_results)}")
     print(f"📰 Companies with article content: {companies_with_data}")
+    router_stats = router.stats()
+    for endpoint_stats in router_stats["endpoints"]:
+        print(f"⏱️  {endpoint_stats['endpoint']}: {endpoint_stats['requests_ok']} ok, {endpoint_stats['requests_failed']} failed, p50 {endpoint_stats['p50_seconds']}s, p95 {endpoint_stats['p95_seconds']}s")
+    if router_stats["hedged_requests"]:
+        print(f"🔀 Hedged requests: {router_stats['hedged_requests']}")
+    print(f"🤖 LLM calls made: {llm_calls}" + (f" (cascade mode, {len(sentiment_results) - llm_calls} scored locally)" if cascade else ""))
+    print(f"📝 Checkpoint log: {checkpoint_file}")
+    if failed_tickers:
+        print(f"❌ {len(failed_tickers)} companies failed to score and were not checkpointed (rerun with resume to retry): {', '.join(failed_tickers)}")
     print(f"📥 Total articles fetched: {total_articles_fetched}")
     print(f"� Total articles analyzed: {total_articles_analyzed}")
     print(f"�💾 Results saved to '{output_filename}'")
@@ -287,6 +470,7 @@ if __name__ == "__main__":
     try:
         print("Starting earnings sentiment analysis...")
         results = process_earnings_sentiment()
+        snapshots.publish(snapshots.NEWS_FILENAME, snapshots.SENTIMENT_FILENAME, note="sentiment only")
         print("\n🎉 Analysis completed successfully!")
         
     except FileNotFoundError:
@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, request, send_from_directory, send_file
+from flask import Flask, Response, jsonify, request, send_from_directory, send_file
 from flask_cors import CORS
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
@@ -15,6 +15,12 @@ load_dotenv()
 
 # Import our existing modules
 import main
+import snapshots
+import news_store
+import sentiment_history
+import sentiment_analytics
+import compaction
+import store_lock
 from LLM import process_earnings_sentiment
 
 # Configure logging
@@ -35,29 +41,37 @@ CORS(app, origins=['http://localhost:3000', 'http://localhost:5173', 'http://127
 last_update_time = None
 update_in_progress = False
 last_error = None
+last_update_partial = False
+
+# Time budget for one update run, kept under the hourly interval so runs never overlap
+UPDATE_DEADLINE_SECONDS = int(os.getenv("UPDATE_DEADLINE_SECONDS", str(50 * 60)))
 
 def run_earnings_update():
     """
     Run the complete earnings data update and sentiment analysis
     """
-    global last_update_time, update_in_progress, last_error
+    global last_update_time, update_in_progress, last_error, last_update_partial
     
     if update_in_progress:
         logger.warning("Update already in progress, skipping this cycle")
         return
     
+    data_lock = None
     try:
         update_in_progress = True
+        data_lock = store_lock.acquire()  # waits for a running compaction
         logger.info("Starting scheduled earnings data update...")
         
         # Run the complete analysis pipeline
         # Skip sentiment analysis if we've hit rate limits recently
+        started = datetime.now()
         try:
-            result = main.run_full_analysis(weeks_ahead=1, run_sentiment=True)
+            result = main.run_full_analysis(weeks_ahead=1, run_sentiment=True, deadline_seconds=UPDATE_DEADLINE_SECONDS)
         except Exception as e:
             if "rate_limit_exceeded" in str(e) or "429" in str(e):
                 logger.warning("Rate limit exceeded, running without sentiment analysis")
-                result = main.run_full_analysis(weeks_ahead=1, run_sentiment=False)
+                remaining = max(60, UPDATE_DEADLINE_SECONDS - (datetime.now() - started).total_seconds())
+                result = main.run_full_analysis(weeks_ahead=1, run_sentiment=False, deadline_seconds=remaining)
             else:
                 raise
         
@@ -65,7 +79,11 @@ def run_earnings_update():
             # Update success tracking
             last_update_time = datetime.now()
             last_error = None
-            logger.info(f"Earnings update completed successfully at {last_update_time}")
+            last_update_partial = result.get("partial", False)
+            if last_update_partial:
+                logger.warning(f"Earnings update hit its {UPDATE_DEADLINE_SECONDS}s deadline - published partial results at {last_update_time}")
+            else:
+                logger.info(f"Earnings update completed successfully at {last_update_time}")
         else:
             # Handle failure
             error_msg = result.get("error", "Unknown error during analysis")
@@ -78,8 +96,27 @@ def run_earnings_update():
         logger.error(traceback.format_exc())
         last_error = error_msg
     finally:
+        store_lock.release(data_lock)
         update_in_progress = False
 
+def run_compaction_job():
+    """
+    Apply data retention and merge small history segments (skipped while an update is running)
+    """
+    # Held shared by every update, here or in a CLI run, so compaction never races one
+    data_lock = store_lock.acquire(exclusive=True, blocking=False)
+    if update_in_progress or data_lock is None:
+        store_lock.release(data_lock)
+        logger.info("Update in progress, compaction skipped this cycle")
+        return
+    try:
+        summary = compaction.run_compaction()
+        logger.info(f"Compaction finished: {summary}")
+    except Exception as e:
+        logger.error(f"Error during compaction: {e}")
+    finally:
+        store_lock.release(data_lock)
+
 # Initialize scheduler
 scheduler = BackgroundScheduler(daemon=True)
 scheduler.add_job(
@@ -89,6 +126,13 @@ scheduler.add_job(
     name='Update earnings data every hour',
     replace_existing=True
 )
+scheduler.add_job(
+    func=run_compaction_job,
+    trigger=IntervalTrigger(hours=24),
+    id='compaction_job',
+    name='Apply data retention and compact history daily',
+    replace_existing=True
+)
 
 @app.route('/')
 def serve_react():
@@ -125,7 +169,9 @@ def api_home():
             "/api/status": "GET - Check update status",
             "/api/earnings": "GET - Get current earnings data", 
             "/api/sentiment": "GET - Get sentiment analysis results",
-            "/api/companies": "GET - Get companies with sentiment scores",
+            "/api/companies": "GET - Get companies with sentiment scores and trends (?sort=movers for the biggest moves)",
+            "/api/history": "GET - Every ticker's latest score as of ?at= (ISO time, default now)",
+            "/api/history/<ticker>": "GET - One ticker's scores over the last ?days= days (default 90)",
             "/api/logs": "GET - Recent log entries",
             "/api/update": "POST - Manually trigger data update"
         },
@@ -141,6 +187,7 @@ def get_status():
     return jsonify({
         "last_update": last_update_time.isoformat() if last_update_time else None,
         "update_in_progress": update_in_progress,
+        "last_update_partial": last_update_partial,
         "last_error": last_error,
         "scheduler_running": scheduler.running,
         "next_update": "Every hour" if scheduler.running else "Scheduler not running"
@@ -152,10 +199,10 @@ def get_earnings():
     Get current earnings data
     """
     try:
-        if os.path.exists("earnings_news_urls.json"):
-            with open("earnings_news_urls.json", 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return jsonify(data)
+        snapshot = snapshots.resolve_current()
+        if os.path.exists(snapshot["news_path"]):
+            # Streamed one company at a time instead of building the whole document
+            return Response(news_store.stream_news_json(snapshot["news_path"]), mimetype='application/json')
         else:
             return jsonify({"error": "No earnings data available"}), 404
     except Exception as e:
@@ -168,8 +215,9 @@ def get_sentiment():
     Get current sentiment analysis results
     """
     try:
-        if os.path.exists("earnings_sentiment_analysis.json"):
-            with open("earnings_sentiment_analysis.json", 'r', encoding='utf-8') as f:
+        snapshot = snapshots.resolve_current()
+        if os.path.exists(snapshot["sentiment_path"]):
+            with open(snapshot["sentiment_path"], 'r', encoding='utf-8') as f:
                 data = json.load(f)
             return jsonify(data)
         else:
@@ -207,13 +255,15 @@ def health_check():
     """
     Health check endpoint
     """
+    snapshot = snapshots.resolve_current()
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
+        "generation": snapshot["generation"],
         "services": {
             "scheduler": scheduler.running,
-            "earnings_data": os.path.exists("earnings_news_urls.json"),
-            "sentiment_data": os.path.exists("earnings_sentiment_analysis.json")
+            "earnings_data": os.path.exists(snapshot["news_path"]),
+            "sentiment_data": os.path.exists(snapshot["sentiment_path"])
         }
     })
 
@@ -245,23 +295,30 @@ def get_companies():
     try:
         companies_data = []
         
+        # Read both files from the same snapshot generation
+        snapshot = snapshots.resolve_current()
+        
         # Load earnings data
-        earnings_data = {}
-        if os.path.exists("earnings_news_urls.json"):
-            with open("earnings_news_urls.json", 'r', encoding='utf-8') as f:
-                earnings_data = json.load(f)
+        earnings_data = news_store.read_header(snapshot["news_path"]) or {}
         
         # Load sentiment data
         sentiment_data = {}
-        if os.path.exists("earnings_sentiment_analysis.json"):
-            with open("earnings_sentiment_analysis.json", 'r', encoding='utf-8') as f:
+        if os.path.exists(snapshot["sentiment_path"]):
+            with open(snapshot["sentiment_path"], 'r', encoding='utf-8') as f:
                 sentiment_json = json.load(f)
                 # Convert to dict for easier lookup
                 for result in sentiment_json.get("sentiment_results", []):
                     sentiment_data[result["ticker"]] = result
         
+        # Trend metrics from the sentiment history, computed once per snapshot generation
+        try:
+            trends = sentiment_analytics.trends_for_generation(snapshot["generation"])
+        except Exception as e:
+            logger.warning(f"Could not compute sentiment trends: {e}")
+            trends = {}
+        
         # Combine data
-        for ticker, company_info in earnings_data.get("companies", {}).items():
+        for ticker, company_info in news_store.iter_companies(snapshot["news_path"], articles=False):
             sentiment_info = sentiment_data.get(ticker, {})
             
             companies_data.append({
@@ -270,21 +327,68 @@ def get_companies():
                 "earnings_day": company_info.get("earnings_day"),
                 "article_count": company_info.get("article_count", 0),
                 "sentiment_score": sentiment_info.get("sentiment_score", 0),
-                "articles_analyzed": sentiment_info.get("articles_analyzed", 0)
+                "articles_analyzed": sentiment_info.get("articles_analyzed", 0),
+                "trend": trends.get(ticker)
             })
         
-        # Sort by sentiment score (highest first)
-        companies_data.sort(key=lambda x: x["sentiment_score"], reverse=True)
+        if request.args.get("sort") == "movers":
+            # Biggest sentiment moves first (?sort=movers), companies without history last
+            companies_data.sort(key=lambda x: (x["trend"] or {}).get("mover_rank") or float('inf'))
+        else:
+            # Sort by sentiment score (highest first)
+            companies_data.sort(key=lambda x: x["sentiment_score"], reverse=True)
         
         return jsonify({
             "companies": companies_data,
             "total_companies": len(companies_data),
-            "earnings_week": earnings_data.get("earnings_week", "Unknown")
+            "earnings_week": earnings_data.get("earnings_week", "Unknown"),
+            "generation": snapshot["generation"]
         })
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/history/<ticker>')
+def get_ticker_history(ticker):
+    """
+    One ticker's sentiment history over the last ?days= days (default 90)
+    """
+    try:
+        days = int(request.args.get('days', 90))
+        entries = sentiment_history.ticker_history(ticker, days=days)
+        return jsonify({
+            "ticker": ticker.upper(),
+            "days": days,
+            "entries": entries,
+            "total_entries": len(entries)
+        })
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    except Exception as e:
+        logger.error(f"Error reading sentiment history for {ticker}: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/history')
+def get_history_at():
+    """
+    Every ticker's latest sentiment as of ?at= (ISO time or unix seconds, default now)
+    """
+    try:
+        at = request.args.get('at') or datetime.now().timestamp()
+        lookback_days = int(request.args.get('lookback_days', sentiment_history.DEFAULT_LOOKBACK_DAYS))
+        latest = sentiment_history.scores_at(at, lookback_days=lookback_days)
+        return jsonify({
+            "at": datetime.fromtimestamp(sentiment_history.to_timestamp(at)).isoformat(),
+            "lookback_days": lookback_days,
+            "companies": sorted(latest.values(), key=lambda entry: entry["sentiment_score"], reverse=True),
+            "total_companies": len(latest)
+        })
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    except Exception as e:
+        logger.error(f"Error reading sentiment history: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/data/company-names.json')
 def serve_company_names():
     """
@@ -321,8 +425,9 @@ def load_existing_data():
     """
     try:
         # Check if we have existing data files
-        if os.path.exists('earnings_news_urls.json'):
-            logger.info("Found existing earnings_news_urls.json - using cached data")
+        snapshot = snapshots.resolve_current()
+        if os.path.exists(snapshot["news_path"]):
+            logger.info(f"Found existing earnings data (snapshot generation {snapshot['generation']}) - using cached data")
             return True
         else:
             logger.warning("No existing data found. Run 'python main.py' to generate initial data.")
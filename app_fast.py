@@ -8,7 +8,7 @@ import logging
 import os
 import sys
 from datetime import datetime
-from flask import Flask, jsonify, render_template_string, send_from_directory
+from flask import Flask, Response, jsonify, render_template_string, send_from_directory
 from flask_cors import CORS
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
@@ -21,6 +21,12 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import our analysis modules
 import main
+import snapshots
+import news_store
+import sentiment_analytics
+import compaction
+import store_lock
+import news_index
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -46,7 +52,7 @@ def quick_earnings_setup():
         # Check if we have existing earnings data
         earnings_file = 'earnings_news_urls.json'
         
-        if os.path.exists(earnings_file):
+        if os.path.exists(snapshots.resolve_current()["news_path"]):
             logger.info("Found existing earnings data, using cached data")
             data_ready = True
             last_update_time = datetime.now()
@@ -56,9 +62,9 @@ def quick_earnings_setup():
         logger.info("No existing data found, creating basic earnings structure...")
         
         # Get just the earnings data without news (fast)
-        earnings_df, earnings_by_day, summary_stats = main.get_earnings_data(weeks_ahead=1)
+        earnings_rows, earnings_by_day, summary_stats = main.get_earnings_data(weeks_ahead=1)
         
-        if earnings_df is not None:
+        if earnings_rows is not None:
             # Create basic structure with all companies but no articles yet
             companies = {}
             for date_str, day_data in earnings_by_day.items():
@@ -81,8 +87,8 @@ def quick_earnings_setup():
                 "companies": companies
             }
             
-            with open(earnings_file, 'w', encoding='utf-8') as f:
-                json.dump(earnings_data, f, indent=2, ensure_ascii=False)
+            news_store.save_news_file(earnings_data, earnings_file)
+            snapshots.publish(earnings_file, note="basic earnings structure")
             
             logger.info(f"Created basic earnings structure with {len(companies)} companies")
             data_ready = True
@@ -92,6 +98,24 @@ def quick_earnings_setup():
         logger.error(f"Error in quick setup: {e}")
         data_ready = False
 
+def run_compaction_job():
+    """
+    Apply data retention and merge small history segments (skipped while an update is running)
+    """
+    # Held shared by every update, here or in a CLI run, so compaction never races one
+    data_lock = store_lock.acquire(exclusive=True, blocking=False)
+    if update_in_progress or data_lock is None:
+        store_lock.release(data_lock)
+        logger.info("Update in progress, compaction skipped this cycle")
+        return
+    try:
+        summary = compaction.run_compaction()
+        logger.info(f"Compaction finished: {summary}")
+    except Exception as e:
+        logger.error(f"Error during compaction: {e}")
+    finally:
+        store_lock.release(data_lock)
+
 def background_news_fetch():
     """Fetch news articles in background thread"""
     global update_in_progress, last_update_time, last_error
@@ -99,8 +123,10 @@ def background_news_fetch():
     if update_in_progress:
         return
     
+    data_lock = None
     try:
         update_in_progress = True
+        data_lock = store_lock.acquire()  # waits for a running compaction
         logger.info("Background: Starting news article fetch...")
         
         # Run full analysis with news fetching
@@ -120,6 +146,7 @@ def background_news_fetch():
         logger.error(error_msg)
         last_error = error_msg
     finally:
+        store_lock.release(data_lock)
         update_in_progress = False
 
 # API Routes
@@ -138,11 +165,11 @@ def api_status():
 def api_earnings():
     """Get earnings data"""
     try:
-        earnings_file = 'earnings_news_urls.json'
+        snapshot = snapshots.resolve_current()
+        earnings_file = snapshot["news_path"]
         if os.path.exists(earnings_file):
-            with open(earnings_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return jsonify(data)
+            # Streamed one company at a time instead of building the whole document
+            return Response(news_store.stream_news_json(earnings_file), mimetype='application/json')
         else:
             return jsonify({"error": "No earnings data available"}), 404
     except Exception as e:
@@ -153,32 +180,31 @@ def api_earnings():
 def api_sentiment():
     """Get sentiment analysis data"""
     try:
-        sentiment_file = 'earnings_sentiment_analysis.json'
+        snapshot = snapshots.resolve_current()
+        sentiment_file = snapshot["sentiment_path"]
         if os.path.exists(sentiment_file):
             with open(sentiment_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
             return jsonify(data)
         else:
             # Return neutral sentiment for all companies if no sentiment data
-            earnings_file = 'earnings_news_urls.json'
+            earnings_file = snapshot["news_path"]
             if os.path.exists(earnings_file):
-                with open(earnings_file, 'r', encoding='utf-8') as f:
-                    earnings_data = json.load(f)
+                earnings_data = news_store.read_header(earnings_file)
                 
-                companies = earnings_data.get('companies', {})
                 sentiment_results = []
-                for ticker in companies.keys():
+                for ticker, company_info in news_store.iter_companies(earnings_file, articles=False):
                     sentiment_results.append({
                         "ticker": ticker,
                         "sentiment_score": 0,
                         "articles_analyzed": 0,
-                        "total_articles_available": companies[ticker].get('article_count', 0)
+                        "total_articles_available": company_info.get('article_count', 0)
                     })
                 
                 neutral_data = {
                     "analysis_timestamp": datetime.now().isoformat(),
                     "earnings_week": earnings_data.get('earnings_week', ''),
-                    "total_companies_analyzed": len(companies),
+                    "total_companies_analyzed": len(sentiment_results),
                     "sentiment_results": sentiment_results
                 }
                 return jsonify(neutral_data)
@@ -192,23 +218,20 @@ def api_sentiment():
 def api_company_search(ticker):
     """Search for a specific company by ticker"""
     try:
-        earnings_file = 'earnings_news_urls.json'
-        sentiment_file = 'earnings_sentiment_analysis.json'
+        snapshot = snapshots.resolve_current()
+        earnings_file = snapshot["news_path"]
+        sentiment_file = snapshot["sentiment_path"]
         
         if not os.path.exists(earnings_file):
             return jsonify({"error": "No earnings data available"}), 404
             
-        with open(earnings_file, 'r', encoding='utf-8') as f:
-            earnings_data = json.load(f)
-        
-        companies = earnings_data.get('companies', {})
+        earnings_data = news_store.read_header(earnings_file)
         ticker_upper = ticker.upper()
         
-        if ticker_upper not in companies:
+        company_info = news_index.lookup_company(earnings_file, ticker_upper)
+        if company_info is None:
             return jsonify({"error": f"Company {ticker_upper} not found in this week's earnings schedule"}), 404
         
-        company_info = companies[ticker_upper]
-        
         # Load sentiment data if available
         sentiment_score = 0
         articles_analyzed = 0
@@ -250,16 +273,14 @@ def api_company_search(ticker):
 def api_companies_list():
     """Get list of all companies with their data"""
     try:
-        earnings_file = 'earnings_news_urls.json'
-        sentiment_file = 'earnings_sentiment_analysis.json'
+        snapshot = snapshots.resolve_current()
+        earnings_file = snapshot["news_path"]
+        sentiment_file = snapshot["sentiment_path"]
         
         if not os.path.exists(earnings_file):
             return jsonify({"error": "No earnings data available"}), 404
             
-        with open(earnings_file, 'r', encoding='utf-8') as f:
-            earnings_data = json.load(f)
-        
-        companies = earnings_data.get('companies', {})
+        earnings_data = news_store.read_header(earnings_file)
         
         # Load sentiment data if available
         sentiment_map = {}
@@ -279,8 +300,15 @@ def api_companies_list():
             except Exception as e:
                 logger.warning(f"Could not load sentiment data: {e}")
         
+        # Trend metrics from the sentiment history, computed once per snapshot generation
+        try:
+            trends = sentiment_analytics.trends_for_generation(snapshot["generation"])
+        except Exception as e:
+            logger.warning(f"Could not compute sentiment trends: {e}")
+            trends = {}
+        
         companies_list = []
-        for ticker, company_info in companies.items():
+        for ticker, company_info in news_store.iter_companies(earnings_file, articles=False):
             sentiment_info = sentiment_map.get(ticker, {'sentiment_score': 0, 'articles_analyzed': 0})
             
             company_data = {
@@ -289,7 +317,8 @@ def api_companies_list():
                 "earnings_day": company_info.get('earnings_day'),
                 "article_count": company_info.get('article_count', 0),
                 "sentiment_score": sentiment_info['sentiment_score'],
-                "articles_analyzed": sentiment_info['articles_analyzed']
+                "articles_analyzed": sentiment_info['articles_analyzed'],
+                "trend": trends.get(ticker)
             }
             companies_list.append(company_data)
         
@@ -471,6 +500,13 @@ if __name__ == '__main__':
         name='Update news articles every 2 hours',
         replace_existing=True
     )
+    scheduler.add_job(
+        func=run_compaction_job,
+        trigger=IntervalTrigger(hours=24),
+        id='compaction_job',
+        name='Apply data retention and compact history daily',
+        replace_existing=True
+    )
     scheduler.start()
     logger.info("Background scheduler started - will update news every 2 hours")
     
@@ -9,7 +9,7 @@ import logging
 import os
 import sys
 from datetime import datetime
-from flask import Flask, jsonify, render_template_string, send_from_directory, request
+from flask import Flask, Response, jsonify, render_template_string, send_from_directory, request
 from flask_cors import CORS
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
@@ -21,6 +21,11 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import our analysis modules
 import main
+import snapshots
+import news_store
+import sentiment_analytics
+import news_index
+import store_lock
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -43,8 +48,10 @@ def run_earnings_update():
         logger.warning("Update already in progress, skipping this cycle")
         return
     
+    data_lock = None
     try:
         update_in_progress = True
+        data_lock = store_lock.acquire()  # waits for a running compaction
         logger.info("Starting scheduled earnings data update...")
         
         # Run FULL analysis including news fetching, but skip sentiment analysis to avoid rate limits
@@ -67,6 +74,7 @@ def run_earnings_update():
         logger.error(error_msg)
         last_error = error_msg
     finally:
+        store_lock.release(data_lock)
         update_in_progress = False
 
 # API Routes
@@ -85,11 +93,11 @@ def api_earnings():
     """Get earnings data"""
     try:
         # Load earnings data from JSON file
-        earnings_file = 'earnings_news_urls.json'
+        snapshot = snapshots.resolve_current()
+        earnings_file = snapshot["news_path"]
         if os.path.exists(earnings_file):
-            with open(earnings_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return jsonify(data)
+            # Streamed one company at a time instead of building the whole document
+            return Response(news_store.stream_news_json(earnings_file), mimetype='application/json')
         else:
             return jsonify({"error": "No earnings data available"}), 404
     except Exception as e:
@@ -101,33 +109,32 @@ def api_sentiment():
     """Get sentiment analysis data"""
     try:
         # Load sentiment data from JSON file
-        sentiment_file = 'earnings_sentiment_analysis.json'
+        snapshot = snapshots.resolve_current()
+        sentiment_file = snapshot["sentiment_path"]
         if os.path.exists(sentiment_file):
             with open(sentiment_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
             return jsonify(data)
         else:
             # Return neutral sentiment for all companies if no sentiment data
-            earnings_file = 'earnings_news_urls.json'
+            earnings_file = snapshot["news_path"]
             if os.path.exists(earnings_file):
-                with open(earnings_file, 'r', encoding='utf-8') as f:
-                    earnings_data = json.load(f)
+                earnings_data = news_store.read_header(earnings_file)
                 
                 # Create neutral sentiment for all companies
-                companies = earnings_data.get('companies', {})
                 sentiment_results = []
-                for ticker in companies.keys():
+                for ticker, company_info in news_store.iter_companies(earnings_file, articles=False):
                     sentiment_results.append({
                         "ticker": ticker,
                         "sentiment_score": 0,
                         "articles_analyzed": 0,
-                        "total_articles_available": companies[ticker].get('article_count', 0)
+                        "total_articles_available": company_info.get('article_count', 0)
                     })
                 
                 neutral_data = {
                     "analysis_timestamp": datetime.now().isoformat(),
                     "earnings_week": earnings_data.get('earnings_week', ''),
-                    "total_companies_analyzed": len(companies),
+                    "total_companies_analyzed": len(sentiment_results),
                     "sentiment_results": sentiment_results
                 }
                 return jsonify(neutral_data)
@@ -161,6 +168,7 @@ def api_company_search(ticker):
         
         if fetch_fresh and not update_in_progress:
             logger.info(f"🎯 Fetching fresh data for {ticker_upper}")
+            data_lock = store_lock.acquire()
             try:
                 # Run analysis for specific ticker
                 result = main.run_full_analysis(weeks_ahead=1, run_sentiment=False, specific_ticker=ticker_upper)
@@ -168,26 +176,25 @@ def api_company_search(ticker):
                     logger.error(f"Failed to fetch data for {ticker_upper}: {result.get('error')}")
             except Exception as e:
                 logger.error(f"Error fetching fresh data for {ticker_upper}: {e}")
+            finally:
+                store_lock.release(data_lock)
         
         # Load earnings data from JSON file
-        earnings_file = 'earnings_news_urls.json'
-        sentiment_file = 'earnings_sentiment_analysis.json'
+        snapshot = snapshots.resolve_current()
+        earnings_file = snapshot["news_path"]
+        sentiment_file = snapshot["sentiment_path"]
         
         if not os.path.exists(earnings_file):
             return jsonify({"error": "No earnings data available"}), 404
             
         # Load earnings data
-        with open(earnings_file, 'r', encoding='utf-8') as f:
-            earnings_data = json.load(f)
-        
-        companies = earnings_data.get('companies', {})
+        earnings_data = news_store.read_header(earnings_file)
         
         # Find the company
-        if ticker_upper not in companies:
+        company_info = news_index.lookup_company(earnings_file, ticker_upper)
+        if company_info is None:
             return jsonify({"error": f"Company {ticker_upper} not found in this week's earnings schedule"}), 404
         
-        company_info = companies[ticker_upper]
-        
         # Load sentiment data if available
         sentiment_score = 0
         articles_analyzed = 0
@@ -231,17 +238,15 @@ def api_companies_list():
     """Get list of all companies with their data"""
     try:
         # Load earnings data from JSON file
-        earnings_file = 'earnings_news_urls.json'
-        sentiment_file = 'earnings_sentiment_analysis.json'
+        snapshot = snapshots.resolve_current()
+        earnings_file = snapshot["news_path"]
+        sentiment_file = snapshot["sentiment_path"]
         
         if not os.path.exists(earnings_file):
             return jsonify({"error": "No earnings data available"}), 404
             
         # Load earnings data
-        with open(earnings_file, 'r', encoding='utf-8') as f:
-            earnings_data = json.load(f)
-        
-        companies = earnings_data.get('companies', {})
+        earnings_data = news_store.read_header(earnings_file)
         
         # Load sentiment data if available
         sentiment_map = {}
@@ -261,9 +266,16 @@ def api_companies_list():
             except Exception as e:
                 logger.warning(f"Could not load sentiment data: {e}")
         
+        # Trend metrics from the sentiment history, computed once per snapshot generation
+        try:
+            trends = sentiment_analytics.trends_for_generation(snapshot["generation"])
+        except Exception as e:
+            logger.warning(f"Could not compute sentiment trends: {e}")
+            trends = {}
+        
         # Combine earnings and sentiment data
         companies_list = []
-        for ticker, company_info in companies.items():
+        for ticker, company_info in news_store.iter_companies(earnings_file, articles=False):
             sentiment_info = sentiment_map.get(ticker, {'sentiment_score': 0, 'articles_analyzed': 0})
             
             company_data = {
@@ -272,7 +284,8 @@ def api_companies_list():
                 "earnings_day": company_info.get('earnings_day'),
                 "article_count": company_info.get('article_count', 0),
                 "sentiment_score": sentiment_info['sentiment_score'],
-                "articles_analyzed": sentiment_info['articles_analyzed']
+                "articles_analyzed": sentiment_info['articles_analyzed'],
+                "trend": trends.get(ticker)
             }
             companies_list.append(company_data)
         
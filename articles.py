@@ -0,0 +1,158 @@
+"""
+Helpers for individual news articles as returned by Finnhub
+"""
+
+import sys
+import hashlib
+from collections.abc import Mapping, Sequence
+from urllib.parse import urlparse, parse_qs
+
+FINNHUB_NEWS_URL = "https://finnhub.io/api/news?id="
+
+
+def article_id(article):
+    """
+    Stable identifier for an article
+
+    Finnhub news URLs look like https://finnhub.io/api/news?id=<64 hex>, so the id
+    query parameter is used when present. Otherwise the URL (or, failing that,
+    headline/source/datetime) is hashed.
+
+    Returns:
+        str: Hex article id
+    """
+    if isinstance(article, ArticleRecord) and article._id is not None:
+        return article._id.hex()
+
+    url = article.get('url') or ''
+    if url:
+        article_ids = parse_qs(urlparse(url).query).get('id')
+        if article_ids and article_ids[0]:
+            return article_ids[0].lower()
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    fallback = f"{article.get('headline', '')}|{article.get('source', '')}|{article.get('datetime', 0)}"
+    return hashlib.sha256(fallback.encode('utf-8')).hexdigest()
+
+
+def _finnhub_id_bytes(url):
+    """
+    Raw id bytes when url is exactly FINNHUB_NEWS_URL + <64 lowercase hex>, else None
+    """
+    if not url.startswith(FINNHUB_NEWS_URL) or len(url) != len(FINNHUB_NEWS_URL) + 64:
+        return None
+    identifier = url[len(FINNHUB_NEWS_URL):]
+    try:
+        raw = bytes.fromhex(identifier)
+    except ValueError:
+        return None
+    return raw if raw.hex() == identifier else None
+
+
+class ArticleRecord:
+    """
+    Compact in-memory article: __slots__, an interned source name, and a Finnhub URL
+    kept as its 32-byte id and only built when asked for
+
+    Reads like the article dicts it replaces (article['url'], article.get('source'),
+    dict(article)); json_default turns it back into a plain dict for JSON.
+    """
+
+    __slots__ = ('_id', '_url', 'headline', 'source', 'datetime')
+
+    FIELDS = ('url', 'headline', 'source', 'datetime')
+
+    def __init__(self, url, headline, source, datetime):
+        self._id = _finnhub_id_bytes(url) if url else None
+        self._url = None if self._id is not None else url
+        self.headline = headline
+        self.source = sys.intern(source) if isinstance(source, str) else source
+        self.datetime = datetime
+
+    @classmethod
+    def from_dict(cls, article):
+        if isinstance(article, ArticleRecord):
+            return article
+        return cls(article.get('url'), article.get('headline'), article.get('source'), article.get('datetime'))
+
+    @property
+    def url(self):
+        if self._id is not None:
+            return FINNHUB_NEWS_URL + self._id.hex()
+        return self._url
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def keys(self):
+        return self.FIELDS
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.FIELDS]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (ArticleRecord, Mapping)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ArticleRecord({self.to_dict()!r})"
+
+
+class ArticleUrls(Sequence):
+    """
+    Read-only list of the URLs of some articles, built one at a time on access
+    """
+
+    __slots__ = ('_articles',)
+
+    def __init__(self, articles):
+        self._articles = articles
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [article['url'] for article in self._articles[index]]
+        return self._articles[index]['url']
+
+    def __len__(self):
+        return len(self._articles)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, ArticleUrls)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def json_default(value):
+    """
+    `default=` hook for json.dump(s): article records become dicts and URL views lists
+    """
+    if isinstance(value, ArticleRecord):
+        return value.to_dict()
+    if isinstance(value, ArticleUrls):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Parallel historical backfill across past earnings weeks
+
+For every week (Monday) in a date range this fetches that week's earnings
+calendar, each company's news for the days_back window ending the day before
+the week starts (what a live run on the preceding Sunday would have seen) and
+the sentiment scores. Weeks run in parallel; all Finnhub calls share
+rate_limit.finnhub_limiter and all LLM calls rate_limit.groq_limiter.
+
+Each finished week is written to history/backfill/<week start>.json and skipped
+on later runs. Its scores are also appended to the sentiment history
+(sentiment_history.py), recorded at the week start, so backfilled quarters can
+be queried and feed the trends; --record-history appends weeks that are already
+done without rebuilding them. Inside a week every company is checkpointed, so an interrupted
+week resumes where it stopped. A week with companies whose scoring failed is not
+written: its successful companies stay checkpointed and the next run retries the
+failed ones.
+
+Usage:
+    python backfill.py --from 2025-01-06 --to 2025-06-30 [--workers 4] [--no-sentiment] [--cascade] [--force]
+    python backfill.py --from 2025-01-06 --to 2025-06-30 --record-history
+"""
+
+import os
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import checkpoints
+import snapshots
+import store_lock
+import sentiment_history
+from rate_limit import finnhub_limiter
+
+BACKFILL_DIR = os.path.join("history", "backfill")
+
+
+def week_starts(start_date, end_date):
+    """
+    Mondays of every week that overlaps the range
+
+    Args:
+        start_date (str): First day, YYYY-MM-DD
+        end_date (str): Last day, YYYY-MM-DD
+
+    Returns:
+        list: Monday dates as YYYY-MM-DD strings
+    """
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    monday = start - timedelta(days=start.weekday())
+    weeks = []
+    while monday <= end:
+        weeks.append(monday.strftime('%Y-%m-%d'))
+        monday += timedelta(days=7)
+    return weeks
+
+
+def week_path(week_start, output_dir=BACKFILL_DIR):
+    return os.path.join(output_dir, f"{week_start}.json")
+
+
+def record_week(week_start, output_dir=BACKFILL_DIR, history_dir=sentiment_history.HISTORY_DIR):
+    """
+    Append a finished week's scores to the sentiment history, recorded at the week start
+
+    The segment has a fixed name per week, so recording a week again (e.g. after
+    --force) replaces its entries. Once compaction has merged that segment the new
+    one sits beside the merged copy; queries keep the most recently written entry.
+
+    Returns:
+        str: Segment path, or None when the week has no scores
+    """
+    week = snapshots.read_json(week_path(week_start, output_dir))
+    if not week or not week.get("sentiment_results"):
+        return None
+    companies = week.get("companies", {})
+    article_counts = {ticker: {"article_count": company.get("article_count", 0), "earnings_date": company.get("earnings_date")}
+                      for ticker, company in companies.items()}
+    return sentiment_history.append_run(week["sentiment_results"], article_counts, earnings_week=week.get("earnings_week"),
+                                        recorded_at=datetime.strptime(week_start, '%Y-%m-%d').timestamp(),
+                                        history_dir=history_dir, tag=f"backfill-{week_start}")
+
+
+def backfill_week(week_start, days_back=30, run_sentiment=True, cascade=False, output_dir=BACKFILL_DIR, force=False):
+    """
+    Build the news and sentiment record for one past earnings week
+
+    Args:
+        week_start (str): Monday of the week, YYYY-MM-DD
+        days_back (int): News window in days, ending the day before week_start
+        run_sentiment (bool): Whether to score the companies
+        cascade (bool): Score locally first and only call the LLM when unclear
+        output_dir (str): Where finished weeks are written
+        force (bool): Rebuild the week even if it is already done
+
+    Returns:
+        dict: week, status ("done", "skipped", "empty" or "failed"), companies, error
+    """
+    import main
+
+    path = week_path(week_start, output_dir)
+    if os.path.exists(path) and not force:
+        return {"week": week_start, "status": "skipped", "companies": None, "error": None}
+
+    try:
+        earnings_rows, earnings_by_day, summary_stats = main.get_earnings_data(week_start=week_start)
+        if earnings_rows is None:
+            if earnings_by_day == {}:
+                return {"week": week_start, "status": "empty", "companies": 0, "error": None}
+            return {"week": week_start, "status": "failed", "companies": None, "error": summary_stats.get('error', 'Unknown error')}
+
+        week_range = main.format_earnings_summary(earnings_rows, earnings_by_day, summary_stats)['week_range']
+        window_end = datetime.strptime(week_start, '%Y-%m-%d') - timedelta(days=1)
+        start_str = (window_end - timedelta(days=days_back)).strftime('%Y-%m-%d')
+        end_str = window_end.strftime('%Y-%m-%d')
+
+        if run_sentiment:
+            from LLM import score_company_record, failed, DEFAULT_CONFIDENCE_THRESHOLD
+
+        # One checkpoint log per week and mode; entries hold the company record and its result
+        mode = ("cascade" if cascade else "llm") if run_sentiment else "news"
+        run_id = f"backfill-{week_start}-{mode}"
+        completed = {} if force else checkpoints.load_completed(run_id)
+        checkpoints.start_log(run_id, resume=not force)
+
+        companies = {}
+        sentiment_results = []
+        failed_symbols = []
+        for date_str, day_data in earnings_by_day.items():
+            for symbol in day_data['symbols']:
+                entry = completed.get(symbol)
+                if entry is not None and (entry.get("sentiment") or {}).get("error"):
+                    # Logged by older runs before failed scores were kept out of the log
+                    entry = None
+                if entry is None:
+                    finnhub_limiter.acquire()
+                    symbol_news = main.fetch_company_news(symbol, start_str, end_str)
+                    record = main.build_company_record(symbol_news, date_str) if symbol_news['article_count'] > 0 else None
+                    result = None
+                    if record is not None and run_sentiment:
+                        result = score_company_record(symbol, record, cascade, DEFAULT_CONFIDENCE_THRESHOLD)
+                        if failed(result):
+                            failed_symbols.append(symbol)
+                            continue
+                    entry = {"ticker": symbol, "record": record, "sentiment": result}
+                    checkpoints.append_result(run_id, entry)
+
+                if entry["record"] is not None:
+                    companies[symbol] = entry["record"]
+                if entry["sentiment"] is not None:
+                    sentiment_results.append(entry["sentiment"])
+
+        if failed_symbols:
+            # Not finalized: a later run would skip the week and keep the failed scores for good
+            error = f"{len(failed_symbols)} companies failed to score ({', '.join(failed_symbols)}), rerun to retry them"
+            print(f"❌ Week {week_start}: {error}")
+            return {"week": week_start, "status": "failed", "companies": len(companies), "error": error}
+
+        os.makedirs(output_dir, exist_ok=True)
+        snapshots.atomic_write_json(path, {
+            "earnings_week": week_range,
+            "week_start": week_start,
+            "news_window": {"from": start_str, "to": end_str},
+            "generated_at": datetime.now().isoformat(),
+            "total_companies": len(companies),
+            "companies": companies,
+            "sentiment_results": sentiment_results
+        })
+        if sentiment_results:
+            record_week(week_start, output_dir)
+        print(f"✅ Week {week_start}: {len(companies)} companies with news, {len(sentiment_results)} scored")
+        return {"week": week_start, "status": "done", "companies": len(companies), "error": None}
+
+    except Exception as e:
+        print(f"❌ Week {week_start} failed: {e}")
+        return {"week": week_start, "status": "failed", "companies": None, "error": str(e)}
+
+
+def run_backfill(start_date, end_date, max_workers=4, days_back=30, run_sentiment=True, cascade=False,
+                 output_dir=BACKFILL_DIR, force=False):
+    """
+    Backfill every week in a date range, several weeks at a time
+
+    Returns:
+        list: backfill_week results, in week order
+    """
+    weeks = week_starts(start_date, end_date)
+    print(f"📚 Backfilling {len(weeks)} weeks ({weeks[0] if weeks else '-'} to {weeks[-1] if weeks else '-'}), {max_workers} at a time")
+
+    def process(week_start):
+        return backfill_week(week_start, days_back=days_back, run_sentiment=run_sentiment, cascade=cascade,
+                             output_dir=output_dir, force=force)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(process, weeks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill sentiment history for past earnings weeks')
+    parser.add_argument('--from', dest='start_date', required=True, help='First day of the range (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='end_date', default=datetime.now().strftime('%Y-%m-%d'), help='Last day of the range (default: today)')
+    parser.add_argument('--workers', type=int, default=4, help='Weeks processed at the same time (default: 4)')
+    parser.add_argument('--days-back', type=int, default=30, help='News window in days before each week (default: 30)')
+    parser.add_argument('--no-sentiment', action='store_true', help='Only collect news')
+    parser.add_argument('--cascade', action='store_true', help='Score locally first and only send unclear companies to the LLM')
+    parser.add_argument('--force', action='store_true', help='Rebuild weeks that are already done')
+    parser.add_argument('--record-history', action='store_true',
+                        help='Only append the weeks already done to the sentiment history (no API calls)')
+    args = parser.parse_args()
+    store_lock.hold_for_process()
+
+    if args.record_history:
+        recorded = [week for week in week_starts(args.start_date, args.end_date) if record_week(week)]
+        print(f"📈 {len(recorded)} backfilled weeks appended to the sentiment history")
+        return
+
+    results = run_backfill(args.start_date, args.end_date, max_workers=args.workers, days_back=args.days_back,
+                           run_sentiment=not args.no_sentiment, cascade=args.cascade, force=args.force)
+
+    print("\n" + "="*80)
+    print("BACKFILL SUMMARY")
+    print("="*80)
+    for result in results:
+        detail = f"{result['companies']} companies" if result['companies'] is not None else (result['error'] or "")
+        print(f"  {result['week']}: {result['status']} {detail}")
+
+    if any(result['status'] == 'failed' for result in results):
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Measure the memory held by ingested articles: plain dicts vs ArticleRecord
+
+Builds a synthetic Finnhub fixture (company_news responses, Finnhub-style URLs,
+a few dozen sources) and ingests it company by company the way
+main.fetch_company_news does, once keeping a dict per article and once keeping
+ArticleRecord objects. Each mode runs in a fresh subprocess and reports the
+resident set size growth and the Python heap (tracemalloc) held by the result.
+
+Usage:
+    python bench_article_records.py [--articles 10000] [--per-company 50]
+"""
+
+import os
+import sys
+import gc
+import json
+import random
+import hashlib
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+from articles import ArticleRecord, FINNHUB_NEWS_URL
+
+SOURCES = ["Yahoo", "MarketWatch", "SeekingAlpha", "Benzinga", "Reuters", "CNBC", "Finnhub", "Zacks",
+           "Motley Fool", "Business Insider", "Bloomberg", "Barron's", "Investing.com", "TipRanks",
+           "Forbes", "WSJ", "Financial Times", "TheStreet", "InvestorPlace", "Globe Newswire"]
+WORDS = ["earnings", "beats", "misses", "guidance", "revenue", "shares", "rally", "slump", "analyst",
+         "upgrade", "downgrade", "quarter", "outlook", "record", "growth", "margin", "dividend", "buyback"]
+
+
+def write_fixture(path, article_count, per_company, seed=7):
+    """
+    One JSON line per company: a company_news response with Finnhub's usual fields
+    """
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for start in range(0, article_count, per_company):
+            news = []
+            for n in range(start, min(start + per_company, article_count)):
+                news.append({
+                    "category": "company",
+                    "datetime": 1758000000 + n * 37,
+                    "headline": " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize(),
+                    "id": 130000000 + n,
+                    "image": "",
+                    "related": f"T{start // per_company:04d}",
+                    "source": rng.choice(SOURCES),
+                    "summary": "",
+                    "url": FINNHUB_NEWS_URL + hashlib.sha256(str(n).encode()).hexdigest()
+                })
+            f.write(json.dumps(news) + "\n")
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def measure(path, mode):
+    """
+    Ingest the fixture in this process and return rss / heap bytes held by the articles
+    """
+    gc.collect()
+    rss_before = _rss_bytes()
+    tracemalloc.start()
+
+    companies = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            urls = []
+            for article in json.loads(line):
+                if mode == "dict":
+                    urls.append({
+                        'url': article['url'],
+                        'headline': article.get('headline', 'No headline'),
+                        'source': article.get('source', 'Unknown'),
+                        'datetime': article.get('datetime', 0)
+                    })
+                else:
+                    urls.append(ArticleRecord(article['url'], article.get('headline', 'No headline'),
+                                              article.get('source', 'Unknown'), article.get('datetime', 0)))
+            companies.append(urls)
+
+    gc.collect()
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = _rss_bytes()
+    return {
+        "mode": mode,
+        "articles": sum(len(urls) for urls in companies),
+        "heap": heap,
+        "rss": rss_after - rss_before if rss_before is not None else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory held by ingested articles: dicts vs ArticleRecord')
+    parser.add_argument('--articles', type=int, default=10000, help='Articles in the fixture (default: 10000)')
+    parser.add_argument('--per-company', type=int, default=50, help='Articles per company response (default: 50)')
+    parser.add_argument('--measure', nargs=2, metavar=('FIXTURE', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        fixture = os.path.join(directory, "fixture.jsonl")
+        write_fixture(fixture, args.articles, args.per_company)
+        results = {}
+        for mode in ("dict", "record"):
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", fixture, mode],
+                                    capture_output=True, text=True, check=True).stdout
+            results[mode] = json.loads(output)
+
+    print(f"📊 {args.articles} articles, {args.per_company} per company")
+    for mode, result in results.items():
+        rss = f"{result['rss'] / 1024:,.0f} KiB" if result['rss'] is not None else "n/a"
+        print(f"  {mode:<7} heap {result['heap'] / 1024:>9,.0f} KiB   rss +{rss}")
+    heap_saving = 1 - results['record']['heap'] / results['dict']['heap']
+    print(f"✅ ArticleRecord holds {heap_saving:.0%} less heap than dicts")
+    if results['dict']['rss'] and results['record']['rss'] is not None:
+        print(f"✅ RSS growth {1 - results['record']['rss'] / results['dict']['rss']:.0%} lower")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Append-only checkpoint logs for sentiment runs
+
+Every scored ticker is appended (and fsynced) to checkpoints/sentiment-<snapshot>.jsonl,
+where <snapshot> identifies the input news data plus the scoring configuration.
+A resumed run over the same snapshot reuses the logged results instead of paying
+for those LLM calls again.
+"""
+
+import os
+import json
+import hashlib
+import time
+
+from articles import json_default
+
+CHECKPOINT_DIR = "checkpoints"
+
+
+def snapshot_id(companies, config=None):
+    """
+    Identify an input snapshot: the company records being scored plus the scoring config
+
+    Args:
+        companies (dict): ticker -> company record from earnings_news_urls.json
+        config (dict): Scoring options that change results (cascade, prompt version, ...)
+
+    Returns:
+        str: Short hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(companies, sort_keys=True, ensure_ascii=False, default=json_default).encode('utf-8'))
+    digest.update(json.dumps(config or {}, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def snapshot_id_from_items(items, config=None):
+    """
+    Like snapshot_id, but for (ticker, record) pairs streamed one at a time in file order
+
+    Args:
+        items (iterable): (ticker, company record) pairs, e.g. news_store.iter_companies()
+        config (dict): Scoring options that change results
+
+    Returns:
+        str: Short hex digest
+    """
+    digest = hashlib.sha256()
+    for ticker, record in items:
+        digest.update(json.dumps([ticker, record], sort_keys=True, ensure_ascii=False, default=json_default).encode('utf-8'))
+    digest.update(json.dumps(config or {}, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def checkpoint_path(run_id, checkpoint_dir=CHECKPOINT_DIR):
+    return os.path.join(checkpoint_dir, f"sentiment-{run_id}.jsonl")
+
+
+def load_completed(run_id, checkpoint_dir=CHECKPOINT_DIR):
+    """
+    Results already logged for a snapshot
+
+    A torn final line (crash mid-write) is ignored, and so are failed results
+    (marked "error"), which older runs logged like real ones.
+
+    Returns:
+        dict: ticker -> sentiment result
+    """
+    path = checkpoint_path(run_id, checkpoint_dir)
+    completed = {}
+    if not os.path.exists(path):
+        return completed
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not entry['result'].get('error'):
+                completed[entry['ticker']] = entry['result']
+    return completed
+
+
+def start_log(run_id, resume=False, checkpoint_dir=CHECKPOINT_DIR):
+    """
+    Prepare the checkpoint log for a run (a fresh run starts an empty log)
+
+    Returns:
+        str: Path of the log file
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = checkpoint_path(run_id, checkpoint_dir)
+    if not resume:
+        open(path, 'w', encoding='utf-8').close()
+    return path
+
+
+def append_result(run_id, result, checkpoint_dir=CHECKPOINT_DIR):
+    """
+    Durably append one ticker's result to the checkpoint log
+    """
+    line = json.dumps({"ticker": result['ticker'], "logged_at": int(time.time()), "result": result}, ensure_ascii=False, default=json_default)
+    with open(checkpoint_path(run_id, checkpoint_dir), 'a', encoding='utf-8') as f:
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
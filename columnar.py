@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Columnar article tables backed by NumPy
+
+A column store is a directory holding one array per field, so loading it is a
+handful of np.load calls (memory-mapped by default) instead of parsing and
+building a dict per article:
+
+    meta.json              header fields, source dictionary, URL overrides, companies
+    ids.npy                uint8 (n, 32)   article id as 32 raw bytes (the 64 hex chars)
+    source_codes.npy       uint16 (n,)     index into meta["sources"]
+    datetimes.npy          int64 (n,)      publish time (unix seconds, 0 when unknown)
+    headline_offsets.npy   int64 (n + 1,)  byte offsets into headlines.bin
+    headlines.bin                          UTF-8 headlines back to back
+    company_offsets.npy    int64 (m + 1,)  each company's slice of company_rows
+    company_rows.npy       int32           article rows, company by company
+
+Articles are stored once even when several companies (or weeks) list them. A
+URL is only kept (in meta["url_overrides"]) when it is not the Finnhub URL
+rebuilt from the id. Several news files, e.g. all backfilled weeks, can go into
+one store; every company entry records its earnings_week.
+
+A build is written to a hidden sibling directory and renamed over the store, so
+rebuilding while a reader has it open never exposes a half-written store; a
+reader that races the swap loads again.
+
+Usage:
+    python columnar.py build <news or backfill files...> --out <dir>
+    python columnar.py build --backfill --out history/columns
+    python columnar.py bench <dir>
+"""
+
+import os
+import glob
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+
+import news_store
+import snapshots
+from articles import article_id
+
+ID_BYTES = 32
+META_FILENAME = "meta.json"
+HEADLINES_FILENAME = "headlines.bin"
+
+# Company fields that live in the article columns instead of meta.json
+_ARTICLE_FIELDS = ('urls', 'article_details')
+
+
+def _id_bytes(identifier):
+    """
+    32 raw bytes for a 64-character hex id, or None when the id is not in that form
+    """
+    if len(identifier) != ID_BYTES * 2:
+        return None
+    try:
+        return bytes.fromhex(identifier)
+    except ValueError:
+        return None
+
+
+def _replace_dir(staging, directory):
+    """
+    Rename a finished build over the store directory, then remove the old build
+    """
+    parent, name = os.path.split(os.path.abspath(directory))
+    if not os.path.isdir(directory):
+        os.rename(staging, directory)
+        return
+    retired = os.path.join(parent, f".{name}.old-{os.getpid()}")
+    os.rename(directory, retired)
+    os.rename(staging, directory)
+    # Readers that already opened the old build keep their memory maps
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def build_columns(news_files, directory):
+    """
+    Write one or more expanded news dicts as a column store, replacing any previous build
+
+    Args:
+        news_files (list): Expanded news dicts (version 1 shape, e.g. from news_store.load_news_file)
+        directory (str): Output directory
+
+    Returns:
+        dict: articles, companies and bytes written
+    """
+    sources = []
+    source_index = {}
+    row_index = {}
+    ids = bytearray()
+    source_codes = []
+    datetimes = []
+    headline_offsets = [0]
+    headlines = bytearray()
+    url_overrides = {}
+
+    companies = []
+    company_offsets = [0]
+    company_rows = []
+
+    for news in news_files:
+        for ticker, company in news.get('companies', {}).items():
+            for article in company.get('article_details', []):
+                identifier = article_id(article)
+                url = article.get('url') or ''
+                source = article.get('source', 'Unknown')
+                headline = article.get('headline', '') or ''
+                published = int(article.get('datetime') or 0)
+
+                key = (identifier, source, published, headline, url)
+                row = row_index.get(key)
+                if row is None:
+                    row = len(source_codes)
+                    row_index[key] = row
+                    if source not in source_index:
+                        source_index[source] = len(sources)
+                        sources.append(source)
+
+                    raw = _id_bytes(identifier)
+                    ids += raw if raw is not None else bytes(ID_BYTES)
+                    if raw is None or url != news_store.FINNHUB_NEWS_URL + identifier:
+                        url_overrides[str(row)] = url
+                    source_codes.append(source_index[source])
+                    datetimes.append(published)
+                    headlines += headline.encode('utf-8')
+                    headline_offsets.append(len(headlines))
+                company_rows.append(row)
+
+            entry = {key: value for key, value in company.items() if key not in _ARTICLE_FIELDS}
+            entry['ticker'] = ticker
+            entry['earnings_week'] = news.get('earnings_week')
+            companies.append(entry)
+            company_offsets.append(len(company_rows))
+
+    if len(sources) > np.iinfo(np.uint16).max:
+        raise ValueError(f"Too many distinct sources for uint16 codes: {len(sources)}")
+
+    parent, name = os.path.split(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = os.path.join(parent, f".{name}.staging-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    count = len(source_codes)
+    columns = {
+        "ids": np.frombuffer(bytes(ids), dtype=np.uint8).reshape(count, ID_BYTES),
+        "source_codes": np.array(source_codes, dtype=np.uint16),
+        "datetimes": np.array(datetimes, dtype=np.int64),
+        "headline_offsets": np.array(headline_offsets, dtype=np.int64),
+        "company_offsets": np.array(company_offsets, dtype=np.int64),
+        "company_rows": np.array(company_rows, dtype=np.int32)
+    }
+    for column, values in columns.items():
+        np.save(os.path.join(staging, f"{column}.npy"), values)
+    with open(os.path.join(staging, HEADLINES_FILENAME), 'wb') as f:
+        f.write(headlines)
+        f.flush()
+        os.fsync(f.fileno())
+
+    meta = {
+        "weeks": [news.get('earnings_week') for news in news_files],
+        "generated_at": [news.get('generated_at') for news in news_files],
+        "article_count": count,
+        "sources": sources,
+        "url_overrides": url_overrides,
+        "companies": companies
+    }
+    # meta.json last: a staging directory without it was never finished
+    snapshots.atomic_write_json(os.path.join(staging, META_FILENAME), meta, indent=None)
+    _replace_dir(staging, directory)
+
+    size = sum(os.path.getsize(path) for path in glob.glob(os.path.join(directory, '*')))
+    return {"articles": count, "companies": len(companies), "bytes": size}
+
+
+class ArticleColumns:
+    """
+    A loaded column store; the arrays are memory-mapped unless mmap=False
+    """
+
+    def __init__(self, directory, mmap=True):
+        self.directory = directory
+        for attempt in range(3):
+            # A rebuild renames a new directory into place; load again if that happened mid-load
+            try:
+                inode = os.stat(directory).st_ino
+                self._load(directory, mmap)
+                if os.stat(directory).st_ino == inode:
+                    return
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+                time.sleep(0.05)
+
+    def _load(self, directory, mmap):
+        mode = 'r' if mmap else None
+        with open(os.path.join(directory, META_FILENAME), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.sources = self.meta['sources']
+        self.url_overrides = self.meta['url_overrides']
+        self.companies = self.meta['companies']
+
+        self.ids = np.load(os.path.join(directory, "ids.npy"), mmap_mode=mode)
+        self.source_codes = np.load(os.path.join(directory, "source_codes.npy"), mmap_mode=mode)
+        self.datetimes = np.load(os.path.join(directory, "datetimes.npy"), mmap_mode=mode)
+        self.headline_offsets = np.load(os.path.join(directory, "headline_offsets.npy"), mmap_mode=mode)
+        self.company_offsets = np.load(os.path.join(directory, "company_offsets.npy"), mmap_mode=mode)
+        self.company_rows = np.load(os.path.join(directory, "company_rows.npy"), mmap_mode=mode)
+
+        headlines_path = os.path.join(directory, HEADLINES_FILENAME)
+        if mmap and os.path.getsize(headlines_path) > 0:
+            self.headlines = np.memmap(headlines_path, dtype=np.uint8, mode='r')
+        else:
+            self.headlines = np.fromfile(headlines_path, dtype=np.uint8)
+
+        self._company_index = {}
+        for position, company in enumerate(self.companies):
+            self._company_index.setdefault(company['ticker'], []).append(position)
+
+    def __len__(self):
+        return len(self.source_codes)
+
+    def article_id(self, row):
+        return bytes(self.ids[row]).hex()
+
+    def headline(self, row):
+        start, end = int(self.headline_offsets[row]), int(self.headline_offsets[row + 1])
+        return bytes(self.headlines[start:end]).decode('utf-8')
+
+    def url(self, row):
+        override = self.url_overrides.get(str(row))
+        return override if override is not None else news_store.FINNHUB_NEWS_URL + self.article_id(row)
+
+    def article(self, row):
+        """
+        One article as the dict Finnhub / the news file uses
+        """
+        return {
+            "url": self.url(row),
+            "headline": self.headline(row),
+            "source": self.sources[int(self.source_codes[row])],
+            "datetime": int(self.datetimes[row])
+        }
+
+    def rows_for(self, ticker, earnings_week=None):
+        """
+        Article rows of a ticker (for one week, or across every week in the store)
+
+        Returns:
+            numpy.ndarray: int32 row numbers
+        """
+        positions = [position for position in self._company_index.get(ticker.upper(), [])
+                     if earnings_week is None or self.companies[position].get('earnings_week') == earnings_week]
+        parts = [self.company_rows[self.company_offsets[position]:self.company_offsets[position + 1]] for position in positions]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+
+    def articles_for(self, ticker, earnings_week=None):
+        return [self.article(int(row)) for row in self.rows_for(ticker, earnings_week)]
+
+    def to_news(self, earnings_week):
+        """
+        One week as an expanded (version 1 shape) news dict
+        """
+        position = self.meta['weeks'].index(earnings_week)
+        news = {"earnings_week": earnings_week, "generated_at": self.meta['generated_at'][position], "companies": {}}
+        for index, company in enumerate(self.companies):
+            if company.get('earnings_week') != earnings_week:
+                continue
+            record = {key: value for key, value in company.items() if key not in ('ticker', 'earnings_week')}
+            details = [self.article(int(row)) for row in self.company_rows[self.company_offsets[index]:self.company_offsets[index + 1]]]
+            record['urls'] = [article['url'] for article in details]
+            record['article_details'] = details
+            news['companies'][company['ticker']] = record
+        news['total_companies'] = len(news['companies'])
+        return news
+
+
+def load_columns(directory, mmap=True):
+    """
+    Open a column store
+
+    Args:
+        directory (str): Store directory written by build_columns
+        mmap (bool): Memory-map the arrays (default) instead of reading them into memory
+
+    Returns:
+        ArticleColumns: The loaded store
+    """
+    return ArticleColumns(directory, mmap=mmap)
+
+
+def backfill_files(backfill_dir=None):
+    """
+    Backfilled week files, oldest first
+    """
+    if backfill_dir is None:
+        from backfill import BACKFILL_DIR
+        backfill_dir = BACKFILL_DIR
+    return sorted(glob.glob(os.path.join(backfill_dir, '*.json')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or benchmark columnar article stores')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Build a column store from news or backfill files')
+    build_parser.add_argument('files', nargs='*', help='News files (either schema version) or backfilled weeks')
+    build_parser.add_argument('--backfill', action='store_true', help='Use every week in history/backfill')
+    build_parser.add_argument('--out', required=True, help='Output directory')
+
+    bench_parser = subparsers.add_parser('bench', help='Time loading a column store')
+    bench_parser.add_argument('directory')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        files = list(args.files) + (backfill_files() if args.backfill else [])
+        if not files:
+            print("❌ No input files")
+            exit(1)
+        started = time.perf_counter()
+        summary = build_columns([news_store.load_news_file(path) for path in files], args.out)
+        print(f"✅ {summary['articles']} articles, {summary['companies']} company entries from {len(files)} files "
+              f"-> {args.out} ({summary['bytes']:,} bytes, {time.perf_counter() - started:.2f}s)")
+    else:
+        started = time.perf_counter()
+        columns = load_columns(args.directory)
+        load_ms = (time.perf_counter() - started) * 1000
+        print(f"Loaded {len(columns)} articles, {len(columns.companies)} company entries in {load_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Retention and compaction for stored data
+
+Each data class has its own retention in days (None keeps it forever):
+
+    snapshots          published generations with their raw articles; the current
+                       generation and the KEEP_GENERATIONS newest always stay
+    backfill_articles  article lists of backfilled weeks; their scores are kept
+    headline_cache     cached per-headline scores
+    checkpoints        sentiment checkpoint logs
+    stage_cache        stage outputs in .stage_cache (the last run's keys always stay)
+    sentiment_history  the aggregated score history (merged, never dropped by default)
+
+Small sentiment history segments are merged: every finished week into one
+segment, the running week once it has MERGE_SEGMENT_COUNT segments. Every step
+works online: merged segments and rewritten files are written before their
+inputs are removed, and directories are renamed out of the way before they are
+deleted, so a reader never sees a half-written or half-deleted file.
+
+Retention can be overridden per class with RETENTION_<CLASS>_DAYS (a number, or
+"forever"), e.g. RETENTION_SNAPSHOTS_DAYS=30.
+
+Usage:
+    python compaction.py [--retention snapshots=30] [--retention checkpoints=7]
+"""
+
+import os
+import time
+import shutil
+import argparse
+from datetime import datetime
+
+import snapshots
+import store_lock
+import checkpoints
+import headline_cache
+import sentiment_history
+import sentiment_analytics
+from backfill import BACKFILL_DIR
+from stage_runner import STAGE_CACHE_DIR, LAST_RUN_FILENAME
+
+RETENTION_DAYS = {
+    "snapshots": 90,
+    "backfill_articles": 90,
+    "headline_cache": 90,
+    "checkpoints": 14,
+    "stage_cache": 30,
+    "sentiment_history": None
+}
+
+# Generations kept whatever their age, for rollbacks
+KEEP_GENERATIONS = 5
+
+# Segments the running week collects before they are merged
+MERGE_SEGMENT_COUNT = 24
+
+# Abandoned publish staging directories are removed after this long
+STAGING_MAX_AGE_SECONDS = 24 * 3600
+
+
+def retention_days(overrides=None):
+    """
+    Retention per data class: RETENTION_DAYS, then RETENTION_<CLASS>_DAYS, then overrides
+
+    Returns:
+        dict: class -> days (None = forever)
+    """
+    retention = dict(RETENTION_DAYS)
+    for name in retention:
+        value = os.getenv(f"RETENTION_{name.upper()}_DAYS")
+        if value:
+            retention[name] = None if value.lower() in ("forever", "none") else float(value)
+    retention.update(overrides or {})
+    return retention
+
+
+def _cutoff(days, now):
+    return None if days is None else now - days * 86400
+
+
+def _remove_dir(path):
+    """
+    Rename a directory out of the way, then delete it
+    """
+    trash = os.path.join(os.path.dirname(path), f".trash-{os.path.basename(path)}-{os.getpid()}")
+    try:
+        os.rename(path, trash)
+    except FileNotFoundError:
+        return False
+    shutil.rmtree(trash, ignore_errors=True)
+    return True
+
+
+def compact_snapshots(days, now, snapshot_dir=snapshots.SNAPSHOT_DIR, analytics_dir=sentiment_analytics.ANALYTICS_DIR):
+    """
+    Delete generations published before the cutoff (never the current one or the newest KEEP_GENERATIONS)
+
+    Returns:
+        int: Generations removed
+    """
+    removed = 0
+    if not os.path.isdir(snapshot_dir):
+        return removed
+
+    generations = snapshots.list_generations(snapshot_dir)
+    keep = set(generations[-KEEP_GENERATIONS:])
+    current = snapshots.current_generation(snapshot_dir)
+    if current is not None:
+        keep.add(current)
+
+    cutoff = _cutoff(days, now)
+    if cutoff is not None:
+        for generation in generations:
+            if generation in keep:
+                continue
+            manifest = snapshots.load_manifest(generation, snapshot_dir) or {}
+            published_at = manifest.get('published_at')
+            if published_at and datetime.fromisoformat(published_at).timestamp() < cutoff:
+                if _remove_dir(snapshots.generation_dir(generation, snapshot_dir)):
+                    removed += 1
+
+    # Leftovers of publishes that died before their rename
+    for name in os.listdir(snapshot_dir):
+        path = os.path.join(snapshot_dir, name)
+        if name.startswith(".staging-") and now - os.path.getmtime(path) > STAGING_MAX_AGE_SECONDS:
+            shutil.rmtree(path, ignore_errors=True)
+
+    # Trend caches of generations that are gone
+    remaining = set(snapshots.list_generations(snapshot_dir))
+    if os.path.isdir(analytics_dir):
+        for name in os.listdir(analytics_dir):
+            if name.startswith("trends-gen-") and name.endswith(".json"):
+                if int(name[len("trends-gen-"):-len(".json")]) not in remaining:
+                    os.remove(os.path.join(analytics_dir, name))
+    return removed
+
+
+def compact_backfill(days, now, backfill_dir=BACKFILL_DIR):
+    """
+    Drop the article lists of backfilled weeks older than the cutoff, keeping companies and scores
+
+    Returns:
+        int: Week files rewritten
+    """
+    cutoff = _cutoff(days, now)
+    rewritten = 0
+    if cutoff is None or not os.path.isdir(backfill_dir):
+        return rewritten
+
+    for name in sorted(os.listdir(backfill_dir)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            week_start = datetime.strptime(name[:-len(".json")], '%Y-%m-%d').timestamp()
+        except ValueError:
+            continue
+        path = os.path.join(backfill_dir, name)
+        if week_start >= cutoff:
+            continue
+        week = snapshots.read_json(path)
+        if week is None or week.get("articles_compacted"):
+            continue
+        for company in week.get("companies", {}).values():
+            company.pop("urls", None)
+            company.pop("article_details", None)
+        week["articles_compacted"] = True
+        snapshots.atomic_write_json(path, week)
+        rewritten += 1
+    return rewritten
+
+
+def prune_headline_cache(days, now, filename=headline_cache.CACHE_FILENAME):
+    """
+    Drop cached headline scores scored before the cutoff
+
+    Returns:
+        int: Entries removed
+    """
+    cutoff = _cutoff(days, now)
+    if cutoff is None or not os.path.exists(filename):
+        return 0
+    cache = headline_cache.load_cache(filename)
+    kept = {key: entry for key, entry in cache.items() if entry.get('scored_at', now) >= cutoff}
+    if len(kept) < len(cache):
+        headline_cache.save_cache(kept, filename)
+    return len(cache) - len(kept)
+
+
+def prune_files(directory, days, now, keep=()):
+    """
+    Delete files under a directory last modified before the cutoff
+
+    Returns:
+        int: Files removed
+    """
+    cutoff = _cutoff(days, now)
+    removed = 0
+    if cutoff is None or not os.path.isdir(directory):
+        return removed
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            if name in keep or name.startswith("."):
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+    return removed
+
+
+def compact_history(days, now, history_dir=sentiment_history.HISTORY_DIR):
+    """
+    Merge small sentiment history segments and drop weeks older than the retention
+
+    Returns:
+        dict: merged (segments merged away), dropped (week partitions removed)
+    """
+    summary = {"merged": 0, "dropped": 0}
+    if not os.path.isdir(history_dir):
+        return summary
+
+    cutoff = _cutoff(days, now)
+    running_week = sentiment_history.week_partition(now)
+    for name in sorted(os.listdir(history_dir)):
+        directory = os.path.join(history_dir, name)
+        if name.startswith(".") or not os.path.isdir(directory):
+            continue
+        found = sentiment_history.partition_segments(directory)
+        if not found:
+            continue
+
+        newest = max(last for _, last, _ in found) / 1000
+        if cutoff is not None and newest < cutoff and name != running_week:
+            if _remove_dir(directory):
+                summary["dropped"] += 1
+            continue
+
+        if (name != running_week and len(found) > 1) or len(found) >= MERGE_SEGMENT_COUNT:
+            sentiment_history.merge_segments([path for _, _, path in found], directory)
+            summary["merged"] += len(found)
+    return summary
+
+
+def run_compaction(overrides=None, now=None):
+    """
+    Apply the retention of every data class and merge history segments
+
+    Args:
+        overrides (dict): class -> days (None = forever), on top of the defaults and environment
+        now (float): Reference unix time (default: now)
+
+    Returns:
+        dict: Per-class counts of what was removed or merged
+    """
+    now = time.time() if now is None else now
+    retention = retention_days(overrides)
+    last_run = snapshots.read_json(os.path.join(STAGE_CACHE_DIR, LAST_RUN_FILENAME)) or {}
+
+    summary = {
+        "snapshots_removed": compact_snapshots(retention["snapshots"], now),
+        "backfill_weeks_compacted": compact_backfill(retention["backfill_articles"], now),
+        "headline_scores_removed": prune_headline_cache(retention["headline_cache"], now),
+        "checkpoints_removed": prune_files(checkpoints.CHECKPOINT_DIR, retention["checkpoints"], now),
+        "stage_outputs_removed": prune_files(STAGE_CACHE_DIR, retention["stage_cache"], now,
+                                             keep={LAST_RUN_FILENAME} | {f"{key}.json" for key in last_run.values() if key})
+    }
+    history = compact_history(retention["sentiment_history"], now)
+    summary["history_segments_merged"] = history["merged"]
+    summary["history_weeks_dropped"] = history["dropped"]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply retention and compact stored data')
+    parser.add_argument('--retention', action='append', default=[], metavar='CLASS=DAYS',
+                        help=f'Override a retention ({", ".join(RETENTION_DAYS)}); DAYS may be "forever"')
+    args = parser.parse_args()
+
+    overrides = {}
+    for item in args.retention:
+        name, _, value = item.partition('=')
+        if name not in RETENTION_DAYS or not value:
+            print(f"❌ Invalid retention '{item}'")
+            exit(1)
+        overrides[name] = None if value.lower() in ("forever", "none") else float(value)
+
+    # Every run that writes data holds the lock shared (see store_lock.py)
+    data_lock = store_lock.acquire(exclusive=True, blocking=False)
+    if data_lock is None:
+        print("⏳ An update or backfill is running, try again when it has finished")
+        exit(1)
+    try:
+        summary = run_compaction(overrides)
+    finally:
+        store_lock.release(data_lock)
+    print("🧹 Compaction finished")
+    for key, count in summary.items():
+        print(f"  {key}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+pytest configuration and shared fixtures
+
+test_api.py, test_env.py and test_mu_news.py are scripts run by hand against the
+live Flask server and APIs, so pytest does not collect them.
+
+The `pipeline` fixture runs the real pipeline code offline in a temporary
+directory: the earnings calendar, Finnhub and the LLM router are replaced by
+fakes whose answers each test sets up.
+"""
+
+import os
+import types
+from datetime import datetime, timedelta
+
+import pytest
+
+collect_ignore = ["test_api.py", "test_env.py", "test_mu_news.py"]
+
+WEEK_START = datetime(2025, 9, 22)
+
+_STORIES = ["beats quarterly estimates", "opens a new plant in Texas", "names a new chief financial officer",
+            "faces a supplier lawsuit", "expands its buyback program", "wins a large government contract"]
+
+
+def make_article(ticker, number, source="Yahoo"):
+    """Finnhub-style article whose headline names its ticker (the fake router keys on it)"""
+    return {"id": number, "url": f"https://finnhub.io/api/news?id={ticker.lower()}{number}",
+            "headline": f"{ticker} headline: {_STORIES[number % len(_STORIES)]}", "source": source,
+            "datetime": 1758500000 + number}
+
+
+class FakeFinnhub:
+    """company_news() from a ticker -> articles dict; tickers in `errors` raise"""
+
+    def __init__(self, news):
+        self.news = news
+        self.errors = set()
+        self.calls = []
+
+    def company_news(self, symbol, _from, to):
+        self.calls.append(symbol)
+        if symbol in self.errors:
+            raise RuntimeError(f"Finnhub error for {symbol}")
+        return [dict(article) for article in self.news.get(symbol, [])]
+
+
+class FakeRouter:
+    """Scores each prompt by the ticker named in its headlines; tickers in `failing` raise"""
+
+    def __init__(self, scores):
+        self.scores = scores
+        self.failing = set()
+        self.calls = []
+
+    def chat(self, messages, model):
+        prompt = " ".join(message["content"] for message in messages)
+        ticker = next(t for t in sorted(self.scores, key=len, reverse=True) if f"{t} headline" in prompt)
+        self.calls.append(ticker)
+        if ticker in self.failing:
+            raise RuntimeError("503 Service Unavailable")
+        return str(self.scores[ticker])
+
+    def stats(self):
+        return {"hedged_requests": 0, "endpoints": []}
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """
+    main / LLM wired to fakes, working in tmp_path
+
+    Returns a namespace with: main, llm, calendar (date -> tickers), news (ticker -> articles),
+    finnhub (FakeFinnhub), router (FakeRouter, scores per ticker) and week_start.
+    """
+    monkeypatch.setenv("GROQ_API_KEY", os.environ.get("GROQ_API_KEY", "test-key"))
+    monkeypatch.setenv("TEXT_WORKERS", "0")
+    import main
+    import LLM
+    import rate_limit
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(rate_limit.groq_limiter, "acquire", lambda *args, **kwargs: None)
+    monkeypatch.setattr(rate_limit.finnhub_limiter, "acquire", lambda *args, **kwargs: None)
+
+    calendar = {"2025-09-23": ["MU", "AMD"], "2025-09-24": ["COST"]}
+    news = {ticker: [make_article(ticker, i) for i in range(3)] for tickers in calendar.values() for ticker in tickers}
+    env = types.SimpleNamespace(main=main, llm=LLM, calendar=calendar, news=news, week_start=WEEK_START,
+                                finnhub=FakeFinnhub(news), router=FakeRouter({"MU": 6, "AMD": -3, "COST": 2}))
+
+    def get_earnings_data(weeks_ahead=1, week_start=None):
+        start = datetime.strptime(str(week_start)[:10], "%Y-%m-%d") if week_start else env.week_start
+        start -= timedelta(days=start.weekday())
+        by_day = {date: {"symbols": list(tickers), "count": len(tickers)} for date, tickers in sorted(env.calendar.items())}
+        rows = [{"date": date, "act_symbol": ticker} for date, day in by_day.items() for ticker in day["symbols"]]
+        stats = {"total_count": len(rows), "week_start": start, "week_end": start + timedelta(days=6),
+                 "days_with_earnings": len(by_day), "total_records_fetched": len(rows)}
+        return rows, by_day, stats
+
+    monkeypatch.setattr(main, "get_earnings_data", get_earnings_data)
+    monkeypatch.setattr(main, "finnhub_client", env.finnhub)
+    monkeypatch.setattr(LLM, "router", env.router)
+    return env
@@ -0,0 +1,59 @@
+"""
+Run deadlines with per-stage budgets
+
+A run gets a total time budget that is split across its stages. Each stage's
+budget ends at a fixed share of the run, counted from the start, so time an
+early stage leaves unused carries over to the later stages. Stages check
+expired() between tickers and stop cleanly, leaving the caller to publish
+whatever finished as a partial result.
+"""
+
+import time
+
+# Cumulative share of the run each stage may use up to (calendar, news, then sentiment)
+DEFAULT_STAGE_BUDGETS = {
+    "calendar": 0.10,
+    "news": 0.55,
+    "sentiment": 1.00
+}
+
+
+class Deadline:
+    """
+    Wall-clock budget for one run, with per-stage cut-offs
+    """
+
+    def __init__(self, total_seconds, stage_budgets=None):
+        self.total_seconds = total_seconds
+        self.started = time.monotonic()
+        self.ends_at = self.started + total_seconds
+        self.stage_budgets = stage_budgets or DEFAULT_STAGE_BUDGETS
+        self.expired_stages = []
+
+    def remaining(self, stage=None):
+        """
+        Seconds left for the run, or for one stage when given
+        """
+        ends_at = self.ends_at
+        if stage is not None and stage in self.stage_budgets:
+            ends_at = min(ends_at, self.started + self.stage_budgets[stage] * self.total_seconds)
+        return max(0.0, ends_at - time.monotonic())
+
+    def expired(self, stage=None):
+        """
+        Whether the run (or the stage's budget) is used up; the first expiry per stage is recorded
+        """
+        if self.remaining(stage) > 0:
+            return False
+        name = stage or "run"
+        if name not in self.expired_stages:
+            self.expired_stages.append(name)
+            print(f"⏰ Time budget for {name} used up after {time.monotonic() - self.started:.0f}s")
+        return True
+
+
+def make_deadline(seconds):
+    """
+    A Deadline for a positive number of seconds, or None for an unbounded run
+    """
+    return Deadline(seconds) if seconds else None
@@ -0,0 +1,140 @@
+"""
+Near-duplicate headline detection
+
+Syndicated stories show up many times with small wording changes. Headlines are
+normalized and split into character shingles; pairs whose exact shingle Jaccard
+similarity reaches the threshold are merged into clusters. A ticker's week of
+news (well under EXACT_PAIR_LIMIT headlines) is compared pair by pair; larger
+inputs are MinHashed and only pairs sharing a signature band (locality-sensitive
+hashing) are compared. With 16 bands of 2 rows, a pair at the 0.5 threshold
+becomes a candidate with probability 1 - (1 - 0.5^2)^16 ~ 0.99.
+"""
+
+import re
+import unicodedata
+import zlib
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 32
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+
+# Up to this many headlines every pair is compared (no LSH, so no missed pairs)
+EXACT_PAIR_LIMIT = 200
+
+# Minimum Jaccard similarity of shingle sets for two headlines to count as the same story
+DEFAULT_SIMILARITY_THRESHOLD = 0.5
+
+_MASK_64 = (1 << 64) - 1
+
+# Fixed multiply-shift hash parameters (odd 64-bit a, 64-bit b) so signatures are comparable between runs
+_PERMUTATIONS = [
+    ((zlib.crc32(f"a{i}".encode()) << 32 | zlib.crc32(f"c{i}".encode())) | 1,
+     zlib.crc32(f"b{i}".encode()) << 32 | zlib.crc32(f"d{i}".encode()))
+    for i in range(NUM_PERMUTATIONS)
+]
+
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_headline(headline):
+    """
+    Lowercase, strip accents and punctuation, and collapse whitespace
+    """
+    text = unicodedata.normalize('NFKD', headline or '').encode('ascii', 'ignore').decode('ascii')
+    return _NON_WORD_RE.sub(' ', text.lower()).strip()
+
+
+def shingles(headline):
+    """
+    Set of hashed character shingles for a headline
+    """
+    text = normalize_headline(headline)
+    if len(text) <= SHINGLE_SIZE:
+        return {zlib.crc32(text.encode())}
+    return {zlib.crc32(text[i:i + SHINGLE_SIZE].encode()) for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set):
+    """
+    MinHash signature (tuple of NUM_PERMUTATIONS ints) for a set of hashed shingles
+    """
+    return tuple(
+        min(((a * h + b) & _MASK_64) >> 32 for h in shingle_set)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def cluster_headlines(headlines, threshold=DEFAULT_SIMILARITY_THRESHOLD):
+    """
+    Group near-duplicate headlines together
+
+    Args:
+        headlines (list): Headline strings
+        threshold (float): Minimum shingle Jaccard similarity to merge two headlines
+
+    Returns:
+        list: Clusters as lists of indices into headlines, ordered by first appearance
+    """
+    shingle_sets = [shingles(headline) for headline in headlines]
+    parent = list(range(len(headlines)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    if len(headlines) <= EXACT_PAIR_LIMIT:
+        groups = [range(len(headlines))]
+    else:
+        # LSH: headlines sharing any band of their signature become candidate pairs
+        buckets = {}
+        for i, shingle_set in enumerate(shingle_sets):
+            signature = minhash(shingle_set)
+            for band in range(BANDS):
+                key = (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+                buckets.setdefault(key, []).append(i)
+        groups = [members for members in buckets.values() if len(members) > 1]
+
+    for members in groups:
+        members = list(members)
+        for position, first in enumerate(members):
+            for other in members[position + 1:]:
+                root_first, root_other = find(first), find(other)
+                if root_first == root_other:
+                    continue
+                a, b = shingle_sets[first], shingle_sets[other]
+                if len(a & b) / len(a | b) >= threshold:
+                    parent[max(root_first, root_other)] = min(root_first, root_other)
+
+    clusters = {}
+    for i in range(len(headlines)):
+        clusters.setdefault(find(i), []).append(i)
+    return sorted(clusters.values(), key=lambda members: members[0])
+
+
+def collapse_articles(articles, threshold=DEFAULT_SIMILARITY_THRESHOLD):
+    """
+    Collapse near-duplicate articles into one entry per story
+
+    Args:
+        articles (list): Article dicts with 'headline' and 'source'
+
+    Returns:
+        list: {"article": first article of the cluster, "count": copies, "sources": distinct sources}
+    """
+    clusters = cluster_headlines([article.get('headline', '') for article in articles], threshold)
+    collapsed = []
+    for members in clusters:
+        sources = []
+        for i in members:
+            source = articles[i].get('source', 'Unknown source')
+            if source not in sources:
+                sources.append(source)
+        collapsed.append({
+            "article": articles[members[0]],
+            "count": len(members),
+            "sources": sources
+        })
+    return collapsed
@@ -0,0 +1,145 @@
+"""
+Headline-level sentiment cache
+
+Each headline is scored once (-10 to +10) and stored by article id. A ticker's
+score is then the recency-weighted average of its cached headline scores, so a
+refresh only has to send newly arrived headlines to the LLM.
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+from articles import article_id
+
+CACHE_FILENAME = "headline_sentiment_cache.json"
+
+# Headlines lose half their weight every RECENCY_HALF_LIFE_DAYS
+RECENCY_HALF_LIFE_DAYS = 7
+
+# A run writes the cache at most every SAVE_INTERVAL_SECONDS while scoring, and once when it ends
+SAVE_INTERVAL_SECONDS = 60
+
+# Batch runs score several tickers at once against one shared cache
+_lock = threading.Lock()
+_last_saved = {}
+
+
+def load_cache(filename=CACHE_FILENAME):
+    """
+    Load cached headline scores
+
+    Returns:
+        dict: "<prompt version>:<ticker>:<article id>" -> {"score", "datetime", "scored_at"}
+    """
+    if not os.path.exists(filename):
+        return {}
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f).get('headlines', {})
+    except (ValueError, OSError) as e:
+        print(f"⚠️ Could not read headline cache {filename}: {e}. Starting with an empty cache.")
+        return {}
+
+
+def save_cache(cache, filename=CACHE_FILENAME):
+    """
+    Persist cached headline scores (written to a temp file first so a crash never truncates the cache)
+    """
+    with _lock:
+        temp_filename = f"{filename}.tmp"
+        with open(temp_filename, 'w', encoding='utf-8') as f:
+            json.dump({"updated_at": datetime.now().isoformat(), "headlines": cache}, f, ensure_ascii=False)
+        os.replace(temp_filename, filename)
+        _last_saved[filename] = time.monotonic()
+
+
+def save_cache_if_due(cache, filename=CACHE_FILENAME, interval=SAVE_INTERVAL_SECONDS):
+    """
+    Persist the cache if it was last saved more than `interval` seconds ago
+
+    Called after every ticker that scored new headlines, so a crash loses at most
+    `interval` seconds of scores without rewriting the whole file per ticker.
+
+    Returns:
+        bool: Whether the cache was written
+    """
+    now = time.monotonic()
+    with _lock:
+        due = now - _last_saved.setdefault(filename, now) >= interval
+    if due:
+        save_cache(cache, filename)
+    return due
+
+
+def cache_key(article, ticker, prompt_version):
+    """
+    Cache key for an article's score toward a ticker
+
+    The same article can be listed under several tickers with a different tone
+    toward each, and scores from different prompt templates never mix.
+    """
+    return f"{prompt_version}:{ticker}:{article_id(article)}"
+
+
+def split_cached(articles, cache, ticker, prompt_version):
+    """
+    Separate articles that already have a cached score from the ones still to be scored
+
+    Returns:
+        tuple: (list of (article, score) already cached, list of uncached articles)
+    """
+    cached = []
+    uncached = []
+    for article in articles:
+        entry = cache.get(cache_key(article, ticker, prompt_version))
+        if entry is not None:
+            cached.append((article, entry['score']))
+        else:
+            uncached.append(article)
+    return cached, uncached
+
+
+def store_scores(cache, scored, ticker, prompt_version):
+    """
+    Add freshly scored (article, score) pairs to the cache
+    """
+    now = int(time.time())
+    with _lock:
+        for article, score in scored:
+            cache[cache_key(article, ticker, prompt_version)] = {
+                "score": score,
+                "datetime": article.get('datetime', 0),
+                "scored_at": now
+            }
+
+
+def aggregate_scores(scored, now=None, half_life_days=RECENCY_HALF_LIFE_DAYS):
+    """
+    Combine per-headline scores into one ticker score, weighting recent headlines more
+
+    Args:
+        scored (list): (article, score) pairs
+        now (float): Reference unix time (default: current time)
+        half_life_days (float): Age at which a headline counts half as much as a new one
+
+    Returns:
+        int: Ticker sentiment score from -10 to +10
+    """
+    if not scored:
+        return 0
+
+    now = now if now is not None else time.time()
+    weighted_total = 0.0
+    weight_sum = 0.0
+    for article, score in scored:
+        age_days = max(0.0, (now - (article.get('datetime') or now)) / 86400)
+        weight = 0.5 ** (age_days / half_life_days)
+        weighted_total += weight * score
+        weight_sum += weight
+
+    if weight_sum == 0:
+        return 0
+    return max(-10, min(10, round(weighted_total / weight_sum)))
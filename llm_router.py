@@ -0,0 +1,315 @@
+"""
+Latency-aware routing over OpenAI-compatible chat completion endpoints
+
+Groq and any local stand-in (Ollama, llama.cpp server, vLLM, ...) speak the same
+/chat/completions API, so they are treated as interchangeable endpoints. Every
+request gets a hard timeout, latencies are tracked per endpoint, and when a
+request runs past the primary endpoint's observed p95 a hedged duplicate is sent
+to the next endpoint. Whichever answer arrives first is used. A duplicate is never
+sent to the same endpoint: with a single endpoint (the default Groq setup) it
+would only double the calls against that endpoint's rate limit.
+
+Rate limit and server errors (429 / 5xx) are retried with backoff, honoring
+Retry-After; while an endpoint is backing off, other requests to it wait too.
+
+Endpoints come from the LLM_ENDPOINTS environment variable (JSON list of
+{"name", "base_url", "api_key_env", "model"}) or default to Groq plus a local
+endpoint when LOCAL_LLM_BASE_URL is set.
+"""
+
+import os
+import json
+import time
+import random
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+# Hard limit for a single completion request (seconds)
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "30"))
+
+# Hedge delay used until an endpoint has enough latency samples for a p95
+DEFAULT_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "8"))
+
+MIN_LATENCY_SAMPLES = 10
+LATENCY_WINDOW = 200
+
+# Recent requests an endpoint's failure rate is computed over
+HEALTH_WINDOW = 50
+
+# Retries of a 429 / 5xx answer within one request (as the Groq SDK does), with exponential backoff
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def retry_delay(response, attempt):
+    """
+    Seconds to wait before a retry: the Retry-After header when present, else exponential backoff with jitter
+    """
+    value = response.headers.get('Retry-After') if response is not None else None
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+class Endpoint:
+    """
+    One OpenAI-compatible endpoint with its own latency history
+    """
+
+    def __init__(self, name, base_url, api_key=None, model=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        # Model override for endpoints that serve the model under another name
+        self.model = model
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.outcomes = deque(maxlen=HEALTH_WINDOW)
+        self.successes = 0
+        self.failures = 0
+        # Monotonic time before which requests hold off (set by a 429 / 5xx backoff)
+        self.available_at = 0.0
+        self._lock = threading.Lock()
+
+    def percentile(self, fraction):
+        """
+        Latency percentile over the recent window, or None without enough samples
+        """
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return samples[int(fraction * (len(samples) - 1))]
+
+    def failure_rate(self):
+        """
+        Share of the last HEALTH_WINDOW requests that failed
+        """
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return self.outcomes.count(False) / len(self.outcomes)
+
+    def _record(self, ok, latency=None):
+        with self._lock:
+            self.outcomes.append(ok)
+            if ok:
+                self.successes += 1
+                self.latencies.append(latency)
+            else:
+                self.failures += 1
+
+    def complete(self, messages, model, timeout):
+        """
+        Send one chat completion request and return the response text
+
+        429 / 5xx answers and connection errors are retried up to MAX_RETRIES times
+        within the timeout, waiting Retry-After (or an exponential backoff) in between.
+        """
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f"Bearer {self.api_key}"
+        deadline = time.monotonic() + timeout
+
+        for attempt in range(MAX_RETRIES + 1):
+            with self._lock:
+                pause = min(self.available_at, deadline) - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._record(False)
+                raise TimeoutError(f"LLM endpoint '{self.name}' is backing off past the request deadline")
+
+            started = time.monotonic()
+            response = None
+            try:
+                response = requests.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=headers,
+                    json={"model": self.model or model, "messages": messages},
+                    timeout=remaining
+                )
+                response.raise_for_status()
+                content = response.json()["choices"][0]["message"]["content"]
+            except (requests.HTTPError, requests.ConnectionError) as e:
+                if response is not None and response.status_code not in RETRY_STATUS_CODES:
+                    self._record(False)
+                    raise
+                error = e
+            except Exception:
+                self._record(False)
+                raise
+            else:
+                self._record(True, time.monotonic() - started)
+                return content or ""
+
+            delay = retry_delay(response, attempt)
+            with self._lock:
+                self.available_at = max(self.available_at, time.monotonic() + delay)
+            if attempt == MAX_RETRIES or time.monotonic() + delay >= deadline:
+                self._record(False)
+                raise error
+            print(f"  ⏳ LLM endpoint '{self.name}' failed ({error}), retrying in {delay:.1f}s")
+
+    def stats(self):
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        return {
+            "endpoint": self.name,
+            "requests_ok": self.successes,
+            "requests_failed": self.failures,
+            "recent_failure_rate": round(self.failure_rate(), 3),
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None
+        }
+
+
+class LLMRouter:
+    """
+    Routes chat completions to the fastest healthy endpoint, hedging slow requests
+    """
+
+    def __init__(self, endpoints, request_timeout=DEFAULT_REQUEST_TIMEOUT, hedge=True, max_workers=8):
+        if not endpoints:
+            raise ValueError("LLMRouter needs at least one endpoint")
+        self.endpoints = endpoints
+        self.request_timeout = request_timeout
+        self.hedge = hedge
+        self.hedged_requests = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-router")
+
+    def ranked_endpoints(self):
+        """
+        Endpoints ordered by recent health and median latency (configured order breaks ties)
+        """
+        def rank(item):
+            position, endpoint = item
+            p50 = endpoint.percentile(0.5)
+            return (endpoint.failure_rate() > 0.5, p50 if p50 is not None else float('inf'), position)
+        return [endpoint for _, endpoint in sorted(enumerate(self.endpoints), key=rank)]
+
+    def hedge_delay(self, endpoint):
+        """
+        How long to wait on an endpoint before sending a hedged duplicate (its observed p95)
+        """
+        p95 = endpoint.percentile(0.95)
+        return p95 if p95 is not None else min(DEFAULT_HEDGE_DELAY, self.request_timeout)
+
+    def chat(self, messages, model):
+        """
+        Get a chat completion, returning the first successful answer
+
+        Raises:
+            Exception: The last endpoint error, or TimeoutError if nothing answered in time
+        """
+        ordered = self.ranked_endpoints()
+        deadline = time.monotonic() + self.request_timeout
+        pending = {}
+        errors = []
+        launched = 0
+
+        def launch():
+            nonlocal launched
+            endpoint = ordered[launched]
+            future = self._executor.submit(endpoint.complete, messages, model, max(0.1, deadline - time.monotonic()))
+            pending[future] = endpoint
+            launched += 1
+
+        launch()
+        hedge_at = time.monotonic() + self.hedge_delay(ordered[0])
+
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+
+            # Each endpoint gets at most one copy of the request
+            can_hedge = self.hedge and launched < len(ordered)
+            timeout = min(deadline, hedge_at) - now if can_hedge else deadline - now
+            done, _ = wait(list(pending), timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+
+            if not done:
+                if can_hedge and time.monotonic() >= hedge_at:
+                    if ordered[launched].available_at > time.monotonic():
+                        # The endpoint is backing off from a 429 / 5xx: a duplicate would only add load
+                        hedge_at = ordered[launched].available_at
+                        continue
+                    # Straggler: race a duplicate on the next endpoint
+                    launch()
+                    with self._lock:
+                        self.hedged_requests += 1
+                    hedge_at = time.monotonic() + self.hedge_delay(ordered[launched - 1])
+                continue
+
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append(e)
+                    print(f"  ⚠️ LLM endpoint '{endpoint.name}' failed: {e}")
+
+            if not pending and launched < len(ordered):
+                # Fail over immediately instead of waiting for the hedge delay
+                launch()
+                hedge_at = time.monotonic() + self.hedge_delay(ordered[launched - 1])
+
+        if errors and not pending:
+            raise errors[-1]
+        raise TimeoutError(f"No LLM endpoint answered within {self.request_timeout:.0f}s")
+
+    def stats(self):
+        with self._lock:
+            hedged_requests = self.hedged_requests
+        return {
+            "hedged_requests": hedged_requests,
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints]
+        }
+
+
+def endpoints_from_env():
+    """
+    Build the endpoint list from LLM_ENDPOINTS, or Groq plus an optional local stand-in
+    """
+    configured = os.getenv("LLM_ENDPOINTS")
+    if configured:
+        return [
+            Endpoint(
+                entry["name"],
+                entry["base_url"],
+                api_key=os.getenv(entry["api_key_env"]) if entry.get("api_key_env") else entry.get("api_key"),
+                model=entry.get("model")
+            )
+            for entry in json.loads(configured)
+        ]
+
+    endpoints = []
+    if os.getenv("GROQ_API_KEY"):
+        endpoints.append(Endpoint("groq", GROQ_BASE_URL, api_key=os.getenv("GROQ_API_KEY")))
+    if os.getenv("LOCAL_LLM_BASE_URL"):
+        endpoints.append(Endpoint("local", os.getenv("LOCAL_LLM_BASE_URL"),
+                                  api_key=os.getenv("LOCAL_LLM_API_KEY"),
+                                  model=os.getenv("LOCAL_LLM_MODEL", "llama3.1:8b")))
+    return endpoints
+
+
+def build_router():
+    """
+    Router over the endpoints configured in the environment
+    """
+    return LLMRouter(endpoints_from_env())
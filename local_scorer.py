@@ -0,0 +1,123 @@
+"""
+Local headline sentiment scorer
+
+Cheap keyword-based scoring that runs before the Groq LLM. It returns a score on
+the same -10 to +10 scale used by LLM.py together with a confidence value, so
+companies with clear-cut coverage can skip the LLM round-trip entirely.
+"""
+
+import re
+
+# Keyword weights (same vocabulary the LLM prompt asks the model to look for,
+# plus common headline variants)
+POSITIVE_TERMS = {
+    'beat': 2, 'beats': 2, 'tops': 2, 'exceeds': 2, 'surpasses': 2,
+    'record': 1, 'growth': 1, 'grows': 1, 'strong': 1, 'stronger': 1,
+    'gain': 1, 'gains': 1, 'up': 1, 'rise': 1, 'rises': 1, 'higher': 1,
+    'bullish': 2, 'upgrade': 2, 'upgrades': 2, 'upgraded': 2, 'buy': 1,
+    'outperform': 2, 'outperforms': 2, 'positive': 1, 'rally': 2, 'rallies': 2,
+    'surge': 2, 'surges': 2, 'soar': 2, 'soars': 2, 'jump': 1, 'jumps': 1,
+    'raises': 1, 'boost': 1, 'boosts': 1, 'expands': 1, 'wins': 1, 'profit': 1,
+}
+
+NEGATIVE_TERMS = {
+    'miss': 2, 'misses': 2, 'missed': 2, 'loss': 1, 'losses': 1,
+    'down': 1, 'decline': 1, 'declines': 1, 'decliners': 1, 'fall': 1, 'falls': 1,
+    'fell': 1, 'bearish': 2, 'downgrade': 2, 'downgrades': 2, 'downgraded': 2,
+    'sell': 1, 'underperform': 2, 'underperforms': 2, 'concern': 1, 'concerns': 1,
+    'drop': 1, 'drops': 1, 'plunge': 2, 'plunges': 2, 'slump': 2, 'slumps': 2,
+    'sinks': 2, 'tumbles': 2, 'cuts': 1, 'warns': 2, 'weak': 1, 'weaker': 1,
+    'lawsuit': 2, 'probe': 2, 'investigation': 2, 'resigns': 1, 'layoffs': 1,
+    'recall': 1, 'delisting': 2, 'bankruptcy': 3, 'fraud': 3,
+}
+
+NEGATIONS = {'not', 'no', 'never', "isn't", "doesn't", "didn't", "won't", 'without', 'fails'}
+
+# Companies at or above this confidence (and not mixed) skip the LLM
+DEFAULT_CONFIDENCE_THRESHOLD = 0.6
+
+# Coverage counts as mixed when the minority side has at least this share of polar headlines
+MIXED_MINORITY_SHARE = 0.25
+
+# Number of polar headlines needed before the scorer trusts its own verdict
+MIN_POLAR_HEADLINES = 3
+
+_WORD_RE = re.compile(r"[a-z][a-z'\-]*")
+
+
+def score_headline(headline):
+    """
+    Score a single headline with the keyword lexicon
+
+    Returns:
+        int: Signed keyword weight (positive > 0, negative < 0, neutral 0)
+    """
+    words = _WORD_RE.findall(headline.lower())
+    total = 0
+    for i, word in enumerate(words):
+        weight = POSITIVE_TERMS.get(word, 0) - NEGATIVE_TERMS.get(word, 0)
+        if weight and i > 0 and words[i - 1] in NEGATIONS:
+            weight = -weight
+        total += weight
+    return total
+
+
+def score_headlines(headlines):
+    """
+    Score a list of headlines and estimate how trustworthy the local verdict is
+
+    Args:
+        headlines (list): Headline strings for one company
+
+    Returns:
+        dict: sentiment_score (-10..+10), confidence (0..1), mixed flag and headline counts
+    """
+    positive = negative = 0
+    for headline in headlines:
+        polarity = score_headline(headline)
+        if polarity > 0:
+            positive += 1
+        elif polarity < 0:
+            negative += 1
+
+    total = len(headlines)
+    polar = positive + negative
+
+    if total == 0 or polar == 0:
+        # Nothing the lexicon can read - always let the LLM decide
+        return {
+            "sentiment_score": 0,
+            "confidence": 0.0,
+            "mixed": False,
+            "positive_headlines": positive,
+            "negative_headlines": negative,
+            "neutral_headlines": total - polar
+        }
+
+    balance = (positive - negative) / polar
+    coverage = polar / total
+    score = max(-10, min(10, round(balance * (4 + 6 * coverage))))
+
+    mixed = min(positive, negative) / polar >= MIXED_MINORITY_SHARE
+    confidence = abs(balance) * min(1.0, polar / MIN_POLAR_HEADLINES) * (0.5 + 0.5 * coverage)
+
+    return {
+        "sentiment_score": score,
+        "confidence": round(confidence, 3),
+        "mixed": mixed,
+        "positive_headlines": positive,
+        "negative_headlines": negative,
+        "neutral_headlines": total - polar
+    }
+
+
+def score_company(company_data):
+    """
+    Score a company record from earnings_news_urls.json without calling the LLM
+    """
+    headlines = [
+        article.get('headline')
+        for article in company_data.get('article_details', [])
+        if article.get('headline') and article.get('headline') != 'No headline'
+    ]
+    return score_headlines(headlines)
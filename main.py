@@ -1,24 +1,30 @@
 import requests
-import pandas as pd
 from datetime import datetime, timedelta
-import json
 import finnhub
 import os
 import time
 from collections import defaultdict
 from dotenv import load_dotenv
+import snapshots
+import store_lock
+import news_store
+import news_index
+from deadline import make_deadline
+from articles import ArticleRecord, ArticleUrls
 
 # Load environment variables
 load_dotenv()
 
-# Get API key from environment variables
+# Get API key from environment variables (--offline runs need none, so a missing key only fails on first use)
 FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY")
-if not FINNHUB_API_KEY:
-    raise ValueError("FINNHUB_API_KEY not found in environment variables. Please check your .env file.")
+MISSING_FINNHUB_KEY = "FINNHUB_API_KEY not found in environment variables. Please check your .env file."
 
-finnhub_client = finnhub.Client(api_key=FINNHUB_API_KEY)
+finnhub_client = finnhub.Client(api_key=FINNHUB_API_KEY) if FINNHUB_API_KEY else None
 
-def get_earnings_data(weeks_ahead=1):
+# Seconds between the snapshot generations a streaming run publishes while it is in progress
+STREAM_PUBLISH_SECONDS = float(os.getenv("STREAM_PUBLISH_SECONDS", "60"))
+
+def get_earnings_data(weeks_ahead=1, week_start=None):
     """
     Fetch earnings calendar data from Dolthub and filter for specified week ahead
     
@@ -47,9 +53,10 @@ def get_earnings_data(weeks_ahead=1):
         sys.exit(1)
     else:
         print("✅ Analysis completed successfully!")    weeks_ahead (int): Number of weeks ahead to fetch (1 = next week, 0 = this week, etc.)
+        week_start (date or str): Fetch the week containing this date instead (e.g. a past week for backfills)
     
     Returns:
-        tuple: (earnings_dataframe, earnings_by_day_dict, summary_stats)
+        tuple: (earnings_rows, earnings_by_day_dict, summary_stats) - earnings_rows are the calendar row dicts
     """
     
     # Dolthub API endpoint for earnings calendar
@@ -65,7 +72,12 @@ def get_earnings_data(weeks_ahead=1):
         # Calculate target week dates first
         today = datetime.now()
         
-        if weeks_ahead == 0:  # This week
+        if week_start is not None:  # Explicit week, starting on its Monday
+            if isinstance(week_start, str):
+                week_start = datetime.strptime(week_start, '%Y-%m-%d')
+            week_start = datetime(week_start.year, week_start.month, week_start.day)
+            week_start = week_start - timedelta(days=week_start.weekday())
+        elif weeks_ahead == 0:  # This week
             week_start = today - timedelta(days=today.weekday())  # Monday
         else:  # Future weeks
             days_until_target_monday = (7 * weeks_ahead) - today.weekday()
@@ -89,55 +101,54 @@ def get_earnings_data(weeks_ahead=1):
         if 'rows' not in data:
             return None, None, {"error": "No data found in response"}
         
-        # Convert to DataFrame
-        df = pd.DataFrame(data['rows'])
+        rows = data['rows']
         
-        if df.empty:
+        if not rows:
             # No earnings for the target week
             return None, {}, {"total_count": 0, "week_start": week_start, "week_end": week_end, "error": "No earnings for target week"}
         
-        # Convert date column to datetime for grouping
-        date_column = 'date' if 'date' in df.columns else df.columns[0]
-        df[date_column] = pd.to_datetime(df[date_column])
+        # Group earnings by day (in date order, calendar order within a day) - ignore timing
+        symbols_by_day = defaultdict(list)
+        for row in rows:
+            date = datetime.fromisoformat(str(row['date']).strip()[:10])
+            symbols_by_day[date.strftime('%Y-%m-%d')].append(row['act_symbol'])
         
-        # Group earnings by day - ignore timing
         earnings_by_day = {}
-        for date, group in df.groupby('date'):
-            day_data = {
-                'symbols': group['act_symbol'].tolist(),
-                'count': len(group)
+        for date_str in sorted(symbols_by_day):
+            earnings_by_day[date_str] = {
+                'symbols': symbols_by_day[date_str],
+                'count': len(symbols_by_day[date_str])
             }
-            earnings_by_day[date.strftime('%Y-%m-%d')] = day_data
         
         # Summary statistics
         summary_stats = {
-            'total_count': len(df),
+            'total_count': len(rows),
             'week_start': week_start,
             'week_end': week_end,
             'days_with_earnings': len(earnings_by_day),
-            'total_records_fetched': len(df)
+            'total_records_fetched': len(rows)
         }
         
-        return df, earnings_by_day, summary_stats
+        return rows, earnings_by_day, summary_stats
         
     except Exception as e:
         return None, None, {"error": str(e)}
 
-def format_earnings_summary(earnings_df, earnings_by_day, summary_stats):
+def format_earnings_summary(earnings_rows, earnings_by_day, summary_stats):
     """
     Format earnings data into readable summary strings
     
     Returns:
         dict: Formatted summary data
     """
-    if earnings_df is None or earnings_df.empty:
+    if not earnings_rows:
         return {"error": "No earnings data to format"}
     
     formatted_summary = {
         'total_companies': summary_stats['total_count'],
         'week_range': f"{summary_stats['week_start'].strftime('%Y-%m-%d')} to {summary_stats['week_end'].strftime('%Y-%m-%d')}",
         'daily_breakdown': {},
-        'all_symbols': earnings_df['act_symbol'].tolist()
+        'all_symbols': [row['act_symbol'] for row in earnings_rows]
     }
     
     for date_str, day_data in earnings_by_day.items():
@@ -150,16 +161,53 @@ def format_earnings_summary(earnings_df, earnings_by_day, summary_stats):
     
     return formatted_summary
 
-def get_company_news_urls(symbols, days_back=30):
+def fetch_company_news(symbol, start_str, end_str):
+    """
+    Fetch news for a single ticker from Finnhub (no rate limiting - callers pace their requests)
+    
+    Returns:
+        dict: urls (ArticleRecord objects), article_count, unique_sources and sources
+    """
+    if finnhub_client is None:
+        raise ValueError(MISSING_FINNHUB_KEY)
+    news = finnhub_client.company_news(symbol, _from=start_str, to=end_str)
+    
+    if news:
+        urls = []
+        sources = set()
+        
+        for article in news:
+            if 'url' in article and article['url']:
+                record = ArticleRecord(article['url'], article.get('headline', 'No headline'),
+                                       article.get('source', 'Unknown'), article.get('datetime', 0))
+                urls.append(record)
+                sources.add(record.source)
+        
+        return {
+            'urls': urls,
+            'article_count': len(urls),
+            'unique_sources': len(sources),
+            'sources': list(sources)
+        }
+    
+    return {
+        'urls': [],
+        'article_count': 0,
+        'unique_sources': 0,
+        'sources': []
+    }
+
+def get_company_news_urls(symbols, days_back=30, deadline=None):
     """
     Get news URLs for each ticker symbol from the last month
     
     Args:
         symbols (list): List of ticker symbols
         days_back (int): Number of days to look back for news (default 30)
+        deadline (Deadline): Optional run deadline; fetching stops when the news budget is used up
     
     Returns:
-        dict: Dictionary with ticker symbols as keys and news data as values
+        dict: Dictionary with ticker symbols as keys and news data as values (fetched tickers only)
     """
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days_back)
@@ -172,41 +220,14 @@ def get_company_news_urls(symbols, days_back=30):
     
     for i, symbol in enumerate(symbols):
         # Add delay to avoid hitting API rate limits (free tier is 60 calls per minute)
-        if i > 0 and i % 50 == 0:  # Every 50 calls, wait a bit longer
-            time.sleep(65)  # Wait just over a minute
-        else:
-            time.sleep(1.1)  # Small delay between calls
+        wait = 65 if i > 0 and i % 50 == 0 else 1.1  # Every 50 calls, wait just over a minute
+        if deadline is not None and (deadline.expired("news") or deadline.remaining("news") < wait):
+            print(f"⏰ News budget used up: {len(symbols) - i} of {len(symbols)} tickers not refreshed")
+            break
+        time.sleep(wait)
         
         # Get company news for the symbol
-        news = finnhub_client.company_news(symbol, _from=start_str, to=end_str)
-        
-        if news:
-            urls = []
-            sources = set()
-            
-            for article in news:
-                if 'url' in article and article['url']:
-                    urls.append({
-                        'url': article['url'],
-                        'headline': article.get('headline', 'No headline'),
-                        'source': article.get('source', 'Unknown'),
-                        'datetime': article.get('datetime', 0)
-                    })
-                    sources.add(article.get('source', 'Unknown'))
-            
-            news_data[symbol] = {
-                'urls': urls,
-                'article_count': len(urls),
-                'unique_sources': len(sources),
-                'sources': list(sources)
-            }
-        else:
-            news_data[symbol] = {
-                'urls': [],
-                'article_count': 0,
-                'unique_sources': 0,
-                'sources': []
-            }
+        news_data[symbol] = fetch_company_news(symbol, start_str, end_str)
     
     return news_data
 
@@ -242,51 +263,78 @@ def print_news_summary(news_data):
     print(f"Total unique news sources: {len(total_sources)}")
     print(f"All sources: {', '.join(sorted(total_sources))}")
 
-def save_urls_to_json(news_data, earnings_by_day, filename="earnings_news_urls.json"):
+def news_entry(details, article_count=None):
+    """
+    news_data entry (urls, article_count, unique_sources, sources) for stored article details
+    """
+    sources = set(article.get('source', 'Unknown') for article in details)
+    return {
+        'urls': details,
+        'article_count': len(details) if article_count is None else article_count,
+        'unique_sources': len(sources),
+        'sources': list(sources)
+    }
+
+def build_company_record(symbol_news, date_str):
+    """
+    Build the earnings_news_urls.json record for one company
+    """
+    date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+    urls = symbol_news.get('urls', [])
+    return {
+        "earnings_date": date_str,
+        "earnings_day": date_obj.strftime('%A'),
+        "article_count": len(urls),
+        "urls": ArticleUrls(urls),  # Just the URLs for LLM (built from article_details on access)
+        "article_details": urls  # Full article data if needed
+    }
+
+def save_urls_to_json(news_data, earnings_by_day, filename="earnings_news_urls.json", earnings_week=None, stale_tickers=None):
     """
     Save ticker symbols and URLs to JSON file for Gemini API
+    
+    Args:
+        earnings_week (str): Week label, e.g. "2025-09-22 to 2025-09-28" (default: first to last earnings day)
+        stale_tickers (list): Tickers whose news was carried forward from an earlier run (marks the file partial)
     """
-    # Create structured data for LLM API (only companies with articles)
-    gemini_data = {
-        "earnings_week": "2025-09-22 to 2025-09-28",
+    if earnings_week is None and earnings_by_day:
+        earnings_week = f"{min(earnings_by_day)} to {max(earnings_by_day)}"
+    
+    # Header for the LLM API file (total_companies is filled in with the companies actually written)
+    header = {
+        "earnings_week": earnings_week,
         "generated_at": datetime.now().isoformat(),
-        "companies": {}
+        "total_companies": 0
     }
+    if stale_tickers:
+        header["partial"] = True
+        header["stale_tickers"] = sorted(stale_tickers)
+    stale = set(stale_tickers or [])
     
     # Add earnings day information and URLs for each ticker (only include companies with articles)
     companies_with_articles = 0
     companies_without_articles = 0
     
-    for date_str, day_data in earnings_by_day.items():
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-        day_name = date_obj.strftime('%A')
-        
-        for symbol in day_data['symbols']:
-            symbol_news = news_data.get(symbol, {})
-            urls = symbol_news.get('urls', [])
-            
-            # Only add companies that have news articles (exclude 0 article companies)
-            if len(urls) > 0:
-                gemini_data["companies"][symbol] = {
-                    "earnings_date": date_str,
-                    "earnings_day": day_name,
-                    "article_count": len(urls),
-                    "urls": [article['url'] for article in urls],  # Just the URLs for LLM
-                    "article_details": urls  # Full article data if needed
-                }
-                companies_with_articles += 1
-            else:
-                companies_without_articles += 1
-    
-    # Update total_companies to reflect only companies with articles
-    gemini_data["total_companies"] = len(gemini_data["companies"])
-    
-    # Save to JSON file
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(gemini_data, f, indent=2, ensure_ascii=False)
+    # Records are written one at a time in the compact version 2 layout and the file is
+    # renamed into place at the end, so a reader never sees a half-written file
+    with news_store.NewsWriter(filename, header) as writer:
+        for date_str, day_data in earnings_by_day.items():
+            for symbol in day_data['symbols']:
+                symbol_news = news_data.get(symbol, {})
+                urls = symbol_news.get('urls', [])
+                
+                # Only add companies that have news articles (exclude 0 article companies)
+                if len(urls) > 0:
+                    record = build_company_record(symbol_news, date_str)
+                    if symbol in stale:
+                        record["stale"] = True
+                    writer.add_company(symbol, record)
+                    companies_with_articles += 1
+                else:
+                    companies_without_articles += 1
     
-    print(f"\n✅ Saved {len(gemini_data['companies'])} companies (only those with articles) to '{filename}'")
-    print(f"📊 Total URLs saved: {sum(len(company['urls']) for company in gemini_data['companies'].values())}")
+    print(f"\n✅ Saved {writer.company_count} companies (only those with articles) to '{filename}'")
+    print(f"📊 Total URLs saved: {writer.url_count}")
     print(f"📰 Companies with articles: {companies_with_articles}")
     print(f"🚫 Companies excluded (0 articles): {companies_without_articles}")
     
@@ -315,7 +363,7 @@ def print_all_urls(news_data):
         else:
             print("No articles found")
 
-def run_full_analysis(weeks_ahead=1, run_sentiment=True, specific_ticker=None):
+def run_full_analysis(weeks_ahead=1, run_sentiment=True, specific_ticker=None, cascade=False, incremental=False, streaming=False, resume=False, deadline_seconds=None):
     """
     Main function to run the complete earnings analysis pipeline
     
@@ -323,30 +371,50 @@ def run_full_analysis(weeks_ahead=1, run_sentiment=True, specific_ticker=None):
         weeks_ahead (int): Number of weeks ahead to fetch (1 = next week, 0 = this week, etc.)
         run_sentiment (bool): Whether to run sentiment analysis
         specific_ticker (str): Optional - analyze only this specific ticker symbol
+        cascade (bool): Only escalate low-confidence companies from the local scorer to the LLM
+        incremental (bool): Reuse cached per-headline scores and only score new headlines
+        streaming (bool): Overlap news fetching and sentiment scoring (see run_streaming_analysis)
+        resume (bool): Reuse checkpointed sentiment results for an unchanged input snapshot (not with streaming).
+            News is fetched fresh here, so this only helps when it came back unchanged; the CLI's
+            --resume scores the existing news file instead
+        deadline_seconds (float): Optional time budget; when it runs out, unfinished tickers are
+            carried forward from the current snapshot and the output is published as partial
     
     Returns:
         dict: Results containing earnings data, sentiment analysis, and status
     """
+    if streaming and run_sentiment and not specific_ticker:
+        if resume:
+            return {"success": False, "error": "Streaming runs are not checkpointed and cannot be resumed", "partial": False}
+        return run_streaming_analysis(weeks_ahead=weeks_ahead, cascade=cascade, incremental=incremental,
+                                      deadline_seconds=deadline_seconds)
+    
+    if specific_ticker:
+        if news_index.lookup_company(snapshots.resolve_current()["news_path"], specific_ticker.upper()) is not None:
+            return refresh_ticker(specific_ticker, run_sentiment=run_sentiment, cascade=cascade, incremental=incremental)
+    
     results = {
         "success": False,
         "earnings_data": None,
         "sentiment_results": None,
         "error": None,
-        "json_filename": None
+        "json_filename": None,
+        "partial": False
     }
+    deadline = make_deadline(deadline_seconds)
     
     try:
         # Get earnings data
         print(f"Fetching earnings data for {weeks_ahead} weeks ahead...")
-        earnings_df, earnings_by_day, summary_stats = get_earnings_data(weeks_ahead=weeks_ahead)
+        earnings_rows, earnings_by_day, summary_stats = get_earnings_data(weeks_ahead=weeks_ahead)
         
-        if earnings_df is None:
+        if earnings_rows is None:
             error_msg = f"No earnings data found: {summary_stats.get('error', 'Unknown error')}"
             print(error_msg)
             results["error"] = error_msg
             return results
         
-        formatted_summary = format_earnings_summary(earnings_df, earnings_by_day, summary_stats)
+        formatted_summary = format_earnings_summary(earnings_rows, earnings_by_day, summary_stats)
         results["earnings_data"] = formatted_summary
         
         print(f"Earnings for week: {formatted_summary['week_range']}")
@@ -382,7 +450,17 @@ def run_full_analysis(weeks_ahead=1, run_sentiment=True, specific_ticker=None):
             print("="*80)
         
         print(f"Fetching news for {len(symbols_to_fetch)} companies...")
-        news_data = get_company_news_urls(symbols_to_fetch, days_back=30)  # Get news from last 30 days
+        news_data = get_company_news_urls(symbols_to_fetch, days_back=30, deadline=deadline)  # Get news from last 30 days
+        
+        # Tickers the deadline cut off keep their news from the current snapshot, marked stale
+        stale_tickers = [symbol for symbol in symbols_to_fetch if symbol not in news_data]
+        if stale_tickers:
+            missing = set(stale_tickers)
+            for symbol, company_data in news_store.iter_companies(snapshots.resolve_current()["news_path"], records=True):
+                if symbol in missing:
+                    news_data[symbol] = news_entry(company_data.get('article_details', []))
+            print(f"⏰ Carried forward news for {len(stale_tickers)} tickers from the current snapshot")
+            results["partial"] = True
         
         # Print news fetching summary
         print_news_summary(news_data)
@@ -390,12 +468,11 @@ def run_full_analysis(weeks_ahead=1, run_sentiment=True, specific_ticker=None):
         # If analyzing specific ticker, load existing data for other companies
         if specific_ticker:
             try:
-                with open("earnings_news_urls.json", 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
+                if not os.path.exists("earnings_news_urls.json"):
+                    raise FileNotFoundError("earnings_news_urls.json")
                 
                 # Merge with existing data
-                existing_companies = existing_data.get('companies', {})
-                for symbol, company_data in existing_companies.items():
+                for symbol, company_data in news_store.iter_companies("earnings_news_urls.json", records=True):
                     if symbol not in news_data:
                         news_data[symbol] = {
                             'urls': company_data.get('article_details', []),
@@ -427,7 +504,7 @@ def run_full_analysis(weeks_ahead=1, run_sentiment=True, specific_ticker=None):
             print(f"  Companies reporting: {len(symbols)}")
         
         # Save URLs and ticker data to JSON file
-        json_filename = save_urls_to_json(news_data, earnings_by_day)
+        json_filename = save_urls_to_json(news_data, earnings_by_day, earnings_week=formatted_summary['week_range'], stale_tickers=stale_tickers)
         results["json_filename"] = json_filename
         
         # Run sentiment analysis if requested
@@ -438,8 +515,10 @@ def run_full_analysis(weeks_ahead=1, run_sentiment=True, specific_ticker=None):
             
             try:
                 from LLM import process_earnings_sentiment
-                sentiment_results = process_earnings_sentiment(json_filename)
+                sentiment_results = process_earnings_sentiment(json_filename, cascade=cascade, incremental=incremental, resume=resume, deadline=deadline)
                 results["sentiment_results"] = sentiment_results
+                if any(result.get('stale') for result in sentiment_results.values()):
+                    results["partial"] = True
                 
                 # Print final summary
                 print("\n" + "="*80)
@@ -466,6 +545,14 @@ def run_full_analysis(weeks_ahead=1, run_sentiment=True, specific_ticker=None):
                 print(f"⚠️  {error_msg}")
                 results["error"] = error_msg
         
+        # Publish news and sentiment together as one generation (sentiment is carried forward if it did not run)
+        sentiment_file = snapshots.SENTIMENT_FILENAME if results["sentiment_results"] is not None else None
+        if results["partial"]:
+            note = "partial (deadline reached)"
+        else:
+            note = specific_ticker and f"ticker {specific_ticker.upper()}"
+        results["generation"] = snapshots.publish(json_filename, sentiment_file, note=note)
+        
         results["success"] = True
         return results
         
@@ -475,23 +562,522 @@ def run_full_analysis(weeks_ahead=1, run_sentiment=True, specific_ticker=None):
         results["error"] = error_msg
         return results
 
+def run_streaming_analysis(weeks_ahead=1, queue_size=8, cascade=False, incremental=False, days_back=30, deadline_seconds=None,
+                           publish_interval=STREAM_PUBLISH_SECONDS):
+    """
+    Run the pipeline as a producer/consumer stream instead of strict phases
+    
+    A producer thread fetches each ticker's news and hands it to the scoring stage
+    through a bounded queue, so scoring starts with the first ticker instead of
+    after the last one. Every publish_interval seconds the results so far are
+    published as a snapshot generation (noted "streaming (in progress)"): tickers
+    not reached yet, and tickers whose scoring failed, keep their news and score
+    from the current snapshot, marked stale, so readers always get a complete,
+    consistent week. The final generation is published when the stream ends.
+    
+    Streaming runs are not checkpointed: the news is fetched as the run goes, so
+    there is no input snapshot to resume against (use --resume without --streaming).
+    
+    Args:
+        weeks_ahead (int): Number of weeks ahead to fetch
+        queue_size (int): Maximum fetched-but-unscored tickers held in memory
+        cascade (bool): Only escalate low-confidence companies from the local scorer to the LLM
+        incremental (bool): Reuse cached per-headline scores and only score new headlines
+        days_back (int): News window in days
+        deadline_seconds (float): Optional time budget; fetching stops when the news budget is used
+            up and scoring when the run's is, and the rest is carried forward as partial
+        publish_interval (float): Seconds between in-progress publishes (0 publishes after every ticker)
+    
+    Returns:
+        dict: Same shape as run_full_analysis
+    """
+    import queue
+    import threading
+    
+    results = {
+        "success": False,
+        "earnings_data": None,
+        "sentiment_results": None,
+        "error": None,
+        "json_filename": None,
+        "partial": False
+    }
+    deadline = make_deadline(deadline_seconds)
+    
+    try:
+        from LLM import score_company_record, used_llm, failed, write_sentiment_results, save_headline_cache, DEFAULT_CONFIDENCE_THRESHOLD
+        import headline_cache
+    except ImportError:
+        results["error"] = "LLM module not available. Run without --streaming or check your environment."
+        return results
+    
+    try:
+        print(f"Fetching earnings data for {weeks_ahead} weeks ahead...")
+        earnings_rows, earnings_by_day, summary_stats = get_earnings_data(weeks_ahead=weeks_ahead)
+        
+        if earnings_rows is None:
+            error_msg = f"No earnings data found: {summary_stats.get('error', 'Unknown error')}"
+            print(error_msg)
+            results["error"] = error_msg
+            return results
+        
+        formatted_summary = format_earnings_summary(earnings_rows, earnings_by_day, summary_stats)
+        results["earnings_data"] = formatted_summary
+        earnings_week = formatted_summary['week_range']
+        
+        symbol_dates = {}
+        for date_str, day_data in earnings_by_day.items():
+            for symbol in day_data['symbols']:
+                symbol_dates[symbol] = date_str
+        symbols = list(symbol_dates)
+        
+        # News and scores from the current snapshot, for tickers this run has not (successfully) reached
+        current = snapshots.resolve_current()
+        previous_news = {}
+        for symbol, company_data in news_store.iter_companies(current["news_path"], records=True):
+            if symbol in symbol_dates:
+                previous_news[symbol] = news_entry(company_data.get('article_details', []))
+        previous = snapshots.read_json(current["sentiment_path"]) or {}
+        previous_results = {result['ticker']: result for result in previous.get('sentiment_results', [])}
+        
+        end_date = datetime.now()
+        start_str = (end_date - timedelta(days=days_back)).strftime('%Y-%m-%d')
+        end_str = end_date.strftime('%Y-%m-%d')
+        
+        print(f"\n" + "="*80)
+        print(f"STREAMING NEWS -> SENTIMENT FOR {len(symbols)} COMPANIES (queue size {queue_size})")
+        print("="*80)
+        
+        work = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        
+        def put(item):
+            # Blocks while the scoring stage is queue_size tickers behind, but gives up once the consumer stopped
+            while not stop.is_set():
+                try:
+                    work.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def produce():
+            try:
+                for i, symbol in enumerate(symbols):
+                    # Same pacing as get_company_news_urls (free tier is 60 calls per minute)
+                    if i > 0 and stop.wait(65 if i % 50 == 0 else 1.1):
+                        break
+                    if deadline is not None and deadline.expired("news"):
+                        break
+                    try:
+                        symbol_news = fetch_company_news(symbol, start_str, end_str)
+                    except Exception as e:
+                        print(f"  ⚠️ News fetch failed for {symbol}: {e}")
+                        symbol_news = {'urls': [], 'article_count': 0, 'unique_sources': 0, 'sources': []}
+                    if not put((symbol, symbol_news)):
+                        break
+            finally:
+                put(None)
+        
+        generated_at = datetime.now().isoformat()
+        cache = headline_cache.load_cache() if incremental else None
+        news_data = {}
+        sentiment_results = []
+        failed_tickers = []
+        recorded = set()
+        
+        def publish(final):
+            # This run's news and scores, the rest carried forward from the current snapshot
+            news = dict(news_data)
+            stale_news = [symbol for symbol in symbols if symbol not in news and symbol in previous_news]
+            for symbol in stale_news:
+                news[symbol] = previous_news[symbol]
+            scored = {result['ticker'] for result in sentiment_results}
+            stale_scores = [symbol for symbol in symbols if symbol not in scored and symbol in previous_results
+                            and (symbol not in news_data or symbol in failed_tickers)]
+            output = sentiment_results + [dict(previous_results[symbol], stale=True) for symbol in stale_scores]
+            
+            extra = {"partial": True, "stale_tickers": sorted(set(stale_news) | set(stale_scores))} if stale_news or stale_scores else {}
+            if not final:
+                extra["in_progress"] = True
+            json_filename = save_urls_to_json(news, earnings_by_day, earnings_week=earnings_week, stale_tickers=stale_news)
+            sentiment_file = write_sentiment_results(output, generated_at, earnings_week, **extra)
+            
+            # Each new score goes into the sentiment history once, with the generation that first served it
+            new_scores = sorted(scored - recorded)
+            recorded.update(new_scores)
+            if final:
+                note = "streaming, partial" if extra else "streaming"
+            else:
+                note = "streaming (in progress)"
+            generation = snapshots.publish(json_filename, sentiment_file, note=note, history_tickers=new_scores)
+            print(f"📦 Published generation {generation}: {len(scored)}/{len(symbols)} scored ({note})")
+            return json_filename, generation, bool(extra)
+        
+        producer = threading.Thread(target=produce, name="news-producer", daemon=True)
+        producer.start()
+        last_published = time.monotonic()
+        
+        try:
+            while True:
+                item = work.get()
+                if item is None:
+                    break
+                symbol, symbol_news = item
+                if deadline is not None and deadline.expired("sentiment"):
+                    break
+                news_data[symbol] = symbol_news
+                
+                if symbol_news['article_count'] == 0:
+                    print(f"\n📄 {symbol}: no articles, not scored")
+                    continue
+                
+                print(f"\n🔍 Analyzing {symbol}... ({len(news_data)}/{len(symbols)} fetched)")
+                record = build_company_record(symbol_news, symbol_dates[symbol])
+                result = score_company_record(symbol, record, cascade, DEFAULT_CONFIDENCE_THRESHOLD, cache)
+                if failed(result):
+                    # Keeps its previous score (if any) instead of publishing the failure
+                    failed_tickers.append(symbol)
+                    print(f"  ❌ Scoring failed for {symbol}")
+                else:
+                    sentiment_results.append(result)
+                    print(f"  📊 Final score for {symbol}: {result['sentiment_score']:+d}")
+                
+                if time.monotonic() - last_published >= publish_interval:
+                    publish(final=False)
+                    last_published = time.monotonic()
+                
+                if used_llm(result):
+                    time.sleep(2)
+        finally:
+            stop.set()
+            save_headline_cache(cache, sentiment_results)
+        
+        producer.join()
+        
+        if failed_tickers:
+            print(f"❌ {len(failed_tickers)} companies failed to score: {', '.join(failed_tickers)}")
+        json_filename, results["generation"], results["partial"] = publish(final=True)
+        results["json_filename"] = json_filename
+        results["sentiment_results"] = {result['ticker']: result for result in sentiment_results}
+        results["failed"] = failed_tickers
+        results["success"] = True
+        print(f"\n✅ Streaming analysis complete: {len(sentiment_results)} companies scored")
+        
+        return results
+        
+    except Exception as e:
+        error_msg = f"Error in run_streaming_analysis: {e}"
+        print(f"❌ {error_msg}")
+        results["error"] = error_msg
+        return results
+
+def merge_into_snapshot(records, sentiment_results=None, earnings_week=None, note=None):
+    """
+    Merge per-ticker records into the current snapshot and publish it as one new generation
+    
+    Args:
+        records (dict): ticker -> company record (None removes the ticker, e.g. no articles any more)
+        sentiment_results (list): Results replacing those tickers' sentiment (None = sentiment untouched)
+        earnings_week (str): Week label used when there is no snapshot yet
+        note (str): Description stored in the snapshot manifest
+    
+    Returns:
+        tuple: (generation, news filename)
+    """
+    current = snapshots.resolve_current()
+    news_file = news_store.read_header(current["news_path"]) or {
+        "earnings_week": earnings_week,
+        "generated_at": datetime.now().isoformat()
+    }
+    
+    # Refreshed tickers are no longer stale
+    stale_tickers = [symbol for symbol in news_file.get('stale_tickers', []) if symbol not in records]
+    if stale_tickers:
+        news_file["stale_tickers"] = stale_tickers
+    else:
+        news_file.pop("stale_tickers", None)
+        news_file.pop("partial", None)
+    
+    # Stream the current companies through, swapping in the new records
+    existing = set()
+    with news_store.NewsWriter(snapshots.NEWS_FILENAME, news_file) as writer:
+        for symbol, company_data in news_store.iter_companies(current["news_path"]):
+            existing.add(symbol)
+            if symbol in records:
+                company_data = records[symbol]
+            if company_data is not None:
+                writer.add_company(symbol, company_data)
+        for symbol, record in records.items():
+            if symbol not in existing and record is not None:
+                writer.add_company(symbol, record)
+    json_filename = writer.filename
+    
+    sentiment_filename = None
+    if sentiment_results is not None:
+        from LLM import write_sentiment_results
+        
+        sentiment_file = snapshots.read_json(current["sentiment_path"]) or {}
+        merged = [result for result in sentiment_file.get('sentiment_results', []) if result.get('ticker') not in records]
+        merged.extend(sentiment_results)
+        
+        extra = {}
+        stale_scores = [symbol for symbol in sentiment_file.get('stale_tickers', []) if symbol not in records]
+        if stale_scores:
+            extra = {"partial": True, "stale_tickers": stale_scores}
+        sentiment_filename = write_sentiment_results(
+            merged,
+            sentiment_file.get('analysis_date', news_file.get('generated_at')),
+            news_file.get('earnings_week'),
+            **extra
+        )
+    
+    # Only the rescored tickers are new observations for the sentiment history
+    history_tickers = [result['ticker'] for result in sentiment_results] if sentiment_results is not None else None
+    generation = snapshots.publish(json_filename, sentiment_filename, note=note, history_tickers=history_tickers)
+    return generation, json_filename
+
+def refresh_ticker(ticker, days_back=30, run_sentiment=True, cascade=False, incremental=False):
+    """
+    Refresh one ticker's news and sentiment records in the current snapshot
+    
+    The earnings date comes from the ticker's stored record, so no calendar fetch
+    is needed: this is one Finnhub call plus (at most) one LLM call. Every other
+    company's records are copied unchanged into the new snapshot generation.
+    
+    Args:
+        ticker (str): Ticker symbol already present in the current snapshot
+        days_back (int): News window in days
+        run_sentiment (bool): Whether to re-score the ticker
+        cascade (bool): Score locally first and only call the LLM when unclear
+        incremental (bool): Only score headlines not already in the headline cache
+    
+    Returns:
+        dict: Same shape as run_full_analysis
+    """
+    ticker_upper = ticker.upper()
+    results = {
+        "success": False,
+        "earnings_data": None,
+        "sentiment_results": None,
+        "error": None,
+        "json_filename": None,
+        "partial": False
+    }
+    
+    try:
+        company_data = news_index.lookup_company(snapshots.resolve_current()["news_path"], ticker_upper)
+        if company_data is None:
+            results["error"] = f"Ticker {ticker_upper} is not in the current snapshot"
+            print(f"❌ {results['error']}")
+            return results
+        
+        earnings_date = company_data['earnings_date']
+        
+        end_date = datetime.now()
+        start_str = (end_date - timedelta(days=days_back)).strftime('%Y-%m-%d')
+        end_str = end_date.strftime('%Y-%m-%d')
+        
+        print(f"🔄 Refreshing {ticker_upper} (earnings {earnings_date})...")
+        symbol_news = fetch_company_news(ticker_upper, start_str, end_str)
+        print(f"  📰 {symbol_news['article_count']} articles from {symbol_news['unique_sources']} sources")
+        
+        # Same rule as save_urls_to_json: companies without articles are not listed
+        record = None
+        if symbol_news['article_count'] > 0:
+            record = build_company_record(symbol_news, earnings_date)
+            record["refreshed_at"] = datetime.now().isoformat()
+        
+        sentiment_results = None
+        if run_sentiment:
+            from LLM import score_company_record, save_headline_cache, DEFAULT_CONFIDENCE_THRESHOLD
+            import headline_cache
+            
+            sentiment_results = []
+            if record is not None:
+                cache = headline_cache.load_cache() if incremental else None
+                result = score_company_record(ticker_upper, record, cascade, DEFAULT_CONFIDENCE_THRESHOLD, cache)
+                print(f"  📊 Final score for {ticker_upper}: {result['sentiment_score']:+d}")
+                sentiment_results.append(result)
+                save_headline_cache(cache, sentiment_results)
+                results["sentiment_results"] = {ticker_upper: result}
+        
+        results["generation"], results["json_filename"] = merge_into_snapshot(
+            {ticker_upper: record}, sentiment_results, note=f"refresh {ticker_upper}"
+        )
+        results["success"] = True
+        return results
+        
+    except Exception as e:
+        error_msg = f"Error refreshing {ticker_upper}: {e}"
+        print(f"❌ {error_msg}")
+        results["error"] = error_msg
+        return results
+
+def parse_ticker_list(values):
+    """
+    Expand --tickers arguments: comma/space separated symbols or files with one symbol per line
+    
+    Args:
+        values (list): Raw argument values, e.g. ["MU,COST", "watchlist.txt"]
+    
+    Returns:
+        list: Unique upper-case symbols in the order given
+    """
+    symbols = []
+    for value in values:
+        if os.path.isfile(value):
+            with open(value, 'r', encoding='utf-8') as f:
+                text = "\n".join(line.split('#', 1)[0] for line in f)
+        else:
+            text = value
+        for symbol in text.replace(',', ' ').split():
+            symbol = symbol.strip().upper()
+            if symbol and symbol not in symbols:
+                symbols.append(symbol)
+    return symbols
+
+def run_batch_analysis(tickers, weeks_ahead=1, run_sentiment=True, cascade=False, incremental=False, days_back=30, max_workers=4):
+    """
+    Analyze a list of tickers in one process
+    
+    The calendar is fetched once, each ticker is fetched and scored concurrently
+    (Finnhub and LLM calls share the rate_limit token buckets) and all records are
+    merged into the current snapshot with a single write. A ticker whose fetch or
+    scoring fails is left out of the merge (it keeps its current snapshot records)
+    and reported in "failed".
+    
+    Args:
+        tickers (list): Ticker symbols
+        weeks_ahead (int): Number of weeks ahead to fetch
+        run_sentiment (bool): Whether to score the tickers
+        cascade (bool): Score locally first and only call the LLM when unclear
+        incremental (bool): Only score headlines not already in the headline cache
+        days_back (int): News window in days
+        max_workers (int): Tickers processed at the same time
+    
+    Returns:
+        dict: Same shape as run_full_analysis, plus "skipped" (tickers not reporting this week)
+            and "failed" (ticker -> error)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from rate_limit import finnhub_limiter
+    
+    results = {
+        "success": False,
+        "earnings_data": None,
+        "sentiment_results": None,
+        "error": None,
+        "json_filename": None,
+        "partial": False,
+        "skipped": [],
+        "failed": {}
+    }
+    
+    try:
+        print(f"Fetching earnings data for {weeks_ahead} weeks ahead...")
+        earnings_rows, earnings_by_day, summary_stats = get_earnings_data(weeks_ahead=weeks_ahead)
+        
+        if earnings_rows is None:
+            error_msg = f"No earnings data found: {summary_stats.get('error', 'Unknown error')}"
+            print(error_msg)
+            results["error"] = error_msg
+            return results
+        
+        formatted_summary = format_earnings_summary(earnings_rows, earnings_by_day, summary_stats)
+        results["earnings_data"] = formatted_summary
+        
+        symbol_dates = {}
+        for date_str, day_data in earnings_by_day.items():
+            for symbol in day_data['symbols']:
+                symbol_dates[symbol] = date_str
+        
+        results["skipped"] = [symbol for symbol in tickers if symbol not in symbol_dates]
+        for symbol in results["skipped"]:
+            print(f"⚠️ {symbol} is not reporting earnings in {formatted_summary['week_range']}, skipped")
+        symbols = [symbol for symbol in tickers if symbol in symbol_dates]
+        if not symbols:
+            results["error"] = "None of the requested tickers report earnings this week"
+            return results
+        
+        if run_sentiment:
+            from LLM import score_company_record, failed, save_headline_cache, DEFAULT_CONFIDENCE_THRESHOLD
+            import headline_cache
+            cache = headline_cache.load_cache() if incremental else None
+        
+        end_date = datetime.now()
+        start_str = (end_date - timedelta(days=days_back)).strftime('%Y-%m-%d')
+        end_str = end_date.strftime('%Y-%m-%d')
+        
+        def process(symbol):
+            try:
+                finnhub_limiter.acquire()
+                symbol_news = fetch_company_news(symbol, start_str, end_str)
+                if symbol_news['article_count'] == 0:
+                    print(f"📄 {symbol}: no articles")
+                    return symbol, None, None, None
+                record = build_company_record(symbol_news, symbol_dates[symbol])
+                result = None
+                if run_sentiment:
+                    result = score_company_record(symbol, record, cascade, DEFAULT_CONFIDENCE_THRESHOLD, cache)
+                    if failed(result):
+                        return symbol, None, None, "sentiment scoring failed"
+                    print(f"  📊 {symbol}: {record['article_count']} articles, score {result['sentiment_score']:+d}")
+                return symbol, record, result, None
+            except Exception as e:
+                return symbol, None, None, str(e)
+        
+        print(f"\n" + "="*80)
+        print(f"BATCH ANALYSIS FOR {len(symbols)} TICKERS ({max_workers} at a time)")
+        print("="*80)
+        
+        records = {}
+        sentiment_results = [] if run_sentiment else None
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for symbol, record, result, error in executor.map(process, symbols):
+                if error is not None:
+                    print(f"❌ {symbol}: {error}")
+                    results["failed"][symbol] = error
+                    continue
+                records[symbol] = record
+                if result is not None:
+                    sentiment_results.append(result)
+        if run_sentiment:
+            save_headline_cache(cache, sentiment_results)
+        
+        if not records:
+            results["error"] = f"All {len(symbols)} tickers failed: {results['failed']}"
+            return results
+        
+        results["generation"], results["json_filename"] = merge_into_snapshot(
+            records, sentiment_results, earnings_week=formatted_summary['week_range'], note=f"batch of {len(records)} tickers"
+        )
+        if sentiment_results is not None:
+            results["sentiment_results"] = {result['ticker']: result for result in sentiment_results}
+        results["success"] = True
+        print(f"\n✅ Batch complete: {len(records)} tickers merged into snapshot generation {results['generation']}")
+        if results["failed"]:
+            print(f"❌ {len(results['failed'])} tickers failed and kept their previous records: {', '.join(results['failed'])}")
+        return results
+        
+    except Exception as e:
+        error_msg = f"Error in run_batch_analysis: {e}"
+        print(f"❌ {error_msg}")
+        results["error"] = error_msg
+        return results
+
 def load_existing_news_data():
     """
     Load existing news data from JSON file to avoid re-fetching
     """
     try:
-        with open("earnings_news_urls.json", 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        if not os.path.exists("earnings_news_urls.json"):
+            raise FileNotFoundError("earnings_news_urls.json")
         
-        # Convert JSON format back to news_data format for display
+        # Convert JSON format back to news_data format for display (one company at a time)
         news_data = {}
-        for symbol, company_data in json_data['companies'].items():
-            news_data[symbol] = {
-                'urls': company_data['article_details'],
-                'article_count': company_data['article_count'],
-                'unique_sources': len(set(article.get('source', 'Unknown') for article in company_data['article_details'])),
-                'sources': list(set(article.get('source', 'Unknown') for article in company_data['article_details']))
-            }
+        for symbol, company_data in news_store.iter_companies("earnings_news_urls.json", records=True):
+            news_data[symbol] = news_entry(company_data['article_details'], company_data['article_count'])
         print(f"✅ Loaded existing news data for {len(news_data)} companies")
         return news_data
     except FileNotFoundError:
@@ -531,16 +1117,58 @@ if __name__ == "__main__":
     parser.add_argument('--weeks', type=int, default=1, help='Weeks ahead to analyze (default: 1)')
     parser.add_argument('--no-sentiment', action='store_true', help='Skip sentiment analysis')
     parser.add_argument('--use-existing', action='store_true', help='Use existing news data instead of fetching fresh')
+    parser.add_argument('--cascade', action='store_true', help='Score locally first and only send unclear companies to the LLM')
+    parser.add_argument('--incremental', action='store_true', help='Only score headlines not already in the headline cache')
+    parser.add_argument('--streaming', action='store_true', help='Score each ticker as soon as its news is fetched')
+    parser.add_argument('--resume', action='store_true', help='Re-score the existing news file, skipping tickers an interrupted run already scored (implies --use-existing)')
+    parser.add_argument('--tickers', nargs='+', help='Several tickers at once: comma-separated symbols and/or files with one symbol per line')
+    parser.add_argument('--offline', action='store_true', help='Re-analyze the stored snapshot without any network calls (see offline.py)')
     
     args = parser.parse_args()
     
-    if args.ticker:
+    if args.streaming and args.resume:
+        parser.error("--resume cannot be combined with --streaming (streaming runs are not checkpointed)")
+    if args.resume and (args.ticker or args.tickers or args.offline or args.no_sentiment):
+        parser.error("--resume only applies to a full sentiment run over the existing news file")
+    if args.resume:
+        # Fresh news would change the input snapshot, so the checkpoints of the interrupted run would not match
+        args.use_existing = True
+    
+    if not args.offline and not FINNHUB_API_KEY:
+        raise ValueError(MISSING_FINNHUB_KEY)
+    
+    # Shared with other runs; compaction skips its cycle until this run ends
+    store_lock.hold_for_process()
+    
+    if args.offline:
+        from offline import run_offline_analysis
+        if not run_offline_analysis()["success"]:
+            exit(1)
+    elif args.tickers:
+        tickers = parse_ticker_list(args.tickers + ([args.ticker] if args.ticker else []))
+        print(f"Analyzing {len(tickers)} tickers: {', '.join(tickers)}")
+        result = run_batch_analysis(
+            tickers,
+            weeks_ahead=args.weeks,
+            run_sentiment=not args.no_sentiment,
+            cascade=args.cascade,
+            incremental=args.incremental
+        )
+        
+        if result["success"]:
+            print("✅ Analysis completed successfully!")
+        else:
+            print(f"❌ Analysis failed: {result['error']}")
+            exit(1)
+    elif args.ticker:
         # Analyze specific ticker
         print(f"Analyzing specific ticker: {args.ticker}")
         result = run_full_analysis(
             specific_ticker=args.ticker,
             weeks_ahead=args.weeks, 
-            run_sentiment=not args.no_sentiment
+            run_sentiment=not args.no_sentiment,
+            cascade=args.cascade,
+            incremental=args.incremental
         )
         
         if result["success"]:
@@ -552,10 +1180,10 @@ if __name__ == "__main__":
         # Check if we should use existing data
         if args.use_existing:
             # Get earnings data
-            earnings_df, earnings_by_day, summary_stats = get_earnings_data(weeks_ahead=args.weeks)
+            earnings_rows, earnings_by_day, summary_stats = get_earnings_data(weeks_ahead=args.weeks)
             
-            if earnings_df is not None:
-                formatted_summary = format_earnings_summary(earnings_df, earnings_by_day, summary_stats)
+            if earnings_rows is not None:
+                formatted_summary = format_earnings_summary(earnings_rows, earnings_by_day, summary_stats)
                 print(f"Earnings for week: {formatted_summary['week_range']}")
                 print(f"Total companies reporting: {formatted_summary['total_companies']}")
                 
@@ -577,7 +1205,8 @@ if __name__ == "__main__":
                         try:
                             from LLM import process_earnings_sentiment
                             json_filename = "earnings_news_urls.json"
-                            sentiment_results = process_earnings_sentiment(json_filename)
+                            sentiment_results = process_earnings_sentiment(json_filename, cascade=args.cascade, incremental=args.incremental, resume=args.resume)
+                            snapshots.publish(json_filename, snapshots.SENTIMENT_FILENAME, note="existing news")
                             
                             # Print final summary
                             print("\n" + "="*80)
@@ -611,7 +1240,7 @@ if __name__ == "__main__":
                 print("Failed to get earnings data.")
         else:
             # Run full analysis with fresh data fetching
-            result = run_full_analysis(weeks_ahead=args.weeks, run_sentiment=not args.no_sentiment)
+            result = run_full_analysis(weeks_ahead=args.weeks, run_sentiment=not args.no_sentiment, cascade=args.cascade, incremental=args.incremental, streaming=args.streaming)
             
             if result["success"]:
                 print("✅ Analysis completed successfully!")
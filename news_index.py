@@ -0,0 +1,247 @@
+"""
+Memory-mapped ticker index for version 2 news files
+
+An index file sits next to each news file (<news file>.idx) and maps a ticker to
+the byte range of its company line, plus every article row's starting offset.
+Looking up one company memory-maps the index and the news file and touches only
+that company's line and its article lines, instead of parsing the whole file.
+Both files are read through mmap, so worker processes share the pages in the OS
+page cache.
+
+Layout (little-endian):
+
+    header   magic "NIDX", version, slot count, article count, data size, data mtime_ns, sources offset
+    slots    slot count x (ticker, 16 bytes NUL-padded | line offset u64 | line length u32 | unused u32)
+    offsets  article count x u64 start of each article line
+
+Slots form an open-addressing hash table (crc32 of the ticker, linear probing,
+at most half full). An index whose recorded size / mtime do not match the news
+file is ignored, and lookups fall back to streaming the file.
+
+Usage:
+    python news_index.py build [--file earnings_news_urls.json]
+    python news_index.py get <ticker> [--file earnings_news_urls.json]
+"""
+
+import os
+import json
+import mmap
+import zlib
+import struct
+import argparse
+import threading
+
+import snapshots
+import news_store
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"NIDX"
+INDEX_VERSION = 1
+KEY_BYTES = 16
+
+_HEADER = struct.Struct("<4sIIIQqQ")
+_SLOT = struct.Struct(f"<{KEY_BYTES}sQII")
+_OFFSET = struct.Struct("<Q")
+
+# Open indexes per news file, reopened when the file changes
+_open_indexes = {}
+_lock = threading.Lock()
+
+
+def index_path(news_path):
+    return news_path + INDEX_SUFFIX
+
+
+def _slot_of(key, slot_count):
+    return zlib.crc32(key) & (slot_count - 1)
+
+
+def build_index(news_path):
+    """
+    Write the index for a version 2 news file (atomically, next to it)
+
+    Returns:
+        str: Index path, or None for a version 1 file (nothing to index)
+    """
+    # Taken before scanning: if the file is replaced meanwhile, the index will not match it
+    stat = os.stat(news_path)
+    layout = news_store.scan_offsets(news_path)
+    if layout is None:
+        return None
+
+    companies = layout["companies"]
+    slot_count = 8
+    while slot_count < 2 * len(companies):
+        slot_count *= 2
+
+    slots = [None] * slot_count
+    for ticker, offset, length in companies:
+        key = ticker.encode('utf-8')
+        if len(key) > KEY_BYTES:
+            # Too long to store; lookups of it fall back to streaming
+            continue
+        slot = _slot_of(key, slot_count)
+        while slots[slot] is not None:
+            slot = (slot + 1) & (slot_count - 1)
+        slots[slot] = (key, offset, length)
+
+    offsets = layout["article_offsets"]
+    parts = [_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, slot_count, len(offsets), stat.st_size, stat.st_mtime_ns, layout["sources_offset"])]
+    empty = _SLOT.pack(b"", 0, 0, 0)
+    parts.extend(_SLOT.pack(slot[0], slot[1], slot[2], 0) if slot is not None else empty for slot in slots)
+    parts.append(struct.pack(f"<{len(offsets)}Q", *offsets))
+
+    path = index_path(news_path)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(b"".join(parts))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return path
+
+
+class NewsIndex:
+    """
+    An open index plus the memory-mapped news file it describes
+    """
+
+    def __init__(self, news_path):
+        self.news_path = news_path
+        with open(index_path(news_path), 'rb') as f:
+            self.index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(news_path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            mapped = os.fstat(f.fileno())
+        self.data_ino = mapped.st_ino
+
+        magic, version, self.slot_count, self.article_count, self.data_size, self.data_mtime_ns, sources_offset = _HEADER.unpack_from(self.index, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"Not a news index: {index_path(news_path)}")
+        if not self.matches(mapped):
+            self.close()
+            raise ValueError(f"Index out of date: {index_path(news_path)}")
+        self.slots_offset = _HEADER.size
+        self.offsets_offset = self.slots_offset + self.slot_count * _SLOT.size
+
+        line_end = self.data.find(b"\n", sources_offset)
+        self.sources = json.loads(self.data[sources_offset:line_end].rstrip()[len(b'"sources":'):-1])
+
+    def matches(self, stat):
+        """
+        Whether stat describes the indexed (and mapped) version of the news file
+        """
+        return stat.st_ino == self.data_ino and stat.st_size == self.data_size and stat.st_mtime_ns == self.data_mtime_ns
+
+    def _line(self, offset, length=None):
+        end = offset + length if length is not None else self.data.find(b"\n", offset)
+        line = self.data[offset:end].rstrip()
+        return line[:-1] if line.endswith(b",") else line
+
+    def get(self, ticker):
+        """
+        The expanded company record, or None when the ticker is not in the file
+        """
+        key = ticker.encode('utf-8')
+        if len(key) > KEY_BYTES:
+            return news_store.find_company(self.news_path, ticker)
+
+        slot = _slot_of(key, self.slot_count)
+        while True:
+            stored, offset, length, _ = _SLOT.unpack_from(self.index, self.slots_offset + slot * _SLOT.size)
+            if length == 0:
+                return None
+            if stored.rstrip(b"\0") == key:
+                break
+            slot = (slot + 1) & (self.slot_count - 1)
+
+        _, record = next(iter(json.loads(b"{" + self._line(offset, length) + b"}").items()))
+        company = {}
+        for field, value in record.items():
+            if field == 'articles':
+                details = []
+                for row in value:
+                    (start,) = _OFFSET.unpack_from(self.index, self.offsets_offset + row * _OFFSET.size)
+                    details.append(news_store.expand_article(json.loads(self._line(start)), self.sources))
+                company['urls'] = [article['url'] for article in details]
+                company['article_details'] = details
+            else:
+                company[field] = value
+        return company
+
+    def close(self):
+        self.index.close()
+        self.data.close()
+
+
+def open_index(news_path, build=True):
+    """
+    The open index for a news file, (re)building it when missing or out of date
+
+    Returns:
+        NewsIndex: The index, or None when the file cannot be indexed (version 1, or read-only storage)
+    """
+    try:
+        stat = os.stat(news_path)
+    except OSError:
+        return None
+
+    with _lock:
+        index = _open_indexes.get(news_path)
+        if index is not None and index.matches(stat):
+            return index
+
+        index = None
+        try:
+            index = NewsIndex(news_path)
+        except (OSError, ValueError, struct.error):
+            if build:
+                try:
+                    if build_index(news_path) is not None:
+                        index = NewsIndex(news_path)
+                except (OSError, ValueError, struct.error):
+                    index = None
+
+        # A replaced index is not closed here: another thread may still be reading it
+        _open_indexes.pop(news_path, None)
+        if index is not None:
+            _open_indexes[news_path] = index
+        return index
+
+
+def lookup_company(news_path, ticker):
+    """
+    One company's expanded record through the index, falling back to streaming the file
+
+    Returns:
+        dict: The company record, or None when the ticker is not in the file
+    """
+    index = open_index(news_path)
+    if index is None:
+        return news_store.find_company(news_path, ticker)
+    return index.get(ticker)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the ticker index of a news file')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='Write <file>.idx')
+    build_parser.add_argument('--file', default=snapshots.NEWS_FILENAME)
+    get_parser = subparsers.add_parser('get', help='Look up one ticker')
+    get_parser.add_argument('ticker')
+    get_parser.add_argument('--file', default=snapshots.NEWS_FILENAME)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        path = build_index(args.file)
+        print(f"✅ Wrote {path}" if path else f"⚠️ {args.file} is a version 1 file; convert it with 'python news_store.py convert' first")
+    else:
+        company = lookup_company(args.file, args.ticker.upper())
+        if company is None:
+            print(f"❌ {args.ticker.upper()} not found")
+            exit(1)
+        print(json.dumps(company, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
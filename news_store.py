@@ -0,0 +1,616 @@
+"""
+Versioned storage for the news file (earnings_news_urls.json)
+
+Version 1 (no "schema_version" key) stores each company's articles twice: once as
+"urls" and once inside "article_details", pretty-printed. Version 2 stores every
+article once in a shared table and lets companies refer to it by row number:
+
+    {"schema_version":2,"earnings_week":"...","generated_at":"...","total_companies":57,
+    "sources":["Yahoo","SeekingAlpha",...],
+    "articles":[
+    ["<article id>",<source index>,<datetime>,"<headline>",<url or null>],
+    ...
+    ],
+    "companies":{
+    "EBF":{"earnings_date":"2025-09-22","earnings_day":"Monday","article_count":19,"articles":[0,1,...]},
+    ...
+    }}
+
+Source names are interned in "sources". A Finnhub URL is left out (null) when it is
+exactly https://finnhub.io/api/news?id=<article id>, because it can be rebuilt from the
+id. The file is compact JSON with one article or company per line, so it is still one
+valid JSON document.
+
+load_news_file() reads either version and always returns the expanded version 1
+shape, so callers do not need to know which one is on disk. For large files,
+iter_companies() streams one company at a time (articles are read by byte offset)
+and NewsWriter writes one company at a time, so neither holds the whole dataset.
+
+Usage:
+    python news_store.py convert [--file earnings_news_urls.json] [--to 2]
+    python news_store.py compare [--file earnings_news_urls.json]
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+from array import array
+
+import snapshots
+from articles import article_id, json_default, ArticleRecord, ArticleUrls, FINNHUB_NEWS_URL
+
+SCHEMA_VERSION = 2
+
+# Every version 2 file starts with these bytes
+_V2_PREFIX = b'{"schema_version":2'
+
+# Article fields kept in the fixed row columns
+_ARTICLE_KEYS = ('url', 'headline', 'source', 'datetime')
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=json_default)
+
+
+def schema_version(data):
+    """
+    Schema version of a parsed news file (files without the key are version 1)
+    """
+    return data.get('schema_version', 1) if isinstance(data, dict) else 1
+
+
+def _article_row(article, sources, source_index):
+    """
+    Table row for one article, interning its source name
+    """
+    source = article.get('source', 'Unknown')
+    if source not in source_index:
+        source_index[source] = len(sources)
+        sources.append(source)
+
+    identifier = article_id(article)
+    url = article.get('url')
+    row = [identifier, source_index[source], article.get('datetime'), article.get('headline', ''),
+           None if url == FINNHUB_NEWS_URL + identifier else url]
+    extra = {key: value for key, value in article.items() if key not in _ARTICLE_KEYS}
+    if extra:
+        row.append(extra)
+    return row
+
+
+def _compact_company(company, indices):
+    """
+    Company record with its articles replaced by row numbers (in the position "urls" had)
+    """
+    record = {}
+    for key, value in company.items():
+        if key == 'urls':
+            record['articles'] = indices
+        elif key != 'article_details':
+            record[key] = value
+    record.setdefault('articles', indices)
+    return record
+
+
+def compact_news(data):
+    """
+    Convert an expanded (version 1) news dict into the version 2 layout
+
+    Args:
+        data (dict): News file with companies holding "urls" and "article_details"
+
+    Returns:
+        dict: Version 2 news dict (header fields, sources, articles, companies)
+    """
+    sources = []
+    source_index = {}
+    rows = []
+    row_index = {}
+
+    compact = {"schema_version": SCHEMA_VERSION}
+    for key, value in data.items():
+        if key not in ('companies', 'schema_version'):
+            compact[key] = value
+
+    companies = {}
+    for ticker, company in data.get('companies', {}).items():
+        indices = []
+        for article in company.get('article_details', []):
+            row = _article_row(article, sources, source_index)
+
+            # The same article listed under several tickers is stored once
+            row_key = _dumps(row)
+            if row_key not in row_index:
+                row_index[row_key] = len(rows)
+                rows.append(row)
+            indices.append(row_index[row_key])
+        companies[ticker] = _compact_company(company, indices)
+
+    compact['sources'] = sources
+    compact['articles'] = rows
+    compact['companies'] = companies
+    return compact
+
+
+def expand_article(row, sources, records=False):
+    """
+    Article dict (url, headline, source, datetime) from a version 2 table row
+
+    With records=True an ArticleRecord is returned instead (unless the row carries extra fields).
+    """
+    url = row[4]
+    if records and len(row) == 5:
+        return ArticleRecord(FINNHUB_NEWS_URL + row[0] if url is None else url, row[3], sources[row[1]], row[2])
+    article = {
+        "url": FINNHUB_NEWS_URL + row[0] if url is None else url,
+        "headline": row[3],
+        "source": sources[row[1]],
+        "datetime": row[2]
+    }
+    if len(row) > 5:
+        article.update(row[5])
+    return article
+
+
+def expand_news(data):
+    """
+    Convert a parsed news file of either version into the expanded version 1 shape
+
+    Args:
+        data (dict): Parsed news file
+
+    Returns:
+        dict: News dict whose companies hold "urls" and "article_details"
+    """
+    if schema_version(data) < 2:
+        return data
+
+    sources = data.get('sources', [])
+    rows = data.get('articles', [])
+
+    expanded = {key: value for key, value in data.items() if key not in ('schema_version', 'sources', 'articles', 'companies')}
+    companies = {}
+    for ticker, record in data.get('companies', {}).items():
+        company = {}
+        for key, value in record.items():
+            if key == 'articles':
+                # Each company gets its own article dicts, as in a version 1 file
+                details = [expand_article(rows[index], sources) for index in value]
+                company['urls'] = [article['url'] for article in details]
+                company['article_details'] = details
+            else:
+                company[key] = value
+        companies[ticker] = company
+    expanded['companies'] = companies
+    return expanded
+
+
+def dumps_news(data):
+    """
+    Serialize a news dict (either version) as a version 2 file
+    """
+    if schema_version(data) < 2:
+        data = compact_news(data)
+
+    header = {key: value for key, value in data.items() if key not in ('sources', 'articles', 'companies')}
+    lines = [_dumps(header)[:-1] + ',', '"sources":' + _dumps(data['sources']) + ',', '"articles":[']
+    lines.append(',\n'.join(_dumps(row) for row in data['articles']))
+    lines.append('],')
+    lines.append('"companies":{')
+    lines.append(',\n'.join(f"{_dumps(ticker)}:{_dumps(record)}" for ticker, record in data['companies'].items()))
+    lines.append('}}')
+    return '\n'.join(lines) + '\n'
+
+
+class NewsWriter:
+    """
+    Write a version 2 news file one company at a time
+
+    Article rows and company records are spooled to two temp files as they are
+    added, so memory holds only the source dictionary and a 16-byte digest per
+    article. close() assembles the final file and renames it into place.
+
+        with NewsWriter("earnings_news_urls.json", {"earnings_week": week}) as writer:
+            for ticker, record in records:
+                writer.add_company(ticker, record)
+    """
+
+    def __init__(self, filename, header=None):
+        self.filename = filename
+        self.header = dict(header or {})
+        self.sources = []
+        self.article_count = 0
+        self.company_count = 0
+        self.url_count = 0
+        self._source_index = {}
+        self._row_index = {}
+
+        directory = os.path.dirname(filename) or "."
+        prefix = os.path.join(directory, f".{os.path.basename(filename)}.{os.getpid()}.{threading.get_ident()}")
+        self._articles_path = prefix + ".articles.tmp"
+        self._companies_path = prefix + ".companies.tmp"
+        self._articles = open(self._articles_path, 'w', encoding='utf-8')
+        self._companies = open(self._companies_path, 'w', encoding='utf-8')
+
+    def add_company(self, ticker, company):
+        """
+        Append one expanded company record (with "urls" / "article_details")
+        """
+        indices = []
+        for article in company.get('article_details', []):
+            row = _dumps(_article_row(article, self.sources, self._source_index))
+            key = hashlib.blake2b(row.encode('utf-8'), digest_size=16).digest()
+            index = self._row_index.get(key)
+            if index is None:
+                index = self._row_index[key] = self.article_count
+                self._articles.write((',\n' if self.article_count else '') + row)
+                self.article_count += 1
+            indices.append(index)
+
+        self._companies.write((',\n' if self.company_count else '') + f"{_dumps(ticker)}:{_dumps(_compact_company(company, indices))}")
+        self.company_count += 1
+        self.url_count += len(indices)
+
+    def _remove_spools(self):
+        for spool in (self._articles, self._companies):
+            spool.close()
+        for path in (self._articles_path, self._companies_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        """
+        Assemble the file atomically (temp file, fsync, rename)
+
+        Returns:
+            str: The filename
+        """
+        header = {"schema_version": SCHEMA_VERSION}
+        for key, value in self.header.items():
+            if key not in ('schema_version', 'sources', 'articles', 'companies'):
+                header[key] = value
+        header['total_companies'] = self.company_count
+
+        self._articles.close()
+        self._companies.close()
+        directory = os.path.dirname(self.filename) or "."
+        temp_path = os.path.join(directory, f".{os.path.basename(self.filename)}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(_dumps(header)[:-1] + ',\n"sources":' + _dumps(self.sources) + ',\n"articles":[\n')
+                with open(self._articles_path, 'r', encoding='utf-8') as spool:
+                    shutil.copyfileobj(spool, f)
+                f.write('\n],\n"companies":{\n')
+                with open(self._companies_path, 'r', encoding='utf-8') as spool:
+                    shutil.copyfileobj(spool, f)
+                f.write('\n}}\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.filename)
+        finally:
+            self._remove_spools()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return self.filename
+
+    def abort(self):
+        """
+        Drop everything written so far; the target file is left untouched
+        """
+        self._remove_spools()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def save_news_file(data, filename=snapshots.NEWS_FILENAME):
+    """
+    Atomically write a news dict (either version) to disk in the version 2 layout
+
+    Returns:
+        str: The filename
+    """
+    data = expand_news(data)
+    header = {key: value for key, value in data.items() if key != 'companies'}
+    with NewsWriter(filename, header) as writer:
+        for ticker, company in data.get('companies', {}).items():
+            writer.add_company(ticker, company)
+    return filename
+
+
+def load_news_file(path, expand=True):
+    """
+    Load a news file of either version
+
+    Args:
+        path (str): News file path
+        expand (bool): Return the expanded version 1 shape (default) instead of the file as stored
+
+    Returns:
+        dict: The news data, or None when the file does not exist
+    """
+    data = snapshots.read_json(path)
+    if data is None or not expand:
+        return data
+    return expand_news(data)
+
+
+def _is_v2(f):
+    """
+    Whether an open (binary) news file is in the version 2 layout; leaves f at the start
+    """
+    first = f.read(len(_V2_PREFIX))
+    f.seek(0)
+    return first == _V2_PREFIX
+
+
+def _read_layout(f):
+    """
+    Read a version 2 file up to its companies
+
+    Article lines are not parsed, only their byte offsets are kept (8 bytes each).
+
+    Returns:
+        tuple: (header, sources, article offsets); f is left at the first company line
+    """
+    header = json.loads(f.readline().rstrip()[:-1] + b'}')
+    header.pop('schema_version', None)
+    sources = json.loads(f.readline().rstrip()[len(b'"sources":'):-1])
+    f.readline()  # "articles":[
+
+    offsets = array('q')
+    while True:
+        offset = f.tell()
+        line = f.readline()
+        if not line or line.startswith(b'],'):
+            break
+        if line.strip():
+            offsets.append(offset)
+    f.readline()  # "companies":{
+    return header, sources, offsets
+
+
+def _company_lines(f):
+    """
+    (ticker, stored record) for every company line that follows _read_layout
+    """
+    for line in f:
+        line = line.rstrip()
+        if line == b'}}':
+            break
+        if not line:
+            continue
+        if line.endswith(b','):
+            line = line[:-1]
+        yield next(iter(json.loads(b'{' + line + b'}').items()))
+
+
+def _strip_articles(company):
+    return {key: value for key, value in company.items() if key not in ('urls', 'article_details')}
+
+
+class _ArticleReader:
+    """
+    Random access to a version 2 file's article rows by row number
+    """
+
+    def __init__(self, path, sources, offsets, records=False):
+        self.file = open(path, 'rb')
+        self.sources = sources
+        self.offsets = offsets
+        self.records = records
+
+    def row(self, index):
+        self.file.seek(self.offsets[index])
+        line = self.file.readline().rstrip()
+        return json.loads(line[:-1] if line.endswith(b',') else line)
+
+    def expand(self, record):
+        company = {}
+        for key, value in record.items():
+            if key == 'articles':
+                details = [expand_article(self.row(index), self.sources, self.records) for index in value]
+                company['urls'] = ArticleUrls(details) if self.records else [article['url'] for article in details]
+                company['article_details'] = details
+            else:
+                company[key] = value
+        return company
+
+    def close(self):
+        self.file.close()
+
+
+def read_header(path):
+    """
+    Header fields of a news file (everything except companies), without reading the companies
+
+    Returns:
+        dict: earnings_week, generated_at, total_companies, ... or None when the file does not exist
+    """
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        if _is_v2(f):
+            header = json.loads(f.readline().rstrip()[:-1] + b'}')
+            header.pop('schema_version', None)
+            return header
+        data = json.load(f)
+    return {key: value for key, value in data.items() if key != 'companies'}
+
+
+def iter_companies(path, articles=True, records=False):
+    """
+    Stream (ticker, company record) pairs from a news file of either version
+
+    For version 2 files only one company (and its articles) is in memory at a time.
+    Version 1 files have no line structure to stream, so they are loaded whole.
+
+    Args:
+        path (str): News file path
+        articles (bool): Include "urls" / "article_details"; without them no article row is read
+        records (bool): Articles as compact ArticleRecord objects (URLs built on access) instead of dicts
+
+    Yields:
+        tuple: (ticker, expanded company record)
+    """
+    if not path or not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        if not _is_v2(f):
+            for ticker, company in json.load(f).get('companies', {}).items():
+                if not articles:
+                    company = _strip_articles(company)
+                elif records:
+                    details = [ArticleRecord.from_dict(article) for article in company.get('article_details', [])]
+                    company = dict(company, urls=ArticleUrls(details), article_details=details)
+                yield ticker, company
+            return
+
+        header, sources, offsets = _read_layout(f)
+        reader = _ArticleReader(path, sources, offsets, records) if articles else None
+        try:
+            for ticker, record in _company_lines(f):
+                if reader is not None:
+                    yield ticker, reader.expand(record)
+                else:
+                    company = {key: value for key, value in record.items() if key != 'articles'}
+                    yield ticker, company
+        finally:
+            if reader is not None:
+                reader.close()
+
+
+def scan_offsets(path):
+    """
+    Byte positions of the parts of a version 2 file, for building an index over it
+
+    Returns:
+        dict: sources_offset, article_offsets (array of line starts) and companies
+            (list of (ticker, offset, length) of each company line), or None for a version 1 file
+    """
+    with open(path, 'rb') as f:
+        if not _is_v2(f):
+            return None
+        sources_offset = len(f.readline())
+        f.seek(0)
+        header, sources, offsets = _read_layout(f)
+
+        decoder = json.JSONDecoder()
+        companies = []
+        while True:
+            offset = f.tell()
+            line = f.readline().rstrip()
+            if not line or line == b'}}':
+                break
+            if line.endswith(b','):
+                line = line[:-1]
+            ticker, _ = decoder.raw_decode(line.decode('utf-8'))
+            companies.append((ticker, offset, len(line)))
+    return {"sources_offset": sources_offset, "article_offsets": offsets, "companies": companies}
+
+
+def find_company(path, ticker):
+    """
+    One company's expanded record, or None when it is not in the file
+    """
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        if not _is_v2(f):
+            return json.load(f).get('companies', {}).get(ticker)
+
+        header, sources, offsets = _read_layout(f)
+        for candidate, record in _company_lines(f):
+            if candidate == ticker:
+                reader = _ArticleReader(path, sources, offsets)
+                try:
+                    return reader.expand(record)
+                finally:
+                    reader.close()
+    return None
+
+
+def stream_news_json(path):
+    """
+    The expanded (version 1 shape) news document as JSON text chunks, one company at a time
+
+    Suitable for a streaming HTTP response.
+    """
+    header = read_header(path) or {}
+    yield '{' + ''.join(f"{_dumps(key)}:{_dumps(value)}," for key, value in header.items()) + '"companies":{'
+    for position, (ticker, company) in enumerate(iter_companies(path)):
+        yield (',' if position else '') + f"{_dumps(ticker)}:{_dumps(company)}"
+    yield '}}'
+
+
+def compare_versions(filename=snapshots.NEWS_FILENAME, repeat=20):
+    """
+    Size and parse time of a news file in both layouts
+
+    Returns:
+        dict: bytes and parse/load milliseconds per version
+    """
+    expanded = load_news_file(filename)
+    encoded = {
+        1: json.dumps(expanded, indent=2, ensure_ascii=False),
+        2: dumps_news(expanded)
+    }
+
+    report = {}
+    for version, text in encoded.items():
+        started = time.perf_counter()
+        for _ in range(repeat):
+            json.loads(text)
+        parse_ms = (time.perf_counter() - started) * 1000 / repeat
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            expand_news(json.loads(text))
+        load_ms = (time.perf_counter() - started) * 1000 / repeat
+
+        report[version] = {"bytes": len(text.encode('utf-8')), "parse_ms": parse_ms, "load_ms": load_ms}
+    report["identical"] = expand_news(json.loads(encoded[2])) == expanded
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert or compare news file schema versions')
+    parser.add_argument('command', choices=('convert', 'compare'))
+    parser.add_argument('--file', default=snapshots.NEWS_FILENAME, help=f'News file (default: {snapshots.NEWS_FILENAME})')
+    parser.add_argument('--to', type=int, default=SCHEMA_VERSION, choices=(1, 2), help='Target version for convert (default: 2)')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        data = load_news_file(args.file)
+        if data is None:
+            print(f"❌ {args.file} not found")
+            exit(1)
+        if args.to == 2:
+            save_news_file(data, args.file)
+        else:
+            snapshots.atomic_write_json(args.file, data)
+        print(f"✅ Wrote {args.file} as schema version {args.to}")
+    else:
+        report = compare_versions(args.file)
+        for version in (1, 2):
+            entry = report[version]
+            print(f"v{version}: {entry['bytes']:>9,} bytes  parse {entry['parse_ms']:6.2f} ms  load {entry['load_ms']:6.2f} ms")
+        print(f"Size: {report[2]['bytes'] / report[1]['bytes']:.0%} of v1, "
+              f"parse: {report[2]['parse_ms'] / report[1]['parse_ms']:.0%}, "
+              f"load (with expansion): {report[2]['load_ms'] / report[1]['load_ms']:.0%}")
+        print(f"Round trip identical: {report['identical']}")
+
+
+if __name__ == "__main__":
+    main()
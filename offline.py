@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Offline re-analysis from stored data
+
+Rebuilds the calendar grouping, summaries and sentiment ranking from a stored
+snapshot and the local caches only. Neither main.py nor LLM.py is imported, so
+no API key is needed and nothing touches the network. Useful for demos,
+debugging and re-ranking after a scoring change.
+
+Scores are taken, per company, from the first source that has one:
+
+    headlines  aggregate of cached per-headline scores (headline_sentiment_cache.json)
+    stored     the score stored in the snapshot's sentiment file
+    local      local_scorer (always available)
+
+Usage:
+    python offline.py [--generation N] [--source auto|headlines|stored|local] [--publish]
+"""
+
+import argparse
+from datetime import datetime
+
+import snapshots
+import store_lock
+import news_store
+import headline_cache
+import text_workers
+from local_scorer import score_company
+from prompts import HEADLINE_PROMPT_VERSION
+
+SCORE_SOURCES = ("headlines", "stored", "local")
+
+# Share of a company's headlines that must be cached before the cached scores are used
+MIN_HEADLINE_COVERAGE = 0.5
+
+
+def rebuild_calendar(companies):
+    """
+    Group stored companies by earnings day, in the same shape as main.get_earnings_data
+
+    Returns:
+        dict: "YYYY-MM-DD" -> {"symbols": [...], "count": n}
+    """
+    earnings_by_day = {}
+    for ticker, company_data in companies.items():
+        day = earnings_by_day.setdefault(company_data.get('earnings_date', 'unknown'), {'symbols': [], 'count': 0})
+        day['symbols'].append(ticker)
+        day['count'] += 1
+    return dict(sorted(earnings_by_day.items()))
+
+
+def rebuild_summary(news_file, earnings_by_day):
+    """
+    Summary in the same shape as main.format_earnings_summary
+    """
+    daily_breakdown = {}
+    for date_str, day_data in earnings_by_day.items():
+        try:
+            day_name = datetime.strptime(date_str, '%Y-%m-%d').strftime('%A')
+        except ValueError:
+            day_name = date_str
+        daily_breakdown[date_str] = {'day_name': day_name, 'symbols': day_data['symbols'], 'count': day_data['count']}
+
+    return {
+        'total_companies': sum(day['count'] for day in earnings_by_day.values()),
+        'week_range': news_file.get('earnings_week') or f"{min(earnings_by_day)} to {max(earnings_by_day)}",
+        'daily_breakdown': daily_breakdown,
+        'all_symbols': [symbol for day in earnings_by_day.values() for symbol in day['symbols']]
+    }
+
+
+def score_from_headlines(ticker, company_data, cache):
+    """
+    Recency-weighted score from cached headline scores, or None when too few are cached
+    """
+    articles = company_data.get('article_details', [])
+    if not articles:
+        return None
+    cached, _ = headline_cache.split_cached(articles, cache, ticker, HEADLINE_PROMPT_VERSION)
+    if len(cached) < MIN_HEADLINE_COVERAGE * len(articles):
+        return None
+    return {
+        "ticker": ticker,
+        "sentiment_score": headline_cache.aggregate_scores(cached),
+        "articles_analyzed": len(cached),
+        "total_articles_available": len(articles),
+        "scored_by": "headlines"
+    }
+
+
+def score_offline(companies, stored_results, sources=SCORE_SOURCES, cache=None):
+    """
+    Score every company from stored data only
+
+    Args:
+        companies (dict): ticker -> company record
+        stored_results (dict): ticker -> stored sentiment result
+        sources (tuple): Score sources to try, in order
+        cache (dict): Headline cache (loaded from disk when None)
+
+    Returns:
+        list: Sentiment results, each with "score_source"
+    """
+    if cache is None and "headlines" in sources:
+        cache = headline_cache.load_cache()
+
+    # Lexicon scores are prepared ahead in the text worker pool, except for tickers a stored result settles first
+    local_first = "local" in sources and ("stored" not in sources or sources.index("local") < sources.index("stored"))
+    skip = set() if local_first else set(stored_results)
+    prepared_companies = text_workers.prepared_stream(companies.items(), local="local" in sources, prompt=False, skip=skip)
+
+    results = []
+    for ticker, company_data, prepared in prepared_companies:
+        result = None
+        for source in sources:
+            if source == "headlines":
+                result = score_from_headlines(ticker, company_data, cache)
+            elif source == "stored" and ticker in stored_results:
+                result = dict(stored_results[ticker])
+            elif source == "local":
+                local = (prepared or {}).get("local") or score_company(company_data)
+                result = {
+                    "ticker": ticker,
+                    "sentiment_score": local['sentiment_score'],
+                    "articles_analyzed": local['positive_headlines'] + local['negative_headlines'] + local['neutral_headlines'],
+                    "total_articles_available": len(company_data.get('article_details', [])),
+                    "scored_by": "local",
+                    "local_confidence": local['confidence']
+                }
+            if result is not None:
+                result["score_source"] = source
+                break
+        if result is None:
+            result = {"ticker": ticker, "sentiment_score": 0, "articles_analyzed": 0, "scored_by": "none", "score_source": "none"}
+        results.append(result)
+    return results
+
+
+def run_offline_analysis(generation=None, source="auto", publish=False):
+    """
+    Rebuild calendar grouping, summaries and scores from a stored snapshot without any network access
+
+    Args:
+        generation (int): Snapshot generation to read (default: current)
+        source (str): "auto" (headlines, then stored, then local) or a single score source
+        publish (bool): Publish the rebuilt scores as a new snapshot generation
+
+    Returns:
+        dict: success, error, earnings_data, sentiment_results (ticker -> result), generation
+    """
+    results = {"success": False, "error": None, "earnings_data": None, "sentiment_results": None, "generation": None}
+
+    paths = snapshots.resolve(generation)
+    news_file = news_store.load_news_file(paths["news_path"])
+    if news_file is None:
+        results["error"] = f"No stored news data at {paths['news_path']}"
+        print(f"❌ {results['error']}")
+        return results
+
+    companies = news_file.get('companies', {})
+    sentiment_file = snapshots.read_json(paths["sentiment_path"]) or {}
+    stored_results = {result['ticker']: result for result in sentiment_file.get('sentiment_results', [])}
+
+    earnings_by_day = rebuild_calendar(companies)
+    formatted_summary = rebuild_summary(news_file, earnings_by_day)
+    results["earnings_data"] = formatted_summary
+
+    print(f"📦 Offline analysis of snapshot generation {paths['generation']} (no network)")
+    print(f"Earnings for week: {formatted_summary['week_range']}")
+    print(f"Companies with stored news: {formatted_summary['total_companies']}")
+
+    print("\n" + "="*80)
+    print("DAILY BREAKDOWN WITH NEWS ARTICLE COUNTS")
+    print("="*80)
+    for date_str, day in formatted_summary['daily_breakdown'].items():
+        articles = sum(companies[symbol].get('article_count', 0) for symbol in day['symbols'])
+        print(f"\n{day['day_name']} ({date_str}): {day['count']} companies, {articles} articles")
+        for symbol in day['symbols']:
+            print(f"  {symbol}: {companies[symbol].get('article_count', 0)} articles")
+
+    sources = SCORE_SOURCES if source == "auto" else (source,)
+    sentiment_results = score_offline(companies, stored_results, sources)
+    results["sentiment_results"] = {result['ticker']: result for result in sentiment_results}
+
+    counts = {}
+    for result in sentiment_results:
+        counts[result["score_source"]] = counts.get(result["score_source"], 0) + 1
+
+    print("\n" + "="*80)
+    print("OFFLINE SENTIMENT RANKING")
+    print("="*80)
+    for result in sorted(sentiment_results, key=lambda r: r['sentiment_score'], reverse=True):
+        changed = ""
+        stored = stored_results.get(result['ticker'])
+        if stored and stored.get('sentiment_score') != result['sentiment_score']:
+            changed = f" (stored {stored.get('sentiment_score'):+d})"
+        print(f"  {result['ticker']:6s} {result['sentiment_score']:+3d}  [{result['score_source']}]{changed}")
+    print(f"\n📊 Score sources: " + ", ".join(f"{name} {count}" for name, count in counts.items()))
+
+    if publish:
+        sentiment_filename = snapshots.atomic_write_json(snapshots.SENTIMENT_FILENAME, {
+            "analysis_date": news_file.get('generated_at'),
+            "earnings_week": news_file.get('earnings_week'),
+            "total_companies_analyzed": len(sentiment_results),
+            "sentiment_results": sentiment_results,
+            "offline": True
+        })
+        # Only rescored tickers are new observations; copied stored scores are already in the history
+        rescored = [result['ticker'] for result in sentiment_results if result['score_source'] not in ("stored", "none")]
+        results["generation"] = snapshots.publish(paths["news_path"], sentiment_filename, note=f"offline re-analysis ({source})",
+                                                  history_tickers=rescored)
+
+    results["success"] = True
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-analyze stored data offline (no API calls)')
+    parser.add_argument('--generation', type=int, help='Snapshot generation to read (default: current)')
+    parser.add_argument('--source', default='auto', choices=('auto',) + SCORE_SOURCES, help='Where scores come from (default: auto)')
+    parser.add_argument('--publish', action='store_true', help='Publish the rebuilt scores as a new snapshot generation')
+    args = parser.parse_args()
+    store_lock.hold_for_process()
+
+    result = run_offline_analysis(generation=args.generation, source=args.source, publish=args.publish)
+    if not result["success"]:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Report prompt tokens per company for every company prompt template
+
+Renders each template in prompts.PROMPT_TEMPLATES["company"] for every company in
+a stored earnings_news_urls.json and prints per-company token counts plus the
+total saving of each template against the baseline version.
+
+Usage:
+    python prompt_token_report.py [--file earnings_news_urls.json] [--baseline v1]
+"""
+
+import argparse
+import re
+
+import news_store
+from prompts import PROMPT_TEMPLATES, build_company_prompt
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _ENCODING = None
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text):
+    """
+    Count tokens with tiktoken when installed, otherwise a word/punctuation approximation
+    """
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    # Long words are split into several sub-word tokens by BPE tokenizers
+    return sum(1 + len(token) // 8 for token in _TOKEN_RE.findall(text))
+
+
+def message_tokens(messages):
+    """
+    Tokens for a list of chat messages (content plus a small per-message overhead)
+    """
+    return sum(count_tokens(message["content"]) + 4 for message in messages)
+
+
+def build_report(companies, versions):
+    """
+    Token count per company for each template version
+
+    Returns:
+        dict: ticker -> {version: tokens}
+    """
+    report = {}
+    for ticker, company_data in companies.items():
+        row = {}
+        for version in versions:
+            prompt = build_company_prompt(company_data, ticker, version=version)
+            row[version] = message_tokens(prompt["messages"]) if prompt["messages"] else 0
+        report[ticker] = row
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare prompt template token usage over stored news data')
+    parser.add_argument('--file', default='earnings_news_urls.json', help='News data file (default: earnings_news_urls.json)')
+    parser.add_argument('--baseline', default='v1', help='Template version to compare against (default: v1)')
+    parser.add_argument('--per-company', action='store_true', help='Print token counts for every company')
+    args = parser.parse_args()
+
+    companies = (news_store.load_news_file(args.file) or {}).get('companies', {})
+
+    versions = list(PROMPT_TEMPLATES["company"])
+    report = build_report(companies, versions)
+
+    print(f"Token counter: {'tiktoken cl100k_base' if _ENCODING is not None else 'approximate (install tiktoken for exact counts)'}")
+    print(f"Companies: {len(report)}")
+
+    if args.per_company:
+        print("\n" + "ticker".ljust(8) + "".join(version.rjust(10) for version in versions))
+        for ticker, row in sorted(report.items(), key=lambda item: -item[1].get(args.baseline, 0)):
+            print(ticker.ljust(8) + "".join(str(row[version]).rjust(10) for version in versions))
+
+    baseline_total = sum(row.get(args.baseline, 0) for row in report.values())
+    print("\n" + "="*60)
+    print("TOKENS PER TEMPLATE")
+    print("="*60)
+    for version in versions:
+        total = sum(row[version] for row in report.values())
+        average = total / len(report) if report else 0
+        saving = (1 - total / baseline_total) * 100 if baseline_total else 0
+        print(f"  {version}: {total} tokens total, {average:.0f} per company, {saving:.1f}% saved vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
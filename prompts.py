@@ -0,0 +1,195 @@
+"""
+Versioned prompt templates for sentiment analysis
+
+Every prompt sent to the LLM is built from a template in PROMPT_TEMPLATES. The
+active versions are chosen with the SENTIMENT_PROMPT_VERSION and
+HEADLINE_PROMPT_VERSION environment variables, so switching to a leaner template
+(and back) needs no code change. Cached scores are keyed by template version.
+
+Run prompt_token_report.py to compare token usage of the templates over a
+stored earnings_news_urls.json.
+"""
+
+import os
+
+from dedup import collapse_articles
+
+PROMPT_TEMPLATES = {
+    "company": {
+        # Original prompt: long system message plus full scoring instructions in every request
+        "v1": {
+            "system": """You are an expert financial news sentiment analyst. Analyze sentiment based on news headlines and sources.
+
+You must provide nuanced, realistic sentiment scores that reflect the actual tone of the headlines. Do NOT default to neutral (0) unless the headlines truly have no sentiment bias.
+
+ANALYSIS PROCESS:
+1. Read every headline carefully for sentiment indicators
+2. Identify positive/negative keywords and phrases
+3. Consider the overall tone and implications
+4. Weight based on source credibility and article volume
+5. Provide a meaningful sentiment score that reflects reality
+
+SCORING REQUIREMENTS:
+- Use the full range from -10 to +10
+- Be specific and granular in your scoring
+- Positive headlines should get positive scores
+- Negative headlines should get negative scores
+- Only use 0 for truly neutral or perfectly balanced coverage
+
+Return only a single integer from -10 to +10.""",
+            "user": """
+COMPANY FOR SENTIMENT ANALYSIS: {ticker}
+EARNINGS DATE: {earnings_date}
+EARNINGS DAY: {earnings_day}
+TOTAL ARTICLES: {total_articles}
+DISTINCT STORIES: {distinct_stories}
+
+Analyze the sentiment toward {ticker} based on these {total_articles} news article headlines (near-duplicate copies are grouped on one line with their count):
+
+{articles_text}
+
+ANALYSIS INSTRUCTIONS:
+1. Analyze EVERY headline for sentiment indicators toward {ticker}
+2. Look for positive keywords: growth, beat, strong, up, gains, bullish, upgrade, buy, outperform, exceeds, positive, rally, surge
+3. Look for negative keywords: loss, miss, down, decline, falls, bearish, downgrade, sell, underperform, concerns, drops, plunge
+4. Consider source credibility (Yahoo, MarketWatch, SeekingAlpha more reliable than unknown sources)
+5. Weight earnings-related news more heavily than general market news
+6. Consider overall volume of coverage (more articles = more market attention)
+
+SENTIMENT SCORING GUIDELINES:
+- Very Positive (+8 to +10): Multiple positive headlines, earnings beats, strong growth mentions, bullish analyst coverage
+- Positive (+4 to +7): More positive than negative headlines, meeting expectations, favorable trends
+- Slightly Positive (+1 to +3): Mild positive indicators, stable outlook, neutral-to-good news
+- Neutral (0): Mixed headlines that balance out, or purely factual reporting
+- Slightly Negative (-1 to -3): Mild concerns, cautious outlook, some disappointing news
+- Negative (-4 to -7): More negative headlines, missing expectations, bearish sentiment
+- Very Negative (-8 to -10): Predominantly negative headlines, major problems, very poor outlook
+
+IMPORTANT: Analyze based ONLY on the headlines provided. Return only a single integer from -10 to +10.
+""",
+            "story": "{number}. {headline} ({source})",
+            "cluster": "{number}. {headline} ({sources}; {count} similar articles)"
+        },
+        # Compact prompt: scoring rules stated once in the system message, no repeated keyword lists
+        "v2": {
+            "system": """Rate news sentiment toward one company from its headlines.
+Scale: +8..+10 clearly bullish (beats, upgrades, strong growth); +4..+7 mostly positive; +1..+3 mildly positive; 0 balanced or purely factual; -1..-3 mild concerns; -4..-7 mostly negative; -8..-10 clearly bearish.
+Use the full range and avoid 0 unless coverage is truly neutral. Weight earnings news and Yahoo/MarketWatch/SeekingAlpha more; more coverage means more attention.
+Reply with one integer from -10 to +10 only.""",
+            "user": """{ticker} (earnings {earnings_date}), {total_articles} articles, {distinct_stories} stories (xN = similar copies):
+{articles_text}""",
+            "story": "{number}. {headline} ({source})",
+            "cluster": "{number}. {headline} ({sources} x{count})"
+        }
+    },
+    "headline": {
+        "v1": {
+            "system": "You are an expert financial news sentiment analyst. Score each headline's sentiment toward the given company from -10 (very negative) to +10 (very positive). Reply with one line per headline in the form '<number>: <score>' and nothing else.",
+            "user": """COMPANY: {ticker}
+
+HEADLINES:
+{headlines_text}""",
+            "story": "{number}. {headline} ({source})"
+        }
+    }
+}
+
+COMPANY_PROMPT_VERSION = os.getenv("SENTIMENT_PROMPT_VERSION", "v1")
+HEADLINE_PROMPT_VERSION = os.getenv("HEADLINE_PROMPT_VERSION", "v1")
+
+
+def get_template(kind, version):
+    """
+    Look up a prompt template, failing loudly on unknown versions
+    """
+    try:
+        return PROMPT_TEMPLATES[kind][version]
+    except KeyError:
+        available = ", ".join(PROMPT_TEMPLATES.get(kind, {}))
+        raise ValueError(f"Unknown {kind} prompt version '{version}'. Available: {available}")
+
+
+def format_headlines(articles, version=None):
+    """
+    Numbered headline list for the headline-level prompt
+    """
+    template = get_template("headline", version or HEADLINE_PROMPT_VERSION)
+    return "\n".join(template["story"].format(number=i, headline=article.get('headline'), source=article.get('source', 'Unknown source'))
+                     for i, article in enumerate(articles, 1))
+
+
+def render_messages(kind, version, **fields):
+    """
+    Build the chat messages for a template
+
+    Returns:
+        list: [system message, user message] ready for chat.completions.create
+    """
+    template = get_template(kind, version)
+    return [
+        {"role": "system", "content": template["system"]},
+        {"role": "user", "content": template["user"].format(**fields)}
+    ]
+
+
+def valid_articles(company_data):
+    """
+    Articles of a company record that have a usable headline
+    """
+    articles = []
+    for article in company_data.get('article_details', []):
+        headline = article.get('headline', 'No headline')
+        if headline and headline != 'No headline':
+            articles.append({
+                'headline': headline,
+                'source': article.get('source', 'Unknown source'),
+                'datetime': article.get('datetime', 0)
+            })
+    return articles
+
+
+def build_company_prompt(company_data, ticker, version=None, collapse_duplicates=True):
+    """
+    Render the company-level sentiment prompt
+
+    Args:
+        company_data (dict): Company record from earnings_news_urls.json
+        ticker (str): Ticker symbol
+        version (str): Template version (default: COMPANY_PROMPT_VERSION)
+        collapse_duplicates (bool): Group near-duplicate headlines on one line
+
+    Returns:
+        dict: messages, version, total_articles and distinct_stories (messages is None when there are no valid headlines)
+    """
+    version = version or COMPANY_PROMPT_VERSION
+    articles = valid_articles(company_data)
+    if not articles:
+        return {"messages": None, "version": version, "total_articles": 0, "distinct_stories": 0}
+
+    if collapse_duplicates:
+        stories = collapse_articles(articles)
+    else:
+        stories = [{"article": article, "count": 1, "sources": [article['source']]} for article in articles]
+
+    # Story lines use the template's own format (keeps the volume signal for grouped copies)
+    template = get_template("company", version)
+    articles_list = []
+    for number, story in enumerate(stories, 1):
+        article = story['article']
+        if story['count'] > 1:
+            articles_list.append(template["cluster"].format(
+                number=number, headline=article['headline'], sources=", ".join(story['sources']), count=story['count']))
+        else:
+            articles_list.append(template["story"].format(
+                number=number, headline=article['headline'], source=article['source']))
+
+    messages = render_messages(
+        "company", version,
+        ticker=ticker,
+        earnings_date=company_data.get('earnings_date', 'Unknown'),
+        earnings_day=company_data.get('earnings_day', 'Unknown'),
+        total_articles=len(articles),
+        distinct_stories=len(stories),
+        articles_text="\n".join(articles_list)
+    )
+    return {"messages": messages, "version": version, "total_articles": len(articles), "distinct_stories": len(stories)}
@@ -0,0 +1,55 @@
+"""
+Token-bucket rate limiting shared by concurrent API callers
+
+Sequential code paces Finnhub with fixed sleeps; concurrent code (batch and
+backfill runs) takes a token from the shared finnhub_limiter before every call
+instead, so any number of worker threads together stay under the free-tier limit.
+
+Every LLM request takes a token from groq_limiter (in LLM.py), so concurrent
+batch, backfill and shard workers share one Groq request budget.
+"""
+
+import os
+import time
+import threading
+
+# Finnhub free tier allows 60 calls per minute; stay a little under it
+FINNHUB_CALLS_PER_MINUTE = float(os.getenv("FINNHUB_CALLS_PER_MINUTE", "55"))
+
+# Groq free tier allows 30 requests per minute for the sentiment model
+GROQ_CALLS_PER_MINUTE = float(os.getenv("GROQ_CALLS_PER_MINUTE", "28"))
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: `rate_per_minute` tokens per minute, at most `burst` saved up
+    """
+
+    def __init__(self, rate_per_minute, burst=5):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_per_second)
+        self.updated = now
+
+    def acquire(self):
+        """
+        Block until a call is allowed, then consume one token
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate_per_second
+            time.sleep(wait)
+
+
+finnhub_limiter = RateLimiter(FINNHUB_CALLS_PER_MINUTE)
+groq_limiter = RateLimiter(GROQ_CALLS_PER_MINUTE)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Trend and momentum analytics over the sentiment history
+
+For every ticker in the history window this computes, for the whole universe at
+once with NumPy array operations (no per-ticker Python loop):
+
+    sentiment_delta   latest score minus the previous recorded score
+    moving_average    mean of the last MOVING_AVERAGE_WINDOW scores
+    zscore            latest score against the ticker's own earlier scores
+    score_rank        cross-sectional rank of the latest score (1 = most positive)
+    delta_rank        rank of the delta (1 = biggest improvement)
+    mover_rank        rank of the absolute delta (1 = biggest move either way)
+
+Results are tied to a snapshot generation (history up to that generation) and
+cached in memory and under history/analytics, so serving them with
+/api/companies is a dictionary lookup. The cache is keyed on the history version
+too, so entries appended later (e.g. a backfilled week) are picked up.
+
+Usage:
+    python sentiment_analytics.py movers [--top 10] [--generation N]
+"""
+
+import os
+import argparse
+import threading
+from datetime import datetime
+
+import snapshots
+import sentiment_history
+
+ANALYTICS_DIR = os.path.join("history", "analytics")
+
+# History considered for a generation, and the moving average length in observations
+DEFAULT_DAYS = 90
+MOVING_AVERAGE_WINDOW = 5
+
+# Generations kept in memory
+_CACHE_SIZE = 4
+_cache = {}
+_lock = threading.Lock()
+
+
+def compute_trends(entries, window=MOVING_AVERAGE_WINDOW):
+    """
+    Per-ticker trend metrics from history entries
+
+    Entries are sorted into one contiguous run per ticker; every metric is then an
+    array operation over all runs at once (cumulative sums for the moving average,
+    reduceat for the baselines).
+
+    Args:
+        entries (list): sentiment_history entries (ts, ticker, sentiment_score, ...)
+        window (int): Moving average length in observations
+
+    Returns:
+        dict: ticker -> metrics (None where a metric is undefined, e.g. a first observation has no delta)
+    """
+    if not entries:
+        return {}
+
+    import numpy as np
+    import pandas as pd
+
+    codes, tickers = pd.factorize(np.array([entry['ticker'] for entry in entries], dtype=object))
+    timestamps = np.array([entry['ts'] for entry in entries], dtype=np.float64)
+    raw_scores = np.array([entry['sentiment_score'] for entry in entries], dtype=np.float64)
+
+    order = np.lexsort((timestamps, codes))
+    codes, timestamps, scores = codes[order], timestamps[order], raw_scores[order]
+
+    count = len(scores)
+    index = np.arange(count)
+    starts = np.r_[True, codes[1:] != codes[:-1]]
+    ends = np.r_[starts[1:], True]
+    start_index = np.maximum.accumulate(np.where(starts, index, 0))
+
+    previous = np.r_[np.nan, scores[:-1]]
+    previous[starts] = np.nan
+
+    # Moving average over the last `window` observations of the same ticker
+    cumulative = np.r_[0.0, np.cumsum(scores)]
+    window_start = np.maximum(index + 1 - window, start_index)
+    moving_average = (cumulative[index + 1] - cumulative[window_start]) / (index + 1 - window_start)
+
+    # Baseline = every observation of the ticker but the latest one
+    group_starts = np.flatnonzero(starts)
+    sizes = np.diff(np.r_[group_starts, count])
+    latest = scores[ends]
+    baseline_count = sizes - 1
+    baseline_sum = np.add.reduceat(scores, group_starts) - latest
+    baseline_squares = np.add.reduceat(scores * scores, group_starts) - latest * latest
+    with np.errstate(invalid='ignore', divide='ignore'):
+        baseline_mean = baseline_sum / baseline_count
+        variance = (baseline_squares - baseline_sum * baseline_mean) / (baseline_count - 1)
+        spread = np.sqrt(np.where(variance > 1e-12, variance, np.nan))
+        zscore = (latest - baseline_mean) / spread
+
+    delta = latest - previous[ends]
+    score_rank = pd.Series(latest).rank(ascending=False, method='min').to_numpy()
+    delta_rank = pd.Series(delta).rank(ascending=False, method='min').to_numpy()
+    mover_rank = pd.Series(np.abs(delta)).rank(ascending=False, method='min').to_numpy()
+
+    integral = bool(np.all(raw_scores == np.round(raw_scores)))
+
+    def values(array, as_int=False, digits=None):
+        if digits is not None:
+            array = np.round(array, digits)
+        return [None if value != value else (int(value) if as_int else value) for value in array.tolist()]
+
+    columns = {
+        "sentiment_score": values(latest, integral),
+        "previous_score": values(previous[ends], integral),
+        "sentiment_delta": values(delta, integral),
+        "moving_average": values(moving_average[ends], digits=3),
+        "zscore": values(zscore, digits=3),
+        "observations": sizes.tolist(),
+        "score_rank": values(score_rank, True),
+        "delta_rank": values(delta_rank, True),
+        "mover_rank": values(mover_rank, True),
+        "last_recorded": timestamps[ends].tolist()
+    }
+    names = tickers[codes[ends]]
+    return {ticker: dict(zip(columns, row)) for ticker, row in zip(names, zip(*columns.values()))}
+
+
+def _cache_path(generation, analytics_dir=ANALYTICS_DIR):
+    return os.path.join(analytics_dir, f"trends-gen-{generation:06d}.json")
+
+
+def _history_for(generation, days, snapshot_dir, history_dir):
+    """
+    History entries visible to a generation: recorded by it or earlier, within `days` of its publish time
+    """
+    manifest = snapshots.load_manifest(generation, snapshot_dir) or {}
+    published_at = manifest.get('published_at')
+    end = datetime.fromisoformat(published_at).timestamp() if published_at else datetime.now().timestamp()
+    # Its own entries are appended right after the rename, a moment after published_at
+    entries = sentiment_history.query(end - days * 86400, end + 3600, history_dir=history_dir)
+    return [entry for entry in entries
+            if (entry.get('generation') <= generation if entry.get('generation') is not None else entry['ts'] <= end)]
+
+
+def trends_for_generation(generation=None, days=DEFAULT_DAYS, snapshot_dir=snapshots.SNAPSHOT_DIR,
+                          history_dir=sentiment_history.HISTORY_DIR, analytics_dir=ANALYTICS_DIR):
+    """
+    Trend metrics as of a snapshot generation, computed once per generation and history version
+
+    Args:
+        generation (int): Snapshot generation (default: the current one)
+        days (int): History window before the generation was published
+
+    Returns:
+        dict: ticker -> metrics (see compute_trends)
+    """
+    if generation is None:
+        generation = snapshots.current_generation(snapshot_dir)
+    if generation is None:
+        return compute_trends(sentiment_history.query(datetime.now().timestamp() - days * 86400,
+                                                      datetime.now().timestamp(), history_dir=history_dir))
+
+    version = sentiment_history.history_version(history_dir)
+    key = (generation, days, version)
+    with _lock:
+        cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    path = _cache_path(generation, analytics_dir)
+    stored = snapshots.read_json(path)
+    if stored is not None and stored.get('days') == days and stored.get('history_version') == version:
+        trends = stored['trends']
+    else:
+        trends = compute_trends(_history_for(generation, days, snapshot_dir, history_dir))
+        os.makedirs(analytics_dir, exist_ok=True)
+        snapshots.atomic_write_json(path, {"generation": generation, "days": days, "history_version": version,
+                                           "computed_at": datetime.now().isoformat(), "trends": trends}, indent=None)
+
+    with _lock:
+        _cache[key] = trends
+        while len(_cache) > _CACHE_SIZE:
+            _cache.pop(next(iter(_cache)))
+    return trends
+
+
+def top_movers(trends, top=10, direction=None):
+    """
+    Tickers with the largest sentiment moves
+
+    Args:
+        trends (dict): Output of trends_for_generation
+        top (int): How many tickers
+        direction (str): "up", "down" or None for either way
+
+    Returns:
+        list: (ticker, metrics) pairs, biggest move first
+    """
+    moved = [(ticker, metrics) for ticker, metrics in trends.items() if metrics['sentiment_delta'] is not None]
+    if direction == 'up':
+        moved = [item for item in moved if item[1]['sentiment_delta'] > 0]
+    elif direction == 'down':
+        moved = [item for item in moved if item[1]['sentiment_delta'] < 0]
+    moved.sort(key=lambda item: item[1]['mover_rank'])
+    return moved[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sentiment trends and movers from the history')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    movers_parser = subparsers.add_parser('movers', help='Biggest sentiment moves')
+    movers_parser.add_argument('--top', type=int, default=10, help='Tickers to show (default: 10)')
+    movers_parser.add_argument('--generation', type=int, help='Snapshot generation (default: current)')
+    movers_parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help=f'History window in days (default: {DEFAULT_DAYS})')
+    args = parser.parse_args()
+
+    trends = trends_for_generation(args.generation, days=args.days)
+    print(f"📈 Trends for {len(trends)} tickers")
+    for ticker, metrics in top_movers(trends, top=args.top):
+        zscore = f"{metrics['zscore']:+.2f}" if metrics['zscore'] is not None else "n/a"
+        print(f"  {metrics['mover_rank']:>3}. {ticker}: {metrics['previous_score']:+.0f} -> {metrics['sentiment_score']:+.0f} "
+              f"(MA {metrics['moving_average']:+.1f}, z {zscore})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Append-only sentiment history, partitioned by ISO week
+
+Every published sentiment file is appended to the history as one immutable
+segment: one JSON line per ticker with its score, the articles analyzed and the
+articles available, stamped with the publish time and snapshot generation.
+
+    history/sentiment/<ISO week>/seg-<first ms>-<last ms>-<tag>.jsonl
+
+The ISO week directory and the time range in a segment's name let queries skip
+every partition and segment outside the requested window without opening them.
+Segments are written to a temp file and renamed into place, so readers never see
+a half-written one.
+
+Usage:
+    python sentiment_history.py ticker MU [--days 90]
+    python sentiment_history.py at 2025-09-29T12:00 [--lookback-days 7]
+"""
+
+import os
+import re
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+
+import snapshots
+import news_store
+
+HISTORY_DIR = os.path.join("history", "sentiment")
+
+# Latest entry per ticker is looked up this far back from the requested time
+DEFAULT_LOOKBACK_DAYS = 7
+
+# Rewritten on every append; compaction skips dot names
+VERSION_FILE = ".version"
+
+_SEGMENT_RE = re.compile(r"^seg-(\d+)-(\d+)-[\w.-]+\.jsonl$")
+
+
+def week_partition(timestamp):
+    """
+    ISO week partition name (e.g. "2025-W39") for a unix timestamp
+    """
+    return datetime.fromtimestamp(timestamp).strftime("%G-W%V")
+
+
+def to_timestamp(value):
+    """
+    Unix seconds from a timestamp, datetime or ISO 8601 string
+    """
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def history_version(history_dir=HISTORY_DIR):
+    """
+    Version of the history's entries, changed by every append (0 before the first)
+
+    Derived data such as the trend metrics is cached against it.
+    """
+    try:
+        with open(os.path.join(history_dir, VERSION_FILE), 'r', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _dumps(entry):
+    return json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+
+
+def append_run(results, article_counts=None, generation=None, earnings_week=None, recorded_at=None, history_dir=HISTORY_DIR,
+               tag=None):
+    """
+    Append one run's per-ticker results as a new segment
+
+    Failed results (marked "error") are not observations and are left out.
+
+    Args:
+        results (list): Sentiment results (ticker, sentiment_score, articles_analyzed, ...)
+        article_counts (dict): ticker -> {"article_count", "earnings_date"} from the news file
+        generation (int): Snapshot generation the results were published in
+        earnings_week (str): Week label of the run
+        recorded_at (float): Unix time of the observation (default: now)
+        tag (str): Segment name suffix (default: the generation, else the process id); a fixed tag
+            makes re-appending the same run replace its segment
+
+    Returns:
+        str: Segment path, or None when there was nothing to record
+    """
+    written_at = time.time()
+    recorded_at = written_at if recorded_at is None else recorded_at
+    article_counts = article_counts or {}
+    lines = []
+    for result in results:
+        ticker = result.get('ticker')
+        if not ticker or result.get('error'):
+            continue
+        company = article_counts.get(ticker, {})
+        lines.append(_dumps({
+            "ts": round(recorded_at, 3),
+            "ticker": ticker,
+            "sentiment_score": result.get('sentiment_score', 0),
+            "articles_analyzed": result.get('articles_analyzed', 0),
+            "article_count": company.get('article_count', 0),
+            "earnings_date": company.get('earnings_date'),
+            "earnings_week": earnings_week,
+            "scored_by": result.get('scored_by'),
+            "generation": generation,
+            "written_at": written_at
+        }))
+    if not lines:
+        return None
+
+    millis = int(recorded_at * 1000)
+    if tag is None:
+        tag = f"g{generation}" if generation is not None else f"p{os.getpid()}"
+    directory = os.path.join(history_dir, week_partition(recorded_at))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"seg-{millis:013d}-{millis:013d}-{tag}.jsonl")
+    snapshots.atomic_write_text(path, "\n".join(lines) + "\n")
+    snapshots.atomic_write_text(os.path.join(history_dir, VERSION_FILE), f"{time.time_ns()}\n")
+    return path
+
+
+def record_generation(generation, tickers=None, snapshot_dir=snapshots.SNAPSHOT_DIR, history_dir=HISTORY_DIR):
+    """
+    Append the sentiment file of a published generation to the history
+
+    Results carried forward from an earlier run (marked stale) are skipped, they are
+    already in the history.
+
+    Args:
+        generation (int): Published generation
+        tickers (iterable): Only record these tickers (e.g. the ones a single-ticker refresh rescored)
+
+    Returns:
+        str: Segment path, or None when there was nothing to record
+    """
+    paths = snapshots.resolve(generation, snapshot_dir)
+    sentiment = snapshots.read_json(paths["sentiment_path"]) or {}
+    wanted = set(tickers) if tickers is not None else None
+    results = [result for result in sentiment.get('sentiment_results', [])
+               if not result.get('stale') and (wanted is None or result.get('ticker') in wanted)]
+    if not results:
+        return None
+
+    article_counts = {}
+    if os.path.exists(paths["news_path"]):
+        for ticker, company in news_store.iter_companies(paths["news_path"], articles=False):
+            article_counts[ticker] = company
+    return append_run(results, article_counts, generation, sentiment.get('earnings_week'), history_dir=history_dir)
+
+
+def _partitions(start, end, history_dir):
+    """
+    Existing week directories that can hold entries in [start, end]
+    """
+    names = []
+    day = datetime.fromtimestamp(start).replace(hour=0, minute=0, second=0, microsecond=0)
+    last = datetime.fromtimestamp(end)
+    while day <= last:
+        name = day.strftime("%G-W%V")
+        if name not in names:
+            names.append(name)
+        day += timedelta(days=7)
+    final = last.strftime("%G-W%V")
+    if final not in names:
+        names.append(final)
+    return [os.path.join(history_dir, name) for name in names if os.path.isdir(os.path.join(history_dir, name))]
+
+
+def partition_segments(directory):
+    """
+    Segments of one week directory, oldest first
+
+    Returns:
+        list: (first ms, last ms, path) tuples
+    """
+    found = []
+    for name in os.listdir(directory):
+        match = _SEGMENT_RE.match(name)
+        if match is not None:
+            found.append((int(match.group(1)), int(match.group(2)), os.path.join(directory, name)))
+    found.sort()
+    return found
+
+
+def merge_segments(paths, directory):
+    """
+    Write the entries of several segments of a week as one segment, then remove them
+
+    The merged segment is in place before its inputs go, so a reader that lists the
+    directory in between finds every entry (and query drops the duplicates).
+
+    Returns:
+        str: Merged segment path
+    """
+    entries = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            entries.extend(json.loads(line) for line in f if line.strip())
+    entries.sort(key=lambda entry: (entry['ts'], entry['ticker']))
+    entries = _unique(entries)
+
+    first, last = int(entries[0]['ts'] * 1000), int(entries[-1]['ts'] * 1000)
+    merged = os.path.join(directory, f"seg-{first:013d}-{last:013d}-m{len(paths)}-{os.getpid()}.jsonl")
+    snapshots.atomic_write_text(merged, "".join(_dumps(entry) + "\n" for entry in entries))
+    for path in paths:
+        if path != merged:
+            os.remove(path)
+    return merged
+
+
+def segments(start, end, history_dir=HISTORY_DIR):
+    """
+    Segment paths whose time range overlaps [start, end], oldest first
+
+    Returns:
+        list: (first ms, last ms, path) tuples
+    """
+    start_ms, end_ms = int(start * 1000), int(end * 1000)
+    found = []
+    for directory in _partitions(start, end, history_dir):
+        found.extend(segment for segment in partition_segments(directory) if segment[0] <= end_ms and segment[1] >= start_ms)
+    found.sort()
+    return found
+
+
+def query(start, end, tickers=None, history_dir=HISTORY_DIR):
+    """
+    History entries recorded in [start, end], oldest first
+
+    Args:
+        start: Range start (unix seconds, datetime or ISO string)
+        end: Range end (unix seconds, datetime or ISO string)
+        tickers (iterable): Only these tickers (default: all)
+
+    Returns:
+        list: Entry dicts (ts, ticker, sentiment_score, articles_analyzed, article_count, ...)
+    """
+    start, end = to_timestamp(start), to_timestamp(end)
+    wanted = set(ticker.upper() for ticker in tickers) if tickers is not None else None
+    # Cheap substring test before parsing; the lines are written with compact separators
+    needles = [f'"ticker":{json.dumps(ticker)}' for ticker in wanted] if wanted is not None and len(wanted) <= 8 else None
+
+    entries = []
+    read = set()
+    listing = segments(start, end, history_dir)
+    while listing:
+        vanished = False
+        for _, _, path in listing:
+            read.add(path)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if needles is not None and not any(needle in line for needle in needles):
+                            continue
+                        entry = json.loads(line)
+                        if start <= entry['ts'] <= end and (wanted is None or entry['ticker'] in wanted):
+                            entries.append(entry)
+            except FileNotFoundError:
+                vanished = True
+        # A segment merged away by compaction after listing: its entries are in the merged segment,
+        # which is written before its inputs are removed, so listing again finds it
+        listing = [item for item in segments(start, end, history_dir) if item[2] not in read] if vanished else []
+    entries.sort(key=lambda entry: entry['ts'])
+    return _unique(entries)
+
+
+def _unique(entries):
+    """
+    Keep one entry per (ts, ticker), the most recently written
+
+    Repeats are seen when a merged segment and its inputs are both read, and when
+    a backfilled week is recorded again after compaction merged its first recording.
+    """
+    position = {}
+    unique = []
+    for entry in entries:
+        key = (entry['ts'], entry['ticker'])
+        index = position.get(key)
+        if index is None:
+            position[key] = len(unique)
+            unique.append(entry)
+        elif entry.get('written_at', 0) >= unique[index].get('written_at', 0):
+            unique[index] = entry
+    return unique
+
+
+def ticker_history(ticker, days=90, end=None, history_dir=HISTORY_DIR):
+    """
+    One ticker's entries over the last `days` days (up to end, default now)
+    """
+    end = to_timestamp(end) if end is not None else time.time()
+    return query(end - days * 86400, end, tickers=[ticker], history_dir=history_dir)
+
+
+def scores_at(at, lookback_days=DEFAULT_LOOKBACK_DAYS, history_dir=HISTORY_DIR):
+    """
+    Latest entry of every ticker recorded at or before `at` (within lookback_days)
+
+    Returns:
+        dict: ticker -> entry
+    """
+    at = to_timestamp(at)
+    latest = {}
+    for entry in query(at - lookback_days * 86400, at, history_dir=history_dir):
+        latest[entry['ticker']] = entry
+    return latest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the sentiment history')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    ticker_parser = subparsers.add_parser('ticker', help='One ticker over the last N days')
+    ticker_parser.add_argument('ticker')
+    ticker_parser.add_argument('--days', type=int, default=90, help='Days back (default: 90)')
+    at_parser = subparsers.add_parser('at', help='Every ticker as of a point in time')
+    at_parser.add_argument('time', help='ISO time (e.g. 2025-09-29T12:00) or unix seconds')
+    at_parser.add_argument('--lookback-days', type=int, default=DEFAULT_LOOKBACK_DAYS,
+                           help=f'How far back to look for each ticker (default: {DEFAULT_LOOKBACK_DAYS})')
+    args = parser.parse_args()
+
+    if args.command == 'ticker':
+        entries = ticker_history(args.ticker, days=args.days)
+        print(f"📈 {args.ticker.upper()}: {len(entries)} entries in the last {args.days} days")
+        for entry in entries:
+            print(f"  {datetime.fromtimestamp(entry['ts']).isoformat(timespec='minutes')}  "
+                  f"{entry['sentiment_score']:+d}  ({entry['articles_analyzed']}/{entry['article_count']} articles)")
+    else:
+        latest = scores_at(args.time, lookback_days=args.lookback_days)
+        print(f"🗓️  {len(latest)} tickers as of {args.time}")
+        for ticker, entry in sorted(latest.items(), key=lambda item: -item[1]['sentiment_score']):
+            print(f"  {ticker}: {entry['sentiment_score']:+d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Sharded multi-worker processing of a week's tickers
+
+Tickers are partitioned by crc32(ticker) % N. Each shard runs as its own process
+(on this host or another one that mounts the same store directory) with its own
+Finnhub / Groq keys, and writes its results into the shared store. A merge step
+then assembles the final news and sentiment files and publishes one snapshot.
+
+    plan     fetch the calendar once and write <store>/calendar.json
+    worker   process one shard: python shard.py worker --shard 2 --of 4
+    merge    combine all shard files and publish a snapshot generation
+    run      plan, spawn N local worker processes, wait, merge
+
+Per-shard keys are read from FINNHUB_API_KEY_<shard> and GROQ_API_KEY_<shard>
+(falling back to FINNHUB_API_KEY / GROQ_API_KEY), and are put in place before
+main.py and LLM.py are imported, since both read their key at import time.
+Shards that fall back to a shared key split its rate limit between them.
+
+A ticker whose news fetch or scoring fails is not checkpointed; the worker
+finishes the rest of its shard, writes no shard file and exits non-zero, so
+merge refuses to publish until the worker is re-run (only the failed tickers
+are redone).
+
+Usage:
+    python shard.py run --workers 4 [--weeks 1] [--no-sentiment] [--cascade]
+"""
+
+import os
+import sys
+import zlib
+import argparse
+import subprocess
+from datetime import datetime, timedelta
+
+import checkpoints
+import snapshots
+import store_lock
+
+DEFAULT_STORE = "shard_store"
+CALENDAR_FILENAME = "calendar.json"
+
+
+def shard_of(ticker, shard_count):
+    """
+    Stable shard number for a ticker (same answer in every process and on every host)
+    """
+    return zlib.crc32(ticker.upper().encode('utf-8')) % shard_count
+
+
+def shard_path(store, shard, shard_count):
+    return os.path.join(store, f"shard-{shard}-of-{shard_count}.json")
+
+
+def use_shard_keys(shard, shard_count):
+    """
+    Point FINNHUB_API_KEY / GROQ_API_KEY at this shard's keys when they are configured
+
+    Shards without their own Finnhub or Groq key share one quota, so each gets an equal
+    part of it (read by rate_limit.py, which is imported after this).
+    """
+    for name, rate_name, default_rate in (("FINNHUB_API_KEY", "FINNHUB_CALLS_PER_MINUTE", "55"),
+                                          ("GROQ_API_KEY", "GROQ_CALLS_PER_MINUTE", "28")):
+        shard_key = os.getenv(f"{name}_{shard}")
+        if shard_key:
+            os.environ[name] = shard_key
+        else:
+            shared_rate = float(os.getenv(rate_name, default_rate))
+            os.environ[rate_name] = str(shared_rate / shard_count)
+
+
+def plan(store=DEFAULT_STORE, weeks_ahead=1):
+    """
+    Fetch the calendar once and store it for the workers
+
+    Returns:
+        dict: The stored calendar (earnings_by_day, earnings_week, symbol_dates)
+    """
+    import main
+
+    earnings_rows, earnings_by_day, summary_stats = main.get_earnings_data(weeks_ahead=weeks_ahead)
+    if earnings_rows is None:
+        raise RuntimeError(f"No earnings data found: {summary_stats.get('error', 'Unknown error')}")
+
+    calendar = {
+        "earnings_week": main.format_earnings_summary(earnings_rows, earnings_by_day, summary_stats)['week_range'],
+        "earnings_by_day": earnings_by_day,
+        "planned_at": datetime.now().isoformat()
+    }
+    os.makedirs(store, exist_ok=True)
+    snapshots.atomic_write_json(os.path.join(store, CALENDAR_FILENAME), calendar)
+    print(f"🗓️  Planned {sum(len(day['symbols']) for day in earnings_by_day.values())} tickers for {calendar['earnings_week']}")
+    return calendar
+
+
+def run_worker(shard, shard_count, store=DEFAULT_STORE, run_sentiment=True, cascade=False, days_back=30):
+    """
+    Fetch and score the tickers of one shard and write them to the store
+
+    Every finished ticker is checkpointed, so a restarted worker only redoes unfinished tickers.
+    Tickers whose fetch or scoring failed are not; the shard file is then not written.
+
+    Returns:
+        str: Path of the shard file
+
+    Raises:
+        RuntimeError: When some tickers failed (after the rest of the shard is done)
+    """
+    use_shard_keys(shard, shard_count)
+    import main
+    from rate_limit import finnhub_limiter
+
+    calendar = snapshots.read_json(os.path.join(store, CALENDAR_FILENAME))
+    if calendar is None:
+        raise RuntimeError(f"No calendar in {store}. Run 'python shard.py plan' first.")
+
+    symbols = [symbol for day in calendar["earnings_by_day"].values() for symbol in day['symbols']
+               if shard_of(symbol, shard_count) == shard]
+    print(f"👷 Shard {shard}/{shard_count}: {len(symbols)} tickers")
+
+    if run_sentiment:
+        from LLM import score_company_record, failed, DEFAULT_CONFIDENCE_THRESHOLD
+
+    symbol_dates = {symbol: date_str for date_str, day in calendar["earnings_by_day"].items() for symbol in day['symbols']}
+    end_date = datetime.now()
+    start_str = (end_date - timedelta(days=days_back)).strftime('%Y-%m-%d')
+    end_str = end_date.strftime('%Y-%m-%d')
+
+    run_id = checkpoints.snapshot_id({"calendar": calendar, "shard": shard, "of": shard_count},
+                                     {"run_sentiment": run_sentiment, "cascade": cascade, "from": start_str, "to": end_str})
+    # Entries logged before failed scores were kept out of the log are redone too
+    completed = {symbol: entry for symbol, entry in checkpoints.load_completed(run_id).items()
+                 if not (entry.get("sentiment") or {}).get("error")}
+    checkpoints.start_log(run_id, resume=True)
+
+    news = {}
+    sentiment_results = []
+    failed_symbols = []
+    for symbol in symbols:
+        entry = completed.get(symbol)
+        if entry is None:
+            finnhub_limiter.acquire()
+            try:
+                symbol_news = main.fetch_company_news(symbol, start_str, end_str)
+            except Exception as e:
+                print(f"  ⚠️ News fetch failed for {symbol}: {e}")
+                failed_symbols.append(symbol)
+                continue
+            result = None
+            if run_sentiment and symbol_news['article_count'] > 0:
+                record = main.build_company_record(symbol_news, symbol_dates[symbol])
+                result = score_company_record(symbol, record, cascade, DEFAULT_CONFIDENCE_THRESHOLD)
+                if failed(result):
+                    failed_symbols.append(symbol)
+                    continue
+            entry = {"ticker": symbol, "news": symbol_news, "sentiment": result}
+            checkpoints.append_result(run_id, entry)
+
+        news[symbol] = entry["news"]
+        if entry["sentiment"] is not None:
+            sentiment_results.append(entry["sentiment"])
+
+    path = shard_path(store, shard, shard_count)
+    if failed_symbols:
+        # An older shard file must not be merged in place of this unfinished run
+        if os.path.exists(path):
+            os.remove(path)
+        raise RuntimeError(f"Shard {shard}/{shard_count}: {len(failed_symbols)} tickers failed "
+                           f"({', '.join(failed_symbols)}); re-run the worker to retry them")
+
+    snapshots.atomic_write_json(path, {
+        "shard": shard,
+        "of": shard_count,
+        "earnings_week": calendar["earnings_week"],
+        "run_sentiment": run_sentiment,
+        "finished_at": datetime.now().isoformat(),
+        "news": news,
+        "sentiment_results": sentiment_results
+    }, indent=None)
+    print(f"✅ Shard {shard}/{shard_count} done: {len(sentiment_results)} scored, written to {path}")
+    return path
+
+
+def merge(shard_count, store=DEFAULT_STORE):
+    """
+    Assemble all shard outputs into the news and sentiment files and publish a snapshot
+
+    Returns:
+        int: The published generation
+    """
+    import main
+
+    calendar = snapshots.read_json(os.path.join(store, CALENDAR_FILENAME))
+    if calendar is None:
+        raise RuntimeError(f"No calendar in {store}")
+
+    news_data = {}
+    results_by_ticker = {}
+    run_sentiment = False
+    missing = []
+    for shard in range(shard_count):
+        output = snapshots.read_json(shard_path(store, shard, shard_count))
+        if output is None or output.get("earnings_week") != calendar["earnings_week"]:
+            missing.append(shard)
+            continue
+        news_data.update(output["news"])
+        run_sentiment = run_sentiment or output["run_sentiment"]
+        for result in output["sentiment_results"]:
+            results_by_ticker[result["ticker"]] = result
+    if missing:
+        raise RuntimeError(f"Shards not finished: {', '.join(str(shard) for shard in missing)}")
+
+    json_filename = main.save_urls_to_json(news_data, calendar["earnings_by_day"], earnings_week=calendar["earnings_week"])
+
+    sentiment_filename = None
+    if run_sentiment:
+        from LLM import write_sentiment_results
+
+        # Calendar order, like a single-process run
+        ordered = [results_by_ticker[symbol] for day in calendar["earnings_by_day"].values()
+                   for symbol in day['symbols'] if symbol in results_by_ticker]
+        sentiment_filename = write_sentiment_results(ordered, datetime.now().isoformat(), calendar["earnings_week"])
+
+    return snapshots.publish(json_filename, sentiment_filename, note=f"merged from {shard_count} shards")
+
+
+def run_local(worker_count, store=DEFAULT_STORE, weeks_ahead=1, run_sentiment=True, cascade=False):
+    """
+    Plan, run every shard as a local subprocess, then merge
+
+    Returns:
+        int: The published generation
+    """
+    plan(store, weeks_ahead)
+
+    processes = []
+    for shard in range(worker_count):
+        command = [sys.executable, os.path.abspath(__file__), "worker", "--shard", str(shard), "--of", str(worker_count), "--store", store]
+        if not run_sentiment:
+            command.append("--no-sentiment")
+        if cascade:
+            command.append("--cascade")
+        processes.append((shard, subprocess.Popen(command)))
+
+    failed = [shard for shard, process in processes if process.wait() != 0]
+    if failed:
+        raise RuntimeError(f"Shard workers failed: {', '.join(str(shard) for shard in failed)} (re-run them with 'worker', then 'merge')")
+
+    return merge(worker_count, store)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sharded processing of the earnings week across worker processes')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    plan_parser = subparsers.add_parser('plan', help='Fetch the calendar into the shared store')
+    plan_parser.add_argument('--weeks', type=int, default=1, help='Weeks ahead to analyze (default: 1)')
+
+    worker_parser = subparsers.add_parser('worker', help='Process one shard')
+    worker_parser.add_argument('--shard', type=int, required=True, help='Shard number (0-based)')
+    worker_parser.add_argument('--of', dest='shard_count', type=int, required=True, help='Total number of shards')
+
+    merge_parser = subparsers.add_parser('merge', help='Combine shard outputs and publish a snapshot')
+    merge_parser.add_argument('--of', dest='shard_count', type=int, required=True, help='Total number of shards')
+
+    run_parser = subparsers.add_parser('run', help='Plan, run N local workers and merge')
+    run_parser.add_argument('--workers', type=int, default=4, help='Number of worker processes (default: 4)')
+    run_parser.add_argument('--weeks', type=int, default=1, help='Weeks ahead to analyze (default: 1)')
+
+    for sub in (plan_parser, worker_parser, merge_parser, run_parser):
+        sub.add_argument('--store', default=DEFAULT_STORE, help=f'Shared store directory (default: {DEFAULT_STORE})')
+    for sub in (worker_parser, run_parser):
+        sub.add_argument('--no-sentiment', action='store_true', help='Only collect news')
+        sub.add_argument('--cascade', action='store_true', help='Score locally first and only send unclear companies to the LLM')
+
+    args = parser.parse_args()
+    store_lock.hold_for_process()
+
+    try:
+        if args.command == 'plan':
+            plan(args.store, args.weeks)
+        elif args.command == 'worker':
+            run_worker(args.shard, args.shard_count, args.store, run_sentiment=not args.no_sentiment, cascade=args.cascade)
+        elif args.command == 'merge':
+            merge(args.shard_count, args.store)
+        else:
+            run_local(args.workers, args.store, args.weeks, run_sentiment=not args.no_sentiment, cascade=args.cascade)
+    except Exception as e:
+        print(f"❌ {e}")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
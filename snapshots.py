@@ -0,0 +1,319 @@
+"""
+Generation-numbered data snapshots
+
+Every pipeline run publishes an immutable snapshot directory
+snapshots/gen-NNNNNN/ holding the news file, the sentiment file and a manifest.
+The directory is staged under a temporary name and moved into place with a
+single rename, then snapshots/CURRENT is atomically replaced to point at it.
+Readers resolve CURRENT once per request and read both files from that one
+generation, so they never see a half-written file or news and sentiment from
+different runs. Older generations stay on disk for rollback and diffing.
+
+Usage:
+    python snapshots.py list
+    python snapshots.py rollback <generation>
+    python snapshots.py diff <generation> [<generation>]
+"""
+
+import os
+import re
+import json
+import shutil
+import argparse
+from datetime import datetime
+
+from articles import json_default
+
+SNAPSHOT_DIR = "snapshots"
+CURRENT_FILENAME = "CURRENT"
+MANIFEST_FILENAME = "manifest.json"
+
+NEWS_FILENAME = "earnings_news_urls.json"
+SENTIMENT_FILENAME = "earnings_sentiment_analysis.json"
+
+_GENERATION_RE = re.compile(r"^gen-(\d{6})$")
+
+
+def atomic_write_text(path, text):
+    """
+    Write text to a temp file in the same directory, fsync it and rename it over path
+    """
+    directory = os.path.dirname(path) or "."
+    temp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return path
+
+
+def atomic_write_json(path, data, indent=2):
+    """
+    Write JSON atomically (see atomic_write_text)
+    """
+    return atomic_write_text(path, json.dumps(data, indent=indent, ensure_ascii=False, default=json_default))
+
+
+def read_json(path):
+    """
+    Load a JSON file, or None when it does not exist
+    """
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def generation_dir(generation, snapshot_dir=SNAPSHOT_DIR):
+    return os.path.join(snapshot_dir, f"gen-{generation:06d}")
+
+
+def list_generations(snapshot_dir=SNAPSHOT_DIR):
+    """
+    Published generation numbers, oldest first
+    """
+    if not os.path.isdir(snapshot_dir):
+        return []
+    generations = []
+    for name in os.listdir(snapshot_dir):
+        match = _GENERATION_RE.match(name)
+        if match:
+            generations.append(int(match.group(1)))
+    return sorted(generations)
+
+
+def current_generation(snapshot_dir=SNAPSHOT_DIR):
+    """
+    Generation the CURRENT pointer refers to, or None before the first publish
+    """
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT_FILENAME), 'r', encoding='utf-8') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_current(generation, snapshot_dir):
+    temp_path = os.path.join(snapshot_dir, f".{CURRENT_FILENAME}.{os.getpid()}.tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(f"{generation}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, os.path.join(snapshot_dir, CURRENT_FILENAME))
+
+
+def resolve(generation=None, snapshot_dir=SNAPSHOT_DIR):
+    """
+    File paths for one generation (default: the current one)
+
+    Before anything has been published this falls back to the legacy files in
+    the working directory.
+
+    Returns:
+        dict: generation (int or None), news_path, sentiment_path
+    """
+    if generation is None:
+        generation = current_generation(snapshot_dir)
+    if generation is None:
+        return {"generation": None, "news_path": NEWS_FILENAME, "sentiment_path": SENTIMENT_FILENAME}
+
+    directory = generation_dir(generation, snapshot_dir)
+    return {
+        "generation": generation,
+        "news_path": os.path.join(directory, NEWS_FILENAME),
+        "sentiment_path": os.path.join(directory, SENTIMENT_FILENAME)
+    }
+
+
+def resolve_current(snapshot_dir=SNAPSHOT_DIR):
+    """
+    Resolve the current generation once; read every file of a request from the returned paths
+    """
+    return resolve(None, snapshot_dir)
+
+
+def load_manifest(generation, snapshot_dir=SNAPSHOT_DIR):
+    return read_json(os.path.join(generation_dir(generation, snapshot_dir), MANIFEST_FILENAME))
+
+
+def _mirror_legacy_files(generation, snapshot_dir):
+    """
+    Keep the working-directory copies in step with a generation for CLI tools and scripts
+    """
+    paths = resolve(generation, snapshot_dir)
+    for source, target in ((paths["news_path"], NEWS_FILENAME), (paths["sentiment_path"], SENTIMENT_FILENAME)):
+        if os.path.exists(source):
+            temp_path = f".{target}.{os.getpid()}.tmp"
+            shutil.copyfile(source, temp_path)
+            os.replace(temp_path, target)
+
+
+def publish(news_file=None, sentiment_file=None, note=None, snapshot_dir=SNAPSHOT_DIR, history_tickers=None):
+    """
+    Publish a new immutable generation and point CURRENT at it
+
+    A file that is not supplied is carried forward from the current generation,
+    and the manifest records which generation each file came from.
+
+    Args:
+        news_file (str): News file written by this run
+        sentiment_file (str): Sentiment file written by this run
+        note (str): Free-form description stored in the manifest
+        history_tickers (iterable): Tickers of a new sentiment file to append to the history (default: all)
+
+    Returns:
+        int: The new generation number
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    previous = current_generation(snapshot_dir)
+    previous_paths = resolve(previous, snapshot_dir) if previous is not None else None
+    previous_manifest = load_manifest(previous, snapshot_dir) if previous is not None else None
+
+    staging_dir = os.path.join(snapshot_dir, f".staging-{os.getpid()}-{datetime.now().strftime('%Y%m%d%H%M%S%f')}")
+    os.makedirs(staging_dir)
+
+    sources = {}
+    for filename, supplied, path_key, source_key in (
+        (NEWS_FILENAME, news_file, "news_path", "news_generation"),
+        (SENTIMENT_FILENAME, sentiment_file, "sentiment_path", "sentiment_generation")
+    ):
+        if supplied and os.path.exists(supplied):
+            shutil.copyfile(supplied, os.path.join(staging_dir, filename))
+            sources[source_key] = "new"
+        elif previous_paths and os.path.exists(previous_paths[path_key]):
+            shutil.copyfile(previous_paths[path_key], os.path.join(staging_dir, filename))
+            sources[source_key] = (previous_manifest or {}).get(source_key) or previous
+        else:
+            sources[source_key] = None
+
+    # Only the header is read: the manifest needs the week and company count, not the articles
+    import news_store
+    staged_news = os.path.join(staging_dir, NEWS_FILENAME)
+    news = news_store.read_header(staged_news) or {}
+    if news:
+        if news.get("total_companies") is None:
+            news["total_companies"] = sum(1 for _ in news_store.iter_companies(staged_news, articles=False))
+        # Ticker index next to the news file, for single-company reads (see news_index.py)
+        import news_index
+        news_index.build_index(staged_news)
+
+    # Claim the next free number; a concurrent publisher makes the rename fail and we retry
+    generation = max(list_generations(snapshot_dir) or [0]) + 1
+    while True:
+        manifest = {
+            "generation": generation,
+            "published_at": datetime.now().isoformat(),
+            "previous_generation": previous,
+            "earnings_week": news.get("earnings_week"),
+            "total_companies": news.get("total_companies", 0),
+            "news_generation": generation if sources["news_generation"] == "new" else sources["news_generation"],
+            "sentiment_generation": generation if sources["sentiment_generation"] == "new" else sources["sentiment_generation"],
+            "note": note
+        }
+        atomic_write_json(os.path.join(staging_dir, MANIFEST_FILENAME), manifest)
+        try:
+            os.rename(staging_dir, generation_dir(generation, snapshot_dir))
+            break
+        except OSError:
+            if not os.path.exists(generation_dir(generation, snapshot_dir)):
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                raise
+            generation += 1
+
+    if sources["sentiment_generation"] == "new":
+        # New scores go into the sentiment history (see sentiment_history.py) before readers can see the
+        # generation, so analytics computed for it include them; the snapshot stands either way
+        import sentiment_history
+        try:
+            sentiment_history.record_generation(generation, tickers=history_tickers, snapshot_dir=snapshot_dir)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not append generation {generation} to the sentiment history: {e}")
+
+    _write_current(generation, snapshot_dir)
+    print(f"📦 Published snapshot generation {generation}")
+    return generation
+
+
+def rollback(generation, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Point CURRENT back at an existing generation (and refresh the working-directory copies)
+    """
+    if generation not in list_generations(snapshot_dir):
+        raise ValueError(f"Generation {generation} does not exist")
+    _write_current(generation, snapshot_dir)
+    _mirror_legacy_files(generation, snapshot_dir)
+    print(f"⏪ CURRENT now points at generation {generation}")
+    return generation
+
+
+def diff_generations(old_generation, new_generation, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Compare two generations company by company
+
+    Returns:
+        dict: added / removed tickers, article count changes and sentiment score changes
+    """
+    old_paths = resolve(old_generation, snapshot_dir)
+    new_paths = resolve(new_generation, snapshot_dir)
+    old_companies = (read_json(old_paths["news_path"]) or {}).get("companies", {})
+    new_companies = (read_json(new_paths["news_path"]) or {}).get("companies", {})
+
+    def scores(path):
+        data = read_json(path) or {}
+        return {result["ticker"]: result.get("sentiment_score", 0) for result in data.get("sentiment_results", [])}
+
+    old_scores = scores(old_paths["sentiment_path"])
+    new_scores = scores(new_paths["sentiment_path"])
+
+    article_changes = {}
+    for ticker in set(old_companies) & set(new_companies):
+        before = old_companies[ticker].get("article_count", 0)
+        after = new_companies[ticker].get("article_count", 0)
+        if before != after:
+            article_changes[ticker] = {"before": before, "after": after}
+
+    score_changes = {}
+    for ticker in set(old_scores) | set(new_scores):
+        before = old_scores.get(ticker)
+        after = new_scores.get(ticker)
+        if before != after:
+            score_changes[ticker] = {"before": before, "after": after}
+
+    return {
+        "old_generation": old_generation,
+        "new_generation": new_generation,
+        "added": sorted(set(new_companies) - set(old_companies)),
+        "removed": sorted(set(old_companies) - set(new_companies)),
+        "article_changes": article_changes,
+        "score_changes": score_changes
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect, diff and roll back published data snapshots')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='List generations')
+    rollback_parser = subparsers.add_parser('rollback', help='Point CURRENT at an older generation')
+    rollback_parser.add_argument('generation', type=int)
+    diff_parser = subparsers.add_parser('diff', help='Compare two generations (default: against CURRENT)')
+    diff_parser.add_argument('old', type=int)
+    diff_parser.add_argument('new', type=int, nargs='?')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        current = current_generation()
+        for generation in list_generations():
+            manifest = load_manifest(generation) or {}
+            marker = "*" if generation == current else " "
+            print(f"{marker} {generation:6d}  {manifest.get('published_at', '?')}  "
+                  f"{manifest.get('total_companies', 0)} companies  {manifest.get('note') or ''}")
+    elif args.command == 'rollback':
+        rollback(args.generation)
+    else:
+        new = args.new if args.new is not None else current_generation()
+        print(json.dumps(diff_generations(args.old, new), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Stage DAG runner with content-addressed stage outputs
+
+The pipeline behind run_full_analysis is modelled as stages:
+
+    calendar -> news (per ticker) -> persist -> sentiment (per ticker) -> publish
+
+Every stage output is stored in .stage_cache/<stage>/<key>.json, where the key is
+a hash of the stage's inputs and config. A stage (or a single ticker of a
+per-ticker stage) only executes when nothing is stored under its key:
+
+- news is keyed by ticker, earnings date and news window, so a calendar change
+  only fetches the tickers whose entry changed
+- sentiment is keyed by the ticker's news record plus model, prompt version and
+  scoring mode, so a model change re-runs scoring and nothing else
+- persist and publish only run when the keys feeding them differ from the last run
+
+Usage:
+    python stage_runner.py [--weeks 1] [--from sentiment] [--cascade] [--incremental] [--force news]
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+
+import snapshots
+import news_store
+import checkpoints
+from articles import json_default
+
+STAGE_CACHE_DIR = ".stage_cache"
+LAST_RUN_FILENAME = "last_run.json"
+
+# stage -> stages whose outputs it consumes
+STAGE_DEPENDENCIES = {
+    "calendar": [],
+    "news": ["calendar"],
+    "persist": ["calendar", "news"],
+    "sentiment": ["persist"],
+    "publish": ["persist", "sentiment"]
+}
+
+
+def stage_order(dependencies=STAGE_DEPENDENCIES):
+    """
+    Topological order of the stages (raises ValueError on a cycle)
+    """
+    order = []
+    visiting = set()
+
+    def visit(stage):
+        if stage in order:
+            return
+        if stage in visiting:
+            raise ValueError(f"Stage dependency cycle at '{stage}'")
+        visiting.add(stage)
+        for dependency in dependencies[stage]:
+            visit(dependency)
+        visiting.discard(stage)
+        order.append(stage)
+
+    for stage in dependencies:
+        visit(stage)
+    return order
+
+
+def downstream_of(stage, dependencies=STAGE_DEPENDENCIES):
+    """
+    A stage plus every stage that (transitively) depends on it
+    """
+    selected = {stage}
+    changed = True
+    while changed:
+        changed = False
+        for name, needs in dependencies.items():
+            if name not in selected and selected.intersection(needs):
+                selected.add(name)
+                changed = True
+    return selected
+
+
+def _key_default(value):
+    try:
+        return json_default(value)
+    except TypeError:
+        return str(value)
+
+
+def stage_key(stage, inputs):
+    """
+    Content address of a stage output: hash of the stage name and its canonical inputs
+    """
+    payload = json.dumps({"stage": stage, "inputs": inputs}, sort_keys=True, ensure_ascii=False, default=_key_default)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _output_path(stage, key, cache_dir):
+    return os.path.join(cache_dir, stage, f"{key}.json")
+
+
+def load_output(stage, key, cache_dir=STAGE_CACHE_DIR):
+    """
+    Stored output for a stage key, or None
+    """
+    try:
+        return snapshots.read_json(_output_path(stage, key, cache_dir))
+    except ValueError:
+        return None
+
+
+def store_output(stage, key, output, cache_dir=STAGE_CACHE_DIR):
+    os.makedirs(os.path.join(cache_dir, stage), exist_ok=True)
+    snapshots.atomic_write_json(_output_path(stage, key, cache_dir), output, indent=None)
+
+
+class StageContext:
+    """
+    State shared by the stages of one run: options, stage outputs and counters
+    """
+
+    def __init__(self, weeks_ahead=1, days_back=30, cascade=False, incremental=False,
+                 force=(), cache_dir=STAGE_CACHE_DIR):
+        self.weeks_ahead = weeks_ahead
+        self.days_back = days_back
+        self.cascade = cascade
+        self.incremental = incremental
+        self.force = set(force)
+        self.cache_dir = cache_dir
+        self.outputs = {}
+        self.keys = {}
+        self.executed = {}
+        self.reused = {}
+
+    def count(self, stage, executed):
+        counter = self.executed if executed else self.reused
+        counter[stage] = counter.get(stage, 0) + 1
+
+    def cached(self, stage, key):
+        if stage in self.force:
+            return None
+        return load_output(stage, key, self.cache_dir)
+
+
+def run_calendar(ctx):
+    """
+    Fetch the earnings calendar (the external root input, so it always runs)
+    """
+    import main
+
+    earnings_rows, earnings_by_day, summary_stats = main.get_earnings_data(weeks_ahead=ctx.weeks_ahead)
+    if earnings_rows is None:
+        raise RuntimeError(f"No earnings data found: {summary_stats.get('error', 'Unknown error')}")
+
+    formatted_summary = main.format_earnings_summary(earnings_rows, earnings_by_day, summary_stats)
+    ctx.count("calendar", True)
+    return {
+        "earnings_by_day": earnings_by_day,
+        "earnings_week": formatted_summary['week_range'],
+        "symbol_dates": {symbol: date_str for date_str, day_data in earnings_by_day.items() for symbol in day_data['symbols']}
+    }
+
+
+def run_news(ctx):
+    """
+    Fetch news per ticker, reusing stored news for unchanged (ticker, earnings date, window) keys
+    """
+    import main
+
+    calendar = ctx.outputs["calendar"]
+    end_date = datetime.now()
+    start_str = (end_date - timedelta(days=ctx.days_back)).strftime('%Y-%m-%d')
+    end_str = end_date.strftime('%Y-%m-%d')
+
+    news = {}
+    keys = {}
+    fetched = 0
+    for symbol, date_str in calendar["symbol_dates"].items():
+        key = stage_key("news", {"ticker": symbol, "earnings_date": date_str, "from": start_str, "to": end_str})
+        keys[symbol] = key
+        stored = ctx.cached("news", key)
+        if stored is not None:
+            news[symbol] = stored
+            ctx.count("news", False)
+            continue
+
+        # Same pacing as main.get_company_news_urls, applied to real API calls only
+        if fetched > 0 and fetched % 50 == 0:
+            time.sleep(65)
+        elif fetched > 0:
+            time.sleep(1.1)
+        news[symbol] = main.fetch_company_news(symbol, start_str, end_str)
+        fetched += 1
+        store_output("news", key, news[symbol], ctx.cache_dir)
+        ctx.count("news", True)
+
+    ctx.keys["news"] = keys
+    return news
+
+
+def run_persist(ctx, previous_keys):
+    """
+    Write earnings_news_urls.json when the calendar or any ticker's news changed
+    """
+    import main
+
+    calendar = ctx.outputs["calendar"]
+    key = stage_key("persist", {"earnings_by_day": calendar["earnings_by_day"], "news": ctx.keys["news"]})
+    ctx.keys["persist"] = key
+
+    if key == previous_keys.get("persist") and "persist" not in ctx.force and os.path.exists(snapshots.NEWS_FILENAME):
+        ctx.count("persist", False)
+    else:
+        main.save_urls_to_json(ctx.outputs["news"], calendar["earnings_by_day"], earnings_week=calendar["earnings_week"])
+        ctx.count("persist", True)
+
+    return persisted_file(snapshots.NEWS_FILENAME)
+
+
+def persisted_file(path):
+    """
+    Output of the persist stage: the news file's header plus its path (companies are streamed from it)
+    """
+    header = news_store.read_header(path)
+    if header is None:
+        return None
+    return dict(header, path=path)
+
+
+def load_persisted(ctx):
+    """
+    Use the current snapshot's news file in place of the calendar/news/persist stages
+    """
+    news_file = persisted_file(snapshots.resolve_current()["news_path"])
+    if news_file is None:
+        raise RuntimeError("No news data in the current snapshot. Run the full pipeline first.")
+    ctx.keys["persist"] = stage_key("persist", {"companies": checkpoints.snapshot_id_from_items(news_store.iter_companies(news_file["path"]))})
+    ctx.count("persist", False)
+    return news_file
+
+
+def run_sentiment(ctx):
+    """
+    Score each company, reusing stored results for unchanged (record, model, prompt, mode) keys
+    """
+    from LLM import score_company_record, used_llm, failed, save_headline_cache, SENTIMENT_MODEL, DEFAULT_CONFIDENCE_THRESHOLD
+    from prompts import COMPANY_PROMPT_VERSION, HEADLINE_PROMPT_VERSION
+    import headline_cache
+    import text_workers
+
+    config = {
+        "model": SENTIMENT_MODEL,
+        "prompt_version": HEADLINE_PROMPT_VERSION if ctx.incremental else COMPANY_PROMPT_VERSION,
+        "cascade": ctx.cascade,
+        "confidence_threshold": DEFAULT_CONFIDENCE_THRESHOLD,
+        "incremental": ctx.incremental
+    }
+    cache = headline_cache.load_cache() if ctx.incremental else None
+
+    # Companies are streamed from the persisted news file, once for the keys and once for scoring
+    path = ctx.outputs["persist"]["path"]
+    keys = {}
+    stored = {}
+    for ticker, company_data in news_store.iter_companies(path):
+        keys[ticker] = stage_key("sentiment", {"ticker": ticker, "record": company_data, "config": config})
+        result = ctx.cached("sentiment", keys[ticker])
+        if result is not None:
+            stored[ticker] = result
+
+    # Companies to rescore have their lexicon scores and prompts prepared a block ahead in the text worker pool
+    results = []
+    for ticker, company_data, prepared in text_workers.prepared_stream(
+            news_store.iter_companies(path, records=True), local=ctx.cascade, prompt=not ctx.incremental, skip=set(stored)):
+        key = keys[ticker]
+        if ticker in stored:
+            results.append(stored[ticker])
+            ctx.count("sentiment", False)
+            continue
+
+        print(f"\n🔍 Analyzing {ticker}...")
+        result = score_company_record(ticker, company_data, ctx.cascade, DEFAULT_CONFIDENCE_THRESHOLD, cache, prepared=prepared)
+        print(f"  📊 Final score for {ticker}: {result['sentiment_score']:+d}")
+        if failed(result):
+            # Not stored and no key recorded: the next run scores it again and republishes
+            keys[ticker] = None
+        else:
+            store_output("sentiment", key, result, ctx.cache_dir)
+        results.append(result)
+        ctx.count("sentiment", True)
+        if used_llm(result):
+            time.sleep(2)
+
+    save_headline_cache(cache, results)
+    ctx.keys["sentiment"] = keys
+    return results
+
+
+def run_publish(ctx, previous_keys):
+    """
+    Write the sentiment file and publish a snapshot generation when anything upstream changed
+    """
+    from LLM import write_sentiment_results
+
+    if ctx.keys["persist"] == previous_keys.get("persist") and ctx.keys["sentiment"] == previous_keys.get("sentiment") \
+            and "publish" not in ctx.force and snapshots.current_generation() is not None:
+        ctx.count("publish", False)
+        return snapshots.current_generation()
+
+    news_file = ctx.outputs["persist"]
+    sentiment_file = write_sentiment_results(ctx.outputs["sentiment"], news_file.get('generated_at'), news_file.get('earnings_week'))
+    ctx.count("publish", True)
+    return snapshots.publish(snapshots.NEWS_FILENAME, sentiment_file, note="stage runner")
+
+
+def run_pipeline(weeks_ahead=1, start_stage="calendar", cascade=False, incremental=False, force=(), days_back=30,
+                 cache_dir=STAGE_CACHE_DIR):
+    """
+    Run the stage DAG, executing only stages whose inputs changed
+
+    Args:
+        weeks_ahead (int): Number of weeks ahead to fetch
+        start_stage (str): First stage to run; earlier stages come from the current snapshot
+            (only "calendar" and "sentiment" are valid starting points)
+        cascade (bool): Only escalate low-confidence companies from the local scorer to the LLM
+        incremental (bool): Reuse cached per-headline scores and only score new headlines
+        force (iterable): Stages to re-execute even when their output is stored
+        days_back (int): News window in days
+
+    Returns:
+        dict: success, error, generation, executed / reused counts per stage
+    """
+    if start_stage not in ("calendar", "sentiment"):
+        raise ValueError("start_stage must be 'calendar' or 'sentiment'")
+
+    results = {"success": False, "error": None, "generation": None, "executed": {}, "reused": {}}
+    ctx = StageContext(weeks_ahead=weeks_ahead, days_back=days_back, cascade=cascade,
+                       incremental=incremental, force=force, cache_dir=cache_dir)
+    previous_keys = snapshots.read_json(os.path.join(cache_dir, LAST_RUN_FILENAME)) or {}
+    selected = downstream_of(start_stage)
+
+    try:
+        for stage in stage_order():
+            if stage not in selected:
+                continue
+            print(f"\n▶️  Stage: {stage}")
+            if stage == "calendar":
+                ctx.outputs["calendar"] = run_calendar(ctx)
+            elif stage == "news":
+                ctx.outputs["news"] = run_news(ctx)
+            elif stage == "persist":
+                ctx.outputs["persist"] = run_persist(ctx, previous_keys)
+            elif stage == "sentiment":
+                if "persist" not in ctx.outputs:
+                    ctx.outputs["persist"] = load_persisted(ctx)
+                ctx.outputs["sentiment"] = run_sentiment(ctx)
+            elif stage == "publish":
+                results["generation"] = run_publish(ctx, previous_keys)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        snapshots.atomic_write_json(os.path.join(cache_dir, LAST_RUN_FILENAME),
+                                    {"persist": ctx.keys.get("persist"), "sentiment": ctx.keys.get("sentiment")})
+        results["success"] = True
+    except Exception as e:
+        error_msg = f"Error in run_pipeline: {e}"
+        print(f"❌ {error_msg}")
+        results["error"] = error_msg
+
+    results["executed"] = ctx.executed
+    results["reused"] = ctx.reused
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the earnings pipeline, re-executing only stages whose inputs changed')
+    parser.add_argument('--weeks', type=int, default=1, help='Weeks ahead to analyze (default: 1)')
+    parser.add_argument('--from', dest='start_stage', default='calendar', choices=['calendar', 'sentiment'],
+                        help='Start at this stage; "sentiment" re-scores the current snapshot\'s news')
+    parser.add_argument('--cascade', action='store_true', help='Score locally first and only send unclear companies to the LLM')
+    parser.add_argument('--incremental', action='store_true', help='Only score headlines not already in the headline cache')
+    parser.add_argument('--force', action='append', default=[], choices=list(STAGE_DEPENDENCIES),
+                        help='Re-execute a stage even if its output is stored (repeatable)')
+    args = parser.parse_args()
+
+    result = run_pipeline(weeks_ahead=args.weeks, start_stage=args.start_stage, cascade=args.cascade,
+                          incremental=args.incremental, force=args.force)
+
+    print("\n" + "="*80)
+    print("STAGE SUMMARY")
+    print("="*80)
+    for stage in stage_order():
+        executed = result["executed"].get(stage, 0)
+        reused = result["reused"].get(stage, 0)
+        if executed or reused:
+            print(f"  {stage}: {executed} executed, {reused} reused")
+
+    if result["success"]:
+        print(f"✅ Pipeline complete (snapshot generation {result['generation']})")
+    else:
+        print(f"❌ Pipeline failed: {result['error']}")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Cross-process lock over the stored data
+
+Runs that write data files (main.py, backfill.py, shard workers and the apps'
+scheduled updates) hold the lock shared, so any number of them can run side by
+side. Compaction (which rewrites the headline cache and history segments and
+removes old files) needs it exclusively and skips its cycle while a writer holds
+it; a writer that starts during compaction waits for it to finish.
+
+The lock is an flock on a file in the history directory, so it covers every
+process on the machine using the same working directory, and the kernel drops it
+when its holder exits, even after a crash.
+"""
+
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, the lock is a no-op
+    fcntl = None
+
+LOCK_PATH = os.path.join("history", ".lock")
+
+# Held by hold_for_process until the process exits
+_process_lock = None
+
+
+def acquire(exclusive=False, blocking=True, path=LOCK_PATH):
+    """
+    Take the data lock
+
+    Args:
+        exclusive (bool): Exclusive (compaction) instead of shared (writers)
+        blocking (bool): Wait for the lock instead of giving up when it is held
+        path (str): Lock file
+
+    Returns:
+        Lock handle for release(), or None when blocking=False and the lock is held
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    handle = open(path, 'a')
+    if fcntl is None:
+        return handle
+    flags = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB)
+    try:
+        fcntl.flock(handle.fileno(), flags)
+    except BlockingIOError:
+        handle.close()
+        return None
+    return handle
+
+
+def release(handle):
+    """
+    Release a lock taken with acquire (None is ignored)
+    """
+    if handle is not None:
+        handle.close()
+
+
+def hold_for_process():
+    """
+    Take the shared lock for the rest of a command-line run
+
+    Waits (and says so) while a compaction is running. The kernel releases the lock
+    when the process exits.
+    """
+    global _process_lock
+    if _process_lock is not None:
+        return
+    handle = acquire(blocking=False)
+    if handle is None:
+        print("⏳ Waiting for a running compaction to finish...")
+        handle = acquire()
+    _process_lock = handle
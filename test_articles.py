@@ -0,0 +1,54 @@
+"""
+Tests for the compact article records (articles.py)
+"""
+import json
+
+import pytest
+
+from articles import ArticleRecord, ArticleUrls, article_id, json_default, FINNHUB_NEWS_URL
+
+FINNHUB_ID = "0f" * 32
+
+
+def test_finnhub_url_is_kept_as_its_id():
+    record = ArticleRecord(FINNHUB_NEWS_URL + FINNHUB_ID, "Micron beats estimates", "Yahoo", 1758500000)
+    assert record._id == bytes.fromhex(FINNHUB_ID) and record._url is None
+    assert record.url == FINNHUB_NEWS_URL + FINNHUB_ID
+    assert article_id(record) == FINNHUB_ID
+
+
+@pytest.mark.parametrize("url", [
+    "https://example.com/micron",
+    FINNHUB_NEWS_URL + FINNHUB_ID.upper(),  # rebuilding would change the case
+    FINNHUB_NEWS_URL + "136901",
+    "",
+])
+def test_other_urls_are_kept_verbatim(url):
+    record = ArticleRecord(url, "Micron beats estimates", "Yahoo", 1758500000)
+    assert record.url == url
+    assert article_id(record) == article_id(record.to_dict())
+
+
+def test_record_reads_like_the_dict_it_replaces():
+    article = {"url": "https://example.com/micron", "headline": "Micron beats estimates", "source": "Yahoo",
+               "datetime": 1758500000}
+    record = ArticleRecord.from_dict(article)
+    assert record == article and dict(record) == article
+    assert record["headline"] == article["headline"]
+    assert record.get("summary", "none") == "none"
+    assert "source" in record and "summary" not in record
+    with pytest.raises(KeyError):
+        record["summary"]
+    assert ArticleRecord.from_dict(record) is record
+
+
+def test_json_output_is_unchanged():
+    articles = [{"url": FINNHUB_NEWS_URL + FINNHUB_ID, "headline": "Micron beats estimates", "source": "Yahoo",
+                 "datetime": 1758500000},
+                {"url": "https://example.com/costco", "headline": "Costco sales rise", "source": "Reuters",
+                 "datetime": 1758500001}]
+    records = [ArticleRecord.from_dict(article) for article in articles]
+    company = {"urls": ArticleUrls(records), "article_details": records}
+    assert json.dumps(company, default=json_default) == json.dumps(
+        {"urls": [article["url"] for article in articles], "article_details": articles})
+    assert company["urls"][1:] == ["https://example.com/costco"]
@@ -0,0 +1,78 @@
+"""
+Tests for the historical backfill (backfill.py)
+"""
+import os
+
+import backfill
+import sentiment_history
+
+WEEK = "2025-09-22"
+
+
+def history_scores():
+    entries = sentiment_history.query("2025-09-01", "2025-10-31")
+    return sorted((entry["ticker"], entry["sentiment_score"]) for entry in entries)
+
+
+def merge_week():
+    """What compaction does to a finished week partition"""
+    directory = os.path.join(sentiment_history.HISTORY_DIR, sentiment_history.week_partition(
+        sentiment_history.to_timestamp(WEEK)))
+    sentiment_history.merge_segments([path for _, _, path in sentiment_history.partition_segments(directory)], directory)
+    return directory
+
+
+def test_finished_week_is_recorded_in_the_history(pipeline):
+    result = backfill.backfill_week(WEEK)
+    assert result["status"] == "done" and result["companies"] == 3
+    assert history_scores() == [("AMD", -3), ("COST", 2), ("MU", 6)]
+
+
+def test_rerecorded_week_replaces_its_merged_entries(pipeline):
+    backfill.backfill_week(WEEK)
+    merge_week()
+
+    pipeline.router.scores.update(MU=9)
+    assert backfill.backfill_week(WEEK, force=True)["status"] == "done"
+    assert history_scores() == [("AMD", -3), ("COST", 2), ("MU", 9)]
+
+    # Compacting again keeps only the newer recording
+    directory = merge_week()
+    assert len(sentiment_history.partition_segments(directory)) == 1
+    assert history_scores() == [("AMD", -3), ("COST", 2), ("MU", 9)]
+
+
+def test_most_recently_written_entry_wins_whatever_the_segment_order(pipeline):
+    recorded_at = sentiment_history.to_timestamp(WEEK)
+    sentiment_history.append_run([{"ticker": "MU", "sentiment_score": 6}], recorded_at=recorded_at, tag="a-first")
+    sentiment_history.append_run([{"ticker": "MU", "sentiment_score": 9}], recorded_at=recorded_at, tag="z-second")
+    assert history_scores() == [("MU", 9)]
+    merge_week()
+    assert history_scores() == [("MU", 9)]
+
+
+def test_interrupted_week_resumes_with_the_failed_companies(pipeline):
+    pipeline.router.failing.add("AMD")
+    result = backfill.backfill_week(WEEK)
+    assert result["status"] == "failed" and "AMD" in result["error"]
+    assert not os.path.exists(backfill.week_path(WEEK))
+    assert history_scores() == []
+
+    pipeline.router.failing.clear()
+    pipeline.finnhub.calls.clear()
+    pipeline.router.calls.clear()
+    assert backfill.backfill_week(WEEK)["status"] == "done"
+    # MU and COST come from the week's checkpoint log
+    assert pipeline.finnhub.calls == ["AMD"]
+    assert set(pipeline.router.calls) == {"AMD"}
+    assert history_scores() == [("AMD", -3), ("COST", 2), ("MU", 6)]
+
+
+def test_finished_week_is_skipped_unless_forced(pipeline):
+    backfill.backfill_week(WEEK)
+    pipeline.finnhub.calls.clear()
+
+    assert backfill.backfill_week(WEEK)["status"] == "skipped"
+    assert pipeline.finnhub.calls == []
+    assert backfill.backfill_week(WEEK, force=True)["status"] == "done"
+    assert sorted(pipeline.finnhub.calls) == ["AMD", "COST", "MU"]
@@ -0,0 +1,125 @@
+"""
+Tests for sentiment run checkpoints (checkpoints.py) and resuming a run in LLM.py
+"""
+import json
+import os
+
+import pytest
+
+import checkpoints
+import news_store
+
+
+def test_snapshot_id_depends_on_data_and_config():
+    companies = {"MU": {"article_count": 1}, "AMD": {"article_count": 0}}
+    base = checkpoints.snapshot_id(companies, {"cascade": False})
+    assert base == checkpoints.snapshot_id(dict(companies), {"cascade": False})
+    assert base != checkpoints.snapshot_id(companies, {"cascade": True})
+    assert base != checkpoints.snapshot_id({"MU": {"article_count": 2}, "AMD": {"article_count": 0}}, {"cascade": False})
+
+    streamed = checkpoints.snapshot_id_from_items(iter(companies.items()), {"cascade": False})
+    assert streamed == checkpoints.snapshot_id_from_items(list(companies.items()), {"cascade": False})
+    assert streamed != checkpoints.snapshot_id_from_items(list(companies.items())[::-1], {"cascade": False})
+
+
+def test_append_and_load(tmp_path):
+    directory = str(tmp_path)
+    checkpoints.start_log("run", checkpoint_dir=directory)
+    checkpoints.append_result("run", {"ticker": "MU", "sentiment_score": 6}, checkpoint_dir=directory)
+    checkpoints.append_result("run", {"ticker": "AMD", "sentiment_score": -2}, checkpoint_dir=directory)
+    assert checkpoints.load_completed("run", checkpoint_dir=directory) == {
+        "MU": {"ticker": "MU", "sentiment_score": 6},
+        "AMD": {"ticker": "AMD", "sentiment_score": -2}
+    }
+    assert checkpoints.load_completed("other", checkpoint_dir=directory) == {}
+
+
+def test_fresh_log_discards_resumed_log_keeps(tmp_path):
+    directory = str(tmp_path)
+    checkpoints.start_log("run", checkpoint_dir=directory)
+    checkpoints.append_result("run", {"ticker": "MU", "sentiment_score": 6}, checkpoint_dir=directory)
+
+    checkpoints.start_log("run", resume=True, checkpoint_dir=directory)
+    assert list(checkpoints.load_completed("run", checkpoint_dir=directory)) == ["MU"]
+
+    checkpoints.start_log("run", checkpoint_dir=directory)
+    assert checkpoints.load_completed("run", checkpoint_dir=directory) == {}
+
+
+def test_torn_line_and_failed_results_are_skipped(tmp_path):
+    directory = str(tmp_path)
+    checkpoints.start_log("run", checkpoint_dir=directory)
+    checkpoints.append_result("run", {"ticker": "MU", "sentiment_score": 6}, checkpoint_dir=directory)
+    # Older runs logged failed results like real ones
+    checkpoints.append_result("run", {"ticker": "AMD", "sentiment_score": 0, "error": True}, checkpoint_dir=directory)
+    with open(checkpoints.checkpoint_path("run", directory), "a", encoding="utf-8") as f:
+        f.write('{"ticker": "COST", "result": {"tick')
+    assert list(checkpoints.load_completed("run", checkpoint_dir=directory)) == ["MU"]
+
+
+class FakeRouter:
+    """Answers every prompt with a fixed score; raises for the tickers in `failing`"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def chat(self, messages, model):
+        prompt = " ".join(message["content"] for message in messages)
+        ticker = next(t for t in ("MU", "AMD", "COST") if f"{t} headline" in prompt)
+        self.calls.append(ticker)
+        if ticker in self.failing:
+            raise RuntimeError("503 Service Unavailable")
+        return "4"
+
+    def stats(self):
+        return {"hedged_requests": 0, "endpoints": []}
+
+
+@pytest.fixture
+def llm(tmp_path, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", os.environ.get("GROQ_API_KEY", "test-key"))
+    monkeypatch.setenv("TEXT_WORKERS", "0")
+    import LLM
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(LLM.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(LLM.groq_limiter, "acquire", lambda *args, **kwargs: None)
+
+    def article(i, ticker):
+        return {"url": f"https://finnhub.io/api/news?id={i}", "headline": f"{ticker} headline number {i} about results",
+                "source": "Yahoo", "datetime": 1758585600 + i}
+
+    companies = {}
+    for n, ticker in enumerate(("MU", "AMD", "COST")):
+        details = [article(10 * n + i, ticker) for i in range(3)]
+        companies[ticker] = {"earnings_date": "2025-09-23", "earnings_day": "Tuesday", "article_count": 3,
+                             "urls": [a["url"] for a in details], "article_details": details}
+    news_store.save_news_file({"earnings_week": "2025-09-22 to 2025-09-28", "generated_at": "2025-09-21T12:00:00",
+                               "total_companies": 3, "companies": companies}, "news.json")
+    return LLM
+
+
+def scores():
+    with open("earnings_sentiment_analysis.json", encoding="utf-8") as f:
+        return {r["ticker"]: (r["sentiment_score"], bool(r.get("error"))) for r in json.load(f)["sentiment_results"]}
+
+
+def test_resume_retries_only_failed_tickers(llm, monkeypatch):
+    router = FakeRouter(failing={"AMD"})
+    monkeypatch.setattr(llm, "router", router)
+    llm.process_earnings_sentiment("news.json")
+    assert sorted(router.calls) == ["AMD", "COST", "MU"]
+    assert scores()["AMD"][1] is True
+
+    # The failure was not checkpointed, so resuming scores AMD again and nothing else
+    router = FakeRouter()
+    monkeypatch.setattr(llm, "router", router)
+    llm.process_earnings_sentiment("news.json", resume=True)
+    assert router.calls == ["AMD"]
+    assert scores() == {"MU": (4, False), "AMD": (4, False), "COST": (4, False)}
+
+    # A fully checkpointed run needs no calls at all
+    router = FakeRouter()
+    monkeypatch.setattr(llm, "router", router)
+    llm.process_earnings_sentiment("news.json", resume=True)
+    assert router.calls == []
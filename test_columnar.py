@@ -0,0 +1,50 @@
+"""
+Tests for the columnar article store (columnar.py)
+"""
+import os
+
+import columnar
+
+FINNHUB_ID = "ab" * 32
+
+
+def news_file(week, articles_by_ticker):
+    companies = {ticker: {"earnings_date": "2025-09-23", "article_count": len(articles),
+                          "urls": [article["url"] for article in articles], "article_details": articles}
+                 for ticker, articles in articles_by_ticker.items()}
+    return {"earnings_week": week, "generated_at": "2025-09-21T12:00:00", "total_companies": len(companies),
+            "companies": companies}
+
+
+def article(url, headline, source="Yahoo", published=1758500000):
+    return {"url": url, "headline": headline, "source": source, "datetime": published}
+
+
+def test_round_trip_and_shared_articles(tmp_path):
+    shared = article(f"https://finnhub.io/api/news?id={FINNHUB_ID}", "Chip stocks rally on AI demand")
+    other = article("https://example.com/costco", "Costco sales rise 8% — strong traffic", source="Reuters")
+    week = news_file("Sep 22 - Sep 28, 2025", {"MU": [shared], "AMD": [shared, other]})
+
+    summary = columnar.build_columns([week], str(tmp_path / "columns"))
+    assert summary["articles"] == 2 and summary["companies"] == 2
+
+    columns = columnar.load_columns(str(tmp_path / "columns"))
+    assert columns.articles_for("amd") == [shared, other]
+    assert columns.article_id(int(columns.rows_for("MU")[0])) == FINNHUB_ID
+    # The Finnhub URL is rebuilt from the id; only the other one is stored
+    assert list(columns.url_overrides.values()) == ["https://example.com/costco"]
+    assert columns.to_news("Sep 22 - Sep 28, 2025") == week
+
+
+def test_rebuild_replaces_the_store_without_disturbing_open_readers(tmp_path):
+    directory = str(tmp_path / "columns")
+    columnar.build_columns([news_file("W1", {"MU": [article("https://example.com/1", "first build")]})], directory)
+    before = columnar.load_columns(directory)
+
+    columnar.build_columns([news_file("W2", {"AMD": [article("https://example.com/2", "second build")]})], directory)
+    assert before.articles_for("MU")[0]["headline"] == "first build"
+    after = columnar.load_columns(directory)
+    assert after.meta["weeks"] == ["W2"]
+    assert after.articles_for("AMD")[0]["headline"] == "second build"
+    # No staging or retired builds are left next to the store
+    assert os.listdir(tmp_path) == ["columns"]
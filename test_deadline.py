@@ -0,0 +1,74 @@
+"""
+Tests for run deadlines (deadline.py) and the carry-forward of unfinished tickers
+"""
+import types
+
+import pytest
+
+import deadline
+import snapshots
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock that only moves when a test advances it"""
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(deadline, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def slow(method, clock, seconds):
+    def call(*args, **kwargs):
+        clock.now += seconds
+        return method(*args, **kwargs)
+    return call
+
+
+def served():
+    current = snapshots.resolve_current()
+    scores = {r["ticker"]: (r["sentiment_score"], bool(r.get("stale")))
+              for r in snapshots.read_json(current["sentiment_path"])["sentiment_results"]}
+    return scores, snapshots.read_json(current["news_path"]).get("stale_tickers", [])
+
+
+def test_stage_budgets_are_cumulative(clock):
+    run = deadline.make_deadline(100)
+    assert run.remaining("news") == pytest.approx(55)
+    clock.now += 20
+    # Unused time carries over: sentiment may run until the end of the whole budget
+    assert run.remaining("news") == pytest.approx(35)
+    assert run.remaining("sentiment") == pytest.approx(80)
+    clock.now += 40
+    assert run.expired("news") and not run.expired("sentiment")
+    assert run.expired_stages == ["news"]
+    assert deadline.make_deadline(None) is None
+
+
+def test_tickers_past_the_news_budget_keep_their_previous_news(pipeline, clock):
+    pipeline.main.run_full_analysis()
+    pipeline.finnhub.calls.clear()
+    pipeline.router.scores.update(MU=8, AMD=-1, COST=3)
+    pipeline.finnhub.company_news = slow(pipeline.finnhub.company_news, clock, 3)
+
+    # News may use 5.5 of the 10 seconds: MU and AMD are fetched, COST is not
+    result = pipeline.main.run_full_analysis(deadline_seconds=10)
+    assert result["success"] and result["partial"]
+    assert pipeline.finnhub.calls == ["MU", "AMD"]
+    scores, stale_news = served()
+    assert stale_news == ["COST"]
+    assert scores == {"MU": (8, False), "AMD": (-1, False), "COST": (2, True)}
+    assert snapshots.load_manifest(snapshots.current_generation())["note"] == "partial (deadline reached)"
+
+
+def test_tickers_past_the_sentiment_budget_keep_their_previous_score(pipeline, clock):
+    pipeline.main.run_full_analysis()
+    pipeline.router.scores.update(MU=8, AMD=-1, COST=3)
+    pipeline.finnhub.company_news = slow(pipeline.finnhub.company_news, clock, 1)
+    pipeline.router.chat = slow(pipeline.router.chat, clock, 4)
+
+    # News finishes early; scoring uses the rest of the budget and runs out before COST
+    result = pipeline.main.run_full_analysis(deadline_seconds=10)
+    assert result["success"] and result["partial"]
+    scores, stale_news = served()
+    assert stale_news == []
+    assert scores == {"MU": (8, False), "AMD": (-1, False), "COST": (2, True)}
@@ -0,0 +1,85 @@
+"""
+Tests for near-duplicate headline clustering (dedup.py)
+"""
+import random
+
+import dedup
+from dedup import normalize_headline, shingles, cluster_headlines, collapse_articles
+
+
+def test_normalize_headline():
+    assert normalize_headline("  Café Corp. BEATS   estimates!! ") == "cafe corp beats estimates"
+    assert normalize_headline(None) == ""
+
+
+def test_syndicated_copies_are_clustered():
+    headlines = [
+        "Micron beats fiscal Q4 estimates as AI memory demand surges",
+        "Costco October sales rise 8% on strong traffic",
+        "Micron Beats Fiscal Q4 Estimates As AI Memory Demand Surges!",
+        "Micron beats fiscal Q4 estimates as AI memory demand surges - Reuters",
+    ]
+    assert cluster_headlines(headlines) == [[0, 2, 3], [1]]
+
+
+def test_distinct_headlines_stay_apart():
+    headlines = [
+        "Micron beats fiscal Q4 estimates",
+        "AutoZone opens new distribution center in Texas",
+        "Costco raises membership fee for the first time since 2017",
+    ]
+    assert cluster_headlines(headlines) == [[0], [1], [2]]
+
+
+def test_threshold_controls_merging():
+    headlines = ["Micron beats fiscal Q4 estimates", "Micron beats fiscal Q4 estimates, shares jump"]
+    assert cluster_headlines(headlines, threshold=0.5) == [[0, 1]]
+    assert cluster_headlines(headlines, threshold=0.99) == [[0], [1]]
+
+
+def test_collapse_articles_keeps_first_copy_and_sources():
+    articles = [
+        {"headline": "Micron beats fiscal Q4 estimates as AI memory demand surges", "source": "Yahoo"},
+        {"headline": "Micron beats fiscal Q4 estimates as AI memory demand surges", "source": "MarketWatch"},
+        {"headline": "Micron beats fiscal Q4 estimates as AI memory demand surges", "source": "Yahoo"},
+        {"headline": "Costco October sales rise 8% on strong traffic"},
+    ]
+    collapsed = collapse_articles(articles)
+    assert [entry["count"] for entry in collapsed] == [3, 1]
+    assert collapsed[0]["article"] is articles[0]
+    assert collapsed[0]["sources"] == ["Yahoo", "MarketWatch"]
+    assert collapsed[1]["sources"] == ["Unknown source"]
+
+
+def test_empty_input():
+    assert cluster_headlines([]) == []
+    assert collapse_articles([]) == []
+
+
+def near_duplicate_pairs(count=40, low=0.5, high=0.6):
+    """Headline pairs whose shingle Jaccard similarity is just above the default threshold"""
+    rng = random.Random(11)
+    words = ["micron", "costco", "autozone", "shares", "rise", "fall", "after", "quarterly", "results", "beat",
+             "guidance", "analysts", "raise", "target", "memory", "demand", "record", "revenue", "margin", "outlook"]
+    pairs = []
+    while len(pairs) < count:
+        base = [rng.choice(words) for _ in range(9)]
+        edited = list(base)
+        edited[rng.randrange(len(edited))] = rng.choice(words) + "s"
+        edited.insert(rng.randrange(len(edited)), rng.choice(words))
+        a, b = shingles(" ".join(base)), shingles(" ".join(edited))
+        if low <= len(a & b) / len(a | b) < high:
+            pairs.append((" ".join(base), " ".join(edited)))
+    return pairs
+
+
+def test_near_duplicates_just_above_threshold_are_clustered():
+    for first, second in near_duplicate_pairs():
+        assert cluster_headlines([first, second]) == [[0, 1]]
+
+
+def test_lsh_finds_near_duplicates_in_large_inputs(monkeypatch):
+    monkeypatch.setattr(dedup, "EXACT_PAIR_LIMIT", 0)
+    pairs = near_duplicate_pairs()
+    found = sum(cluster_headlines([first, second]) == [[0, 1]] for first, second in pairs)
+    assert found >= 0.9 * len(pairs)
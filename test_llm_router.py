@@ -0,0 +1,141 @@
+"""
+Tests for the hedging LLM endpoint router (llm_router.py)
+"""
+import threading
+import time
+
+import pytest
+import requests
+
+import llm_router
+from llm_router import Endpoint, LLMRouter
+
+
+class FakeEndpoint(Endpoint):
+    """Endpoint answering after `delay` seconds, or raising `error`"""
+
+    def __init__(self, name, delay=0.0, error=None, latencies=()):
+        super().__init__(name, f"http://{name}.invalid")
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.latencies.extend(latencies)
+        self.released = threading.Event()
+
+    def complete(self, messages, model, timeout):
+        self.calls += 1
+        self.released.wait(min(self.delay, timeout))
+        if self.error is not None:
+            self._record(False)
+            raise self.error
+        self._record(True, self.delay)
+        return self.name
+
+
+def warm(p95):
+    """Latency samples whose p95 is `p95`"""
+    return [p95] * llm_router.MIN_LATENCY_SAMPLES
+
+
+def test_fast_primary_is_not_hedged():
+    primary, backup = FakeEndpoint("primary", 0.01, latencies=warm(0.5)), FakeEndpoint("backup")
+    router = LLMRouter([primary, backup], request_timeout=5)
+    assert router.chat([], "model") == "primary"
+    assert backup.calls == 0
+    assert router.stats()["hedged_requests"] == 0
+
+
+def test_straggler_past_p95_is_hedged_to_the_next_endpoint():
+    primary, backup = FakeEndpoint("primary", 5, latencies=warm(0.05)), FakeEndpoint("backup", 0.01, latencies=warm(1))
+    router = LLMRouter([primary, backup], request_timeout=10)
+    started = time.monotonic()
+    try:
+        assert router.chat([], "model") == "backup"
+    finally:
+        primary.released.set()
+    assert time.monotonic() - started < 2
+    assert router.stats()["hedged_requests"] == 1
+
+
+def test_single_endpoint_is_never_hedged():
+    only = FakeEndpoint("groq", 0.3, latencies=warm(0.01))
+    router = LLMRouter([only], request_timeout=5)
+    assert router.chat([], "model") == "groq"
+    assert only.calls == 1
+    assert router.stats()["hedged_requests"] == 0
+
+
+def test_failed_endpoint_fails_over_immediately():
+    broken = FakeEndpoint("broken", error=ValueError("bad gateway"))
+    backup = FakeEndpoint("backup", 0.01)
+    router = LLMRouter([broken, backup], request_timeout=10)
+    started = time.monotonic()
+    assert router.chat([], "model") == "backup"
+    # Well before the default hedge delay
+    assert time.monotonic() - started < 1
+
+
+def test_unhealthy_endpoint_is_ranked_last():
+    flaky, steady = FakeEndpoint("flaky", latencies=warm(0.01)), FakeEndpoint("steady", latencies=warm(1))
+    for _ in range(10):
+        flaky._record(False)
+    assert [e.name for e in LLMRouter([flaky, steady]).ranked_endpoints()] == ["steady", "flaky"]
+
+
+def test_all_endpoints_failing_raises_the_last_error():
+    router = LLMRouter([FakeEndpoint("a", error=ValueError("a down")), FakeEndpoint("b", error=ValueError("b down"))])
+    with pytest.raises(ValueError, match="b down"):
+        router.chat([], "model")
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+    def json(self):
+        return {"choices": [{"message": {"content": self.content}}]}
+
+
+@pytest.fixture
+def responses(monkeypatch):
+    queue = []
+    sleeps = []
+    monkeypatch.setattr(llm_router.requests, "post", lambda *args, **kwargs: queue.pop(0))
+    monkeypatch.setattr(llm_router.time, "sleep", sleeps.append)
+    return queue, sleeps
+
+
+def test_rate_limited_request_is_retried_after_retry_after(responses):
+    queue, sleeps = responses
+    queue.extend([FakeResponse(429, headers={"Retry-After": "1"}), FakeResponse(503), FakeResponse(200, "7")])
+    endpoint = Endpoint("groq", "http://groq.invalid")
+    assert endpoint.complete([], "model", timeout=30) == "7"
+    assert not queue
+    assert sleeps[0] == pytest.approx(1, abs=0.1)
+    assert endpoint.failures == 0 and endpoint.successes == 1
+
+
+def test_client_errors_are_not_retried(responses):
+    queue, sleeps = responses
+    queue.extend([FakeResponse(400), FakeResponse(200, "7")])
+    endpoint = Endpoint("groq", "http://groq.invalid")
+    with pytest.raises(requests.HTTPError):
+        endpoint.complete([], "model", timeout=30)
+    assert len(queue) == 1
+    assert endpoint.failures == 1
+
+
+def test_retries_are_bounded(responses):
+    queue, sleeps = responses
+    queue.extend([FakeResponse(503)] * (llm_router.MAX_RETRIES + 2))
+    endpoint = Endpoint("groq", "http://groq.invalid")
+    with pytest.raises(requests.HTTPError):
+        endpoint.complete([], "model", timeout=30)
+    assert len(queue) == 1
+    assert endpoint.failure_rate() == 1.0
@@ -0,0 +1,58 @@
+"""
+Tests for the keyword-based local scorer (local_scorer.py)
+"""
+from local_scorer import score_headline, score_headlines, score_company, MIN_POLAR_HEADLINES
+
+
+def test_headline_polarity():
+    assert score_headline("Acme beats estimates and raises guidance") > 0
+    assert score_headline("Acme misses estimates, shares plunge") < 0
+    assert score_headline("Acme to report earnings on Tuesday") == 0
+
+
+def test_negation_flips_polarity():
+    assert score_headline("Acme beats estimates") > 0
+    assert score_headline("Acme never beats estimates") < 0
+
+
+def test_no_polar_headlines_has_zero_confidence():
+    for headlines in ([], ["Acme to report earnings on Tuesday"]):
+        result = score_headlines(headlines)
+        assert result["sentiment_score"] == 0
+        assert result["confidence"] == 0.0
+        assert result["mixed"] is False
+
+
+def test_clear_cut_coverage_is_confident():
+    headlines = ["Acme beats estimates", "Acme raises guidance", "Acme shares surge on record revenue"]
+    result = score_headlines(headlines)
+    assert result["positive_headlines"] == 3
+    assert result["negative_headlines"] == 0
+    assert 0 < result["sentiment_score"] <= 10
+    assert result["confidence"] == 1.0
+    assert result["mixed"] is False
+
+
+def test_mixed_coverage_is_flagged():
+    headlines = ["Acme beats estimates", "Acme raises guidance", "Acme shares plunge on weak outlook"]
+    result = score_headlines(headlines)
+    assert result["mixed"] is True
+    assert result["confidence"] < score_headlines(headlines[:2] + ["Acme shares surge"])["confidence"]
+
+
+def test_few_polar_headlines_lower_confidence():
+    one = score_headlines(["Acme beats estimates"])
+    full = score_headlines(["Acme beats estimates"] * MIN_POLAR_HEADLINES)
+    assert one["confidence"] < full["confidence"]
+
+
+def test_score_company_ignores_placeholder_headlines():
+    company = {"article_details": [
+        {"headline": "Acme beats estimates"},
+        {"headline": "No headline"},
+        {"headline": ""},
+        {}
+    ]}
+    result = score_company(company)
+    assert result["positive_headlines"] == 1
+    assert result["neutral_headlines"] == 0
@@ -0,0 +1,62 @@
+"""
+Tests for the memory-mapped ticker index (news_index.py) against the streaming reader
+"""
+import json
+import os
+
+import news_index
+import news_store
+from test_news_store import article, sample_news
+
+
+def many_companies(count=40):
+    data = sample_news()
+    for number in range(count):
+        ticker = f"T{number:03d}"
+        articles = [article(f"https://finnhub.io/api/news?id={number}{i}", f"{ticker} story {i}") for i in range(number % 4)]
+        data["companies"][ticker] = {"earnings_date": "2025-09-26", "earnings_day": "Friday", "article_count": len(articles),
+                                     "urls": [a["url"] for a in articles], "article_details": articles}
+    data["total_companies"] = len(data["companies"])
+    return data
+
+
+def test_index_lookups_match_the_streaming_fallback(tmp_path):
+    path = str(tmp_path / "earnings_news_urls.json")
+    data = many_companies()
+    news_store.save_news_file(data, path)
+
+    assert news_index.open_index(path) is not None
+    assert os.path.exists(news_index.index_path(path))
+    for ticker in list(data["companies"]) + ["ZZZZ", "T999", ""]:
+        expected = news_store.find_company(path, ticker)
+        assert news_index.lookup_company(path, ticker) == expected
+        assert expected == data["companies"].get(ticker)
+
+
+def test_rewritten_file_is_reindexed(tmp_path):
+    path = str(tmp_path / "earnings_news_urls.json")
+    news_store.save_news_file(sample_news(), path)
+    assert news_index.lookup_company(path, "AMD")["article_count"] == 2
+
+    data = sample_news()
+    del data["companies"]["MU"]
+    data["companies"]["AMD"]["article_details"].pop()
+    data["companies"]["AMD"]["urls"].pop()
+    data["companies"]["AMD"]["article_count"] = 1
+    data["total_companies"] = 2
+    news_store.save_news_file(data, path)
+    assert news_index.lookup_company(path, "AMD") == data["companies"]["AMD"]
+    assert news_index.lookup_company(path, "MU") is None
+
+
+def test_unindexable_files_fall_back_to_streaming(tmp_path):
+    v1 = tmp_path / "v1.json"
+    v1.write_text(json.dumps(sample_news()))
+    assert news_index.open_index(str(v1)) is None
+    assert news_index.lookup_company(str(v1), "MU") == sample_news()["companies"]["MU"]
+
+    v2 = str(tmp_path / "v2.json")
+    news_store.save_news_file(sample_news(), v2)
+    with open(news_index.index_path(v2), "wb") as f:
+        f.write(b"not an index")
+    assert news_index.lookup_company(v2, "MU") == sample_news()["companies"]["MU"]
@@ -0,0 +1,111 @@
+"""
+Round-trip tests for the versioned news file (news_store.py)
+"""
+import json
+
+import news_store
+
+
+def article(url, headline, source="Yahoo", when=1758585600):
+    return {"url": url, "headline": headline, "source": source, "datetime": when}
+
+
+def sample_news():
+    shared = article("https://finnhub.io/api/news?id=136900", "Chip stocks rally into earnings", "MarketWatch")
+    mu = [
+        article("https://finnhub.io/api/news?id=136901", "Micron beats estimates"),
+        shared,
+        article("https://example.com/mu-guidance", "Micron raises guidance", "SeekingAlpha", 1758589200),
+    ]
+    amd = [dict(shared), article("https://finnhub.io/api/news?id=136902", "AMD wins cloud contract")]
+
+    def company(date, day, articles):
+        return {
+            "earnings_date": date,
+            "earnings_day": day,
+            "article_count": len(articles),
+            "urls": [a["url"] for a in articles],
+            "article_details": articles
+        }
+
+    return {
+        "earnings_week": "2025-09-22 to 2025-09-28",
+        "generated_at": "2025-09-21T12:00:00",
+        "total_companies": 3,
+        "companies": {
+            "MU": company("2025-09-23", "Tuesday", mu),
+            "AMD": company("2025-09-24", "Wednesday", amd),
+            "COST": company("2025-09-25", "Thursday", [])
+        }
+    }
+
+
+def test_compact_and_expand_round_trip():
+    data = sample_news()
+    compact = news_store.compact_news(data)
+    assert news_store.schema_version(compact) == 2
+    assert news_store.schema_version(data) == 1
+    # The article listed under both tickers is stored once
+    assert len(compact["articles"]) == 4
+    assert news_store.expand_news(compact) == data
+
+
+def test_finnhub_urls_are_rebuilt_from_the_id():
+    compact = news_store.compact_news(sample_news())
+    urls = [row[4] for row in compact["articles"]]
+    assert urls.count(None) == 3
+    assert "https://example.com/mu-guidance" in urls
+
+
+def test_save_and_load_round_trip(tmp_path):
+    data = sample_news()
+    path = str(tmp_path / "earnings_news_urls.json")
+    news_store.save_news_file(data, path)
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    assert raw.startswith(b'{"schema_version":2')
+    json.loads(raw)  # still one valid JSON document
+
+    assert news_store.load_news_file(path) == data
+    assert news_store.schema_version(news_store.load_news_file(path, expand=False)) == 2
+
+
+def test_version_1_file_is_read_and_rewritten(tmp_path):
+    data = sample_news()
+    v1 = tmp_path / "v1.json"
+    v1.write_text(json.dumps(data, indent=2))
+    assert news_store.load_news_file(str(v1)) == data
+
+    v2 = str(tmp_path / "v2.json")
+    news_store.save_news_file(news_store.load_news_file(str(v1)), v2)
+    assert news_store.load_news_file(v2) == data
+
+
+def test_streaming_readers_match_full_load(tmp_path):
+    data = sample_news()
+    v1 = tmp_path / "v1.json"
+    v1.write_text(json.dumps(data, indent=2))
+    v2 = str(tmp_path / "v2.json")
+    news_store.save_news_file(data, v2)
+
+    header = {key: value for key, value in data.items() if key != "companies"}
+    for path in (str(v1), v2):
+        assert news_store.read_header(path) == header
+        assert dict(news_store.iter_companies(path)) == data["companies"]
+        assert news_store.find_company(path, "AMD") == data["companies"]["AMD"]
+        assert news_store.find_company(path, "ZZZZ") is None
+
+        stripped = dict(news_store.iter_companies(path, articles=False))
+        assert stripped["MU"] == {"earnings_date": "2025-09-23", "earnings_day": "Tuesday", "article_count": 3}
+
+        records = dict(news_store.iter_companies(path, records=True))
+        assert list(records["MU"]["urls"]) == data["companies"]["MU"]["urls"]
+        assert [r.headline for r in records["MU"]["article_details"]] == [a["headline"] for a in data["companies"]["MU"]["article_details"]]
+
+
+def test_missing_file(tmp_path):
+    path = str(tmp_path / "missing.json")
+    assert news_store.load_news_file(path) is None
+    assert news_store.read_header(path) is None
+    assert list(news_store.iter_companies(path)) == []
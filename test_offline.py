@@ -0,0 +1,59 @@
+"""
+Tests for offline re-analysis from stored data (offline.py)
+"""
+import headline_cache
+import news_store
+import offline
+import sentiment_history
+import snapshots
+from prompts import HEADLINE_PROMPT_VERSION
+
+
+def offline_scores(result):
+    return {ticker: (r["sentiment_score"], r["score_source"]) for ticker, r in result["sentiment_results"].items()}
+
+
+def test_stored_scores_are_reused_without_network(pipeline):
+    pipeline.main.run_full_analysis()
+    calls = (len(pipeline.finnhub.calls), len(pipeline.router.calls))
+
+    result = offline.run_offline_analysis()
+    assert result["success"]
+    assert offline_scores(result) == {"MU": (6, "stored"), "AMD": (-3, "stored"), "COST": (2, "stored")}
+    assert result["earnings_data"]["daily_breakdown"]["2025-09-23"]["symbols"] == ["MU", "AMD"]
+    assert result["generation"] is None
+    assert (len(pipeline.finnhub.calls), len(pipeline.router.calls)) == calls
+
+
+def test_cached_headline_scores_come_first(pipeline):
+    pipeline.main.run_full_analysis()
+    companies = dict(news_store.iter_companies(snapshots.resolve_current()["news_path"]))
+    cache = {}
+    headline_cache.store_scores(cache, [(a, 9) for a in companies["MU"]["article_details"]], "MU", HEADLINE_PROMPT_VERSION)
+    # Too few of AMD's headlines are cached, so its stored score is kept
+    headline_cache.store_scores(cache, [(companies["AMD"]["article_details"][0], 9)], "AMD", HEADLINE_PROMPT_VERSION)
+    headline_cache.save_cache(cache)
+
+    result = offline.run_offline_analysis()
+    assert offline_scores(result) == {"MU": (9, "headlines"), "AMD": (-3, "stored"), "COST": (2, "stored")}
+
+
+def test_local_rescore_can_be_published(pipeline):
+    pipeline.main.run_full_analysis()
+    generation = snapshots.current_generation()
+
+    result = offline.run_offline_analysis(source="local", publish=True)
+    assert result["generation"] == generation + 1
+    assert {r["scored_by"] for r in result["sentiment_results"].values()} == {"local"}
+    assert snapshots.load_manifest(result["generation"])["note"] == "offline re-analysis (local)"
+    served = snapshots.read_json(snapshots.resolve_current()["sentiment_path"])
+    assert served["offline"] is True
+    recorded = [entry for entry in sentiment_history.query("2020-01-01", "2100-01-01")
+                if entry["generation"] == result["generation"]]
+    assert sorted(entry["ticker"] for entry in recorded) == ["AMD", "COST", "MU"]
+
+
+def test_missing_snapshot(pipeline):
+    result = offline.run_offline_analysis(generation=42)
+    assert not result["success"]
+    assert "No stored news data" in result["error"]
@@ -0,0 +1,61 @@
+"""
+Tests for single-ticker refreshes merged into the current snapshot (main.refresh_ticker)
+"""
+import news_store
+import sentiment_history
+import snapshots
+from conftest import make_article
+
+
+def served():
+    current = snapshots.resolve_current()
+    companies = dict(news_store.iter_companies(current["news_path"]))
+    scores = {r["ticker"]: r["sentiment_score"]
+              for r in snapshots.read_json(current["sentiment_path"])["sentiment_results"]}
+    return companies, scores
+
+
+def test_refresh_replaces_one_ticker_and_keeps_the_rest(pipeline):
+    pipeline.main.run_full_analysis()
+    before, _ = served()
+    pipeline.finnhub.calls.clear()
+    pipeline.router.calls.clear()
+    pipeline.news["MU"].append(make_article("MU", 3, source="Reuters"))
+    pipeline.router.scores.update(MU=9, AMD=5)
+
+    result = pipeline.main.refresh_ticker("mu")
+    assert result["success"]
+    assert pipeline.finnhub.calls == ["MU"]
+    assert set(pipeline.router.calls) == {"MU"}
+
+    companies, scores = served()
+    assert list(companies) == list(before)
+    assert companies["MU"]["article_count"] == 4
+    assert companies["AMD"] == before["AMD"] and companies["COST"] == before["COST"]
+    assert scores == {"MU": 9, "AMD": -3, "COST": 2}
+    assert snapshots.load_manifest(result["generation"])["note"] == "refresh MU"
+    # Only the rescored ticker is a new observation in the history
+    recorded = [entry["ticker"] for entry in sentiment_history.query("2020-01-01", "2100-01-01")
+                if entry["generation"] == result["generation"]]
+    assert recorded == ["MU"]
+
+
+def test_ticker_without_articles_any_more_is_removed(pipeline):
+    pipeline.main.run_full_analysis()
+    pipeline.news["AMD"] = []
+
+    assert pipeline.main.refresh_ticker("AMD")["success"]
+    companies, scores = served()
+    assert sorted(companies) == ["COST", "MU"]
+    assert sorted(scores) == ["COST", "MU"]
+
+
+def test_unknown_ticker_publishes_nothing(pipeline):
+    pipeline.main.run_full_analysis()
+    generation = snapshots.current_generation()
+
+    result = pipeline.main.refresh_ticker("ZZZZ")
+    assert not result["success"]
+    assert result["error"] == "Ticker ZZZZ is not in the current snapshot"
+    assert snapshots.current_generation() == generation
+    assert pipeline.finnhub.calls.count("ZZZZ") == 0
@@ -0,0 +1,99 @@
+"""
+Tests for the sentiment trend metrics (sentiment_analytics.py)
+"""
+import json
+import random
+import time
+
+import pytest
+
+import sentiment_history
+import snapshots
+from sentiment_analytics import compute_trends, top_movers, trends_for_generation
+
+DAY = 86400
+
+
+def entries_for(history):
+    """History entries from {ticker: [score, ...]}, one observation per day, shuffled"""
+    entries = [
+        {"ts": 1758000000 + day * DAY, "ticker": ticker, "sentiment_score": score}
+        for ticker, scores in history.items()
+        for day, score in enumerate(scores)
+    ]
+    random.Random(7).shuffle(entries)
+    return entries
+
+
+def test_empty_history():
+    assert compute_trends([]) == {}
+
+
+def test_deltas_and_moving_average():
+    trends = compute_trends(entries_for({"MU": [1, 2, 3, 4, 5, 9], "AMD": [4, 2]}), window=5)
+
+    mu = trends["MU"]
+    assert mu["sentiment_score"] == 9
+    assert mu["previous_score"] == 5
+    assert mu["sentiment_delta"] == 4
+    assert mu["moving_average"] == pytest.approx((2 + 3 + 4 + 5 + 9) / 5)
+    assert mu["observations"] == 6
+    assert mu["last_recorded"] == 1758000000 + 5 * DAY
+
+    amd = trends["AMD"]
+    assert amd["sentiment_delta"] == -2
+    assert amd["moving_average"] == 3
+
+
+def test_zscore_against_earlier_scores():
+    trends = compute_trends(entries_for({"MU": [1, 2, 3, 4, 5, 9], "FLAT": [3, 3, 3, 7], "NEW": [6]}))
+    # Baseline 1..5: mean 3, sample standard deviation sqrt(2.5)
+    assert trends["MU"]["zscore"] == pytest.approx((9 - 3) / 2.5 ** 0.5, abs=1e-3)
+    # No spread in the baseline, or no baseline at all: undefined
+    assert trends["FLAT"]["zscore"] is None
+    assert trends["NEW"]["zscore"] is None
+    assert trends["NEW"]["previous_score"] is None
+    assert trends["NEW"]["sentiment_delta"] is None
+
+
+def test_cross_sectional_ranks():
+    trends = compute_trends(entries_for({"UP": [0, 6], "DOWN": [5, -3], "SAME": [8, 8], "NEW": [2]}))
+    assert {t: m["score_rank"] for t, m in trends.items()} == {"SAME": 1, "UP": 2, "NEW": 3, "DOWN": 4}
+    assert {t: m["delta_rank"] for t, m in trends.items()} == {"UP": 1, "SAME": 2, "DOWN": 3, "NEW": None}
+    assert {t: m["mover_rank"] for t, m in trends.items()} == {"DOWN": 1, "UP": 2, "SAME": 3, "NEW": None}
+
+
+def test_tied_scores_share_a_rank():
+    trends = compute_trends(entries_for({"A": [5], "B": [5], "C": [1]}))
+    assert [trends[t]["score_rank"] for t in ("A", "B", "C")] == [1, 1, 3]
+
+
+def test_integer_scores_stay_integers():
+    trends = compute_trends(entries_for({"MU": [1, 3]}))
+    assert isinstance(trends["MU"]["sentiment_score"], int)
+    assert isinstance(trends["MU"]["sentiment_delta"], int)
+
+    trends = compute_trends(entries_for({"MU": [1.5, 3]}))
+    assert trends["MU"]["sentiment_delta"] == 1.5
+
+
+def test_top_movers():
+    trends = compute_trends(entries_for({"UP": [0, 6], "DOWN": [5, -3], "SAME": [8, 8], "NEW": [2]}))
+    assert [t for t, _ in top_movers(trends)] == ["DOWN", "UP", "SAME"]
+    assert [t for t, _ in top_movers(trends, top=1)] == ["DOWN"]
+    assert [t for t, _ in top_movers(trends, direction="up")] == ["UP"]
+    assert [t for t, _ in top_movers(trends, direction="down")] == ["DOWN"]
+
+
+def test_cached_trends_pick_up_appended_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open("sentiment.json", "w") as f:
+        json.dump({"sentiment_results": [{"ticker": "MU", "sentiment_score": 2, "articles_analyzed": 3}]}, f)
+    generation = snapshots.publish(sentiment_file="sentiment.json")
+    assert trends_for_generation(generation)["MU"]["observations"] == 1
+
+    # A backfilled week lands in the history after the generation was published
+    sentiment_history.append_run([{"ticker": "MU", "sentiment_score": -4}], recorded_at=time.time() - 7 * DAY)
+    mu = trends_for_generation(generation)["MU"]
+    assert mu["observations"] == 2
+    assert mu["previous_score"] == -4
@@ -0,0 +1,122 @@
+"""
+Tests for sharded execution (shard.py): workers over a shared store, then merge
+"""
+import multiprocessing
+import os
+
+import pytest
+
+import shard
+import snapshots
+from articles import ArticleRecord
+
+CALENDAR = {
+    "2025-09-22": ["AZO", "MU", "FDS"],
+    "2025-09-23": ["COST", "AMD", "KBH", "CTAS"],
+    "2025-09-24": ["NKE", "FUL", "JEF"],
+}
+SHARDS = 3
+
+
+@pytest.fixture
+def store(pipeline, monkeypatch):
+    """A planned shard store, with fetch_company_news and score_company_record stubbed"""
+    pipeline.calendar.clear()
+    pipeline.calendar.update(CALENDAR)
+    pipeline.fetch_errors = set()
+    pipeline.score_errors = set()
+    pipeline.scored = []
+
+    def fetch_company_news(symbol, start_str, end_str):
+        if symbol in pipeline.fetch_errors:
+            raise RuntimeError(f"Finnhub error for {symbol}")
+        urls = [ArticleRecord(f"https://example.com/{symbol}/{i}", f"{symbol} story {i}", "Yahoo", 1758500000 + i)
+                for i in range(2)]
+        return {"urls": urls, "article_count": len(urls), "unique_sources": 1, "sources": ["Yahoo"]}
+
+    def score_company_record(ticker, company_data, cascade=False, confidence_threshold=None, cache=None, prepared=None):
+        pipeline.scored.append(ticker)
+        if ticker in pipeline.score_errors:
+            return {"ticker": ticker, "sentiment_score": 0, "articles_analyzed": 0, "scored_by": "llm", "error": True}
+        return {"ticker": ticker, "sentiment_score": len(ticker), "articles_analyzed": company_data["article_count"],
+                "scored_by": "llm"}
+
+    monkeypatch.setattr(pipeline.main, "fetch_company_news", fetch_company_news)
+    monkeypatch.setattr(pipeline.llm, "score_company_record", score_company_record)
+    shard.plan("store")
+    return pipeline
+
+
+def calendar_order():
+    return [ticker for date in sorted(CALENDAR) for ticker in CALENDAR[date]]
+
+
+def served():
+    current = snapshots.resolve_current()
+    results = snapshots.read_json(current["sentiment_path"])["sentiment_results"]
+    return [r["ticker"] for r in results], snapshots.read_json(current["news_path"])
+
+
+def test_every_shard_is_non_empty():
+    assert {shard.shard_of(ticker, SHARDS) for ticker in calendar_order()} == set(range(SHARDS))
+
+
+def test_workers_in_separate_processes_then_merge(store):
+    # fork keeps the stubs; each worker is a real process writing to the shared store
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=shard.run_worker, args=(number, SHARDS, "store")) for number in range(SHARDS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+    assert [worker.exitcode for worker in workers] == [0] * SHARDS
+
+    shard.merge(SHARDS, "store")
+    tickers, news = served()
+    assert tickers == calendar_order()
+    assert sorted(news["companies"]) == sorted(calendar_order())
+    assert snapshots.load_manifest(snapshots.current_generation())["note"] == f"merged from {SHARDS} shards"
+
+
+def test_failed_tickers_are_retried_and_block_the_merge(store):
+    store.fetch_errors.add("MU")
+    store.score_errors.add("COST")
+    failing = {shard.shard_of("MU", SHARDS), shard.shard_of("COST", SHARDS)}
+
+    for number in range(SHARDS):
+        if number in failing:
+            with pytest.raises(RuntimeError, match="re-run the worker"):
+                shard.run_worker(number, SHARDS, "store")
+            assert not os.path.exists(shard.shard_path("store", number, SHARDS))
+        else:
+            shard.run_worker(number, SHARDS, "store")
+    with pytest.raises(RuntimeError, match="Shards not finished"):
+        shard.merge(SHARDS, "store")
+
+    # The re-run only redoes the failed tickers
+    store.fetch_errors.clear()
+    store.score_errors.clear()
+    store.scored.clear()
+    for number in failing:
+        shard.run_worker(number, SHARDS, "store")
+    assert sorted(store.scored) == ["COST", "MU"]
+
+    shard.merge(SHARDS, "store")
+    tickers, _ = served()
+    assert tickers == calendar_order()
+
+
+def test_shared_keys_split_both_rate_limits(monkeypatch):
+    for name in ("FINNHUB_API_KEY", "GROQ_API_KEY", "FINNHUB_API_KEY_1", "GROQ_API_KEY_1"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("FINNHUB_CALLS_PER_MINUTE", "60")
+    monkeypatch.setenv("GROQ_CALLS_PER_MINUTE", "28")
+    shard.use_shard_keys(1, 4)
+    assert float(os.environ["FINNHUB_CALLS_PER_MINUTE"]) == 15
+    assert float(os.environ["GROQ_CALLS_PER_MINUTE"]) == 7
+
+    monkeypatch.setenv("GROQ_CALLS_PER_MINUTE", "28")
+    monkeypatch.setenv("GROQ_API_KEY_1", "shard-one-key")
+    shard.use_shard_keys(1, 4)
+    assert os.environ["GROQ_API_KEY"] == "shard-one-key"
+    assert float(os.environ["GROQ_CALLS_PER_MINUTE"]) == 28
@@ -0,0 +1,78 @@
+"""
+Tests for published snapshot generations (snapshots.py)
+"""
+import json
+import os
+
+import pytest
+
+import snapshots
+
+
+def write_news(path, week, tickers):
+    companies = {ticker: {"earnings_date": "2025-09-23", "article_count": 1,
+                          "urls": [f"https://example.com/{ticker}"],
+                          "article_details": [{"url": f"https://example.com/{ticker}", "headline": f"{ticker} news",
+                                               "source": "Yahoo", "datetime": 1758500000}]}
+                 for ticker in tickers}
+    with open(path, "w") as f:
+        json.dump({"earnings_week": week, "total_companies": len(companies), "companies": companies}, f)
+    return path
+
+
+def write_sentiment(path, scores):
+    with open(path, "w") as f:
+        json.dump({"sentiment_results": [{"ticker": ticker, "sentiment_score": score, "articles_analyzed": 1}
+                                         for ticker, score in scores.items()]}, f)
+    return path
+
+
+def served_scores(generation=None):
+    data = snapshots.read_json(snapshots.resolve(generation)["sentiment_path"])
+    return {r["ticker"]: r["sentiment_score"] for r in data["sentiment_results"]}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_before_the_first_publish_the_working_directory_files_are_served(workdir):
+    assert snapshots.current_generation() is None
+    assert snapshots.resolve_current() == {"generation": None, "news_path": snapshots.NEWS_FILENAME,
+                                           "sentiment_path": snapshots.SENTIMENT_FILENAME}
+
+
+def test_publish_carries_forward_the_files_it_is_not_given(workdir):
+    first = snapshots.publish(write_news("news.json", "Sep 22 - Sep 28, 2025", ["MU", "AMD"]),
+                              write_sentiment("sentiment.json", {"MU": 6, "AMD": -3}), note="full run")
+    second = snapshots.publish(sentiment_file=write_sentiment("sentiment.json", {"MU": 8, "AMD": -3}), note="rescore")
+
+    assert (first, second) == (1, 2)
+    assert snapshots.current_generation() == 2
+    manifest = snapshots.load_manifest(second)
+    assert manifest["previous_generation"] == 1
+    assert manifest["news_generation"] == 1 and manifest["sentiment_generation"] == 2
+    assert manifest["earnings_week"] == "Sep 22 - Sep 28, 2025" and manifest["total_companies"] == 2
+    assert served_scores() == {"MU": 8, "AMD": -3}
+    # Each generation keeps its own copy: rewriting the input changed nothing already published
+    assert served_scores(first) == {"MU": 6, "AMD": -3}
+    assert not [name for name in os.listdir("snapshots") if name.startswith(".staging-")]
+
+
+def test_rollback_points_current_and_the_working_copies_back(workdir):
+    snapshots.publish(write_news("news.json", "W1", ["MU"]), write_sentiment("sentiment.json", {"MU": 6}))
+    snapshots.publish(write_news("news.json", "W1", ["MU", "AMD"]), write_sentiment("sentiment.json", {"MU": 1, "AMD": 2}))
+
+    assert snapshots.rollback(1) == 1
+    assert snapshots.current_generation() == 1
+    assert served_scores() == {"MU": 6}
+    assert snapshots.read_json(snapshots.SENTIMENT_FILENAME)["sentiment_results"][0]["sentiment_score"] == 6
+    # Nothing is deleted: rolling forward again is another rollback
+    assert snapshots.list_generations() == [1, 2]
+    assert snapshots.diff_generations(1, 2)["added"] == ["AMD"]
+
+    with pytest.raises(ValueError, match="does not exist"):
+        snapshots.rollback(7)
+    assert snapshots.current_generation() == 1
@@ -0,0 +1,58 @@
+"""
+Tests for the stage DAG runner and its content-addressed stage cache (stage_runner.py)
+"""
+import stage_runner
+from conftest import make_article
+
+
+def run():
+    result = stage_runner.run_pipeline()
+    assert result["success"], result["error"]
+    return result
+
+
+def test_unchanged_inputs_reuse_every_stage(pipeline):
+    first = run()
+    assert first["executed"] == {"calendar": 1, "news": 3, "persist": 1, "sentiment": 3, "publish": 1}
+    calls = (len(pipeline.finnhub.calls), len(pipeline.router.calls))
+
+    second = run()
+    assert second["executed"] == {"calendar": 1}
+    assert second["reused"] == {"news": 3, "persist": 1, "sentiment": 3, "publish": 1}
+    assert second["generation"] == first["generation"]
+    assert (len(pipeline.finnhub.calls), len(pipeline.router.calls)) == calls
+
+
+def test_calendar_change_only_runs_the_new_ticker(pipeline):
+    run()
+    pipeline.calendar["2025-09-24"].append("KBH")
+    pipeline.news["KBH"] = [make_article("KBH", i) for i in range(2)]
+    pipeline.router.scores["KBH"] = 4
+    pipeline.finnhub.calls.clear()
+    pipeline.router.calls.clear()
+
+    result = run()
+    assert result["executed"] == {"calendar": 1, "news": 1, "persist": 1, "sentiment": 1, "publish": 1}
+    assert pipeline.finnhub.calls == ["KBH"]
+    assert set(pipeline.router.calls) == {"KBH"}
+
+
+def test_model_change_rescores_without_refetching(pipeline, monkeypatch):
+    run()
+    monkeypatch.setattr(pipeline.llm, "SENTIMENT_MODEL", "another-model")
+    pipeline.finnhub.calls.clear()
+
+    result = run()
+    assert result["executed"] == {"calendar": 1, "sentiment": 3, "publish": 1}
+    assert pipeline.finnhub.calls == []
+
+
+def test_failed_scores_are_not_cached(pipeline):
+    pipeline.router.failing.add("MU")
+    run()
+    pipeline.router.failing.clear()
+    pipeline.router.calls.clear()
+
+    result = run()
+    assert result["executed"] == {"calendar": 1, "sentiment": 1, "publish": 1}
+    assert set(pipeline.router.calls) == {"MU"}
@@ -0,0 +1,45 @@
+"""
+Tests for the cross-process data lock (store_lock.py)
+"""
+import multiprocessing
+
+import store_lock
+
+
+def hold_shared(path, ready, done):
+    handle = store_lock.acquire(path=path)
+    ready.set()
+    done.wait(10)
+    store_lock.release(handle)
+
+
+def test_writers_share_the_lock_and_keep_compaction_out(tmp_path):
+    path = str(tmp_path / "history" / ".lock")
+    first, second = store_lock.acquire(path=path), store_lock.acquire(path=path)
+    assert first is not None and second is not None
+    assert store_lock.acquire(exclusive=True, blocking=False, path=path) is None
+
+    store_lock.release(first)
+    store_lock.release(second)
+    compaction = store_lock.acquire(exclusive=True, blocking=False, path=path)
+    assert compaction is not None
+    assert store_lock.acquire(blocking=False, path=path) is None
+    store_lock.release(compaction)
+
+
+def test_a_run_in_another_process_blocks_compaction(tmp_path):
+    path = str(tmp_path / ".lock")
+    context = multiprocessing.get_context("fork")
+    ready, done = context.Event(), context.Event()
+    writer = context.Process(target=hold_shared, args=(path, ready, done))
+    writer.start()
+    try:
+        assert ready.wait(10)
+        assert store_lock.acquire(exclusive=True, blocking=False, path=path) is None
+    finally:
+        done.set()
+        writer.join(10)
+    assert writer.exitcode == 0
+    compaction = store_lock.acquire(exclusive=True, blocking=False, path=path)
+    assert compaction is not None
+    store_lock.release(compaction)
@@ -0,0 +1,58 @@
+"""
+Tests for the streaming fetch -> score pipeline (main.run_streaming_analysis)
+"""
+import snapshots
+import sentiment_history
+
+
+def served_scores():
+    data = snapshots.read_json(snapshots.resolve_current()["sentiment_path"])
+    return {r["ticker"]: (r["sentiment_score"], bool(r.get("stale"))) for r in data["sentiment_results"]}
+
+
+def test_results_are_published_as_they_complete(pipeline):
+    result = pipeline.main.run_streaming_analysis(publish_interval=0)
+    assert result["success"] and not result["partial"]
+
+    generations = snapshots.list_generations()
+    notes = [snapshots.load_manifest(g)["note"] for g in generations]
+    assert notes == ["streaming (in progress)"] * 3 + ["streaming"]
+    # The first generation was served while only MU was scored
+    first = snapshots.read_json(snapshots.resolve(generations[0])["sentiment_path"])
+    assert first["in_progress"] is True
+    assert [r["ticker"] for r in first["sentiment_results"]] == ["MU"]
+
+    assert served_scores() == {"MU": (6, False), "AMD": (-3, False), "COST": (2, False)}
+    # Each score is recorded in the history once, not once per publish
+    entries = sentiment_history.query("2020-01-01", "2100-01-01")
+    assert sorted(entry["ticker"] for entry in entries) == ["AMD", "COST", "MU"]
+
+
+def test_failed_ticker_keeps_its_previous_score(pipeline):
+    pipeline.main.run_streaming_analysis(publish_interval=3600)
+    pipeline.router.scores.update(MU=8, COST=1)
+    pipeline.router.failing.add("AMD")
+
+    result = pipeline.main.run_streaming_analysis(publish_interval=3600)
+    assert result["failed"] == ["AMD"]
+    assert result["partial"]
+    assert "AMD" not in result["sentiment_results"]
+    assert served_scores() == {"MU": (8, False), "AMD": (-3, True), "COST": (1, False)}
+
+
+def test_deadline_carries_the_rest_forward(pipeline):
+    pipeline.main.run_streaming_analysis(publish_interval=3600)
+    calls = len(pipeline.router.calls)
+
+    result = pipeline.main.run_streaming_analysis(publish_interval=3600, deadline_seconds=1e-6)
+    assert result["success"] and result["partial"]
+    assert len(pipeline.router.calls) == calls
+    assert served_scores() == {"MU": (6, True), "AMD": (-3, True), "COST": (2, True)}
+    assert snapshots.load_manifest(snapshots.current_generation())["note"] == "streaming, partial"
+
+
+def test_streaming_runs_cannot_be_resumed(pipeline):
+    result = pipeline.main.run_full_analysis(streaming=True, resume=True)
+    assert not result["success"]
+    assert "cannot be resumed" in result["error"]
+    assert snapshots.current_generation() is None
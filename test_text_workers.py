@@ -0,0 +1,65 @@
+"""
+Tests for the text stage process pool (text_workers.py)
+"""
+import pytest
+
+import text_workers
+from conftest import make_article
+
+
+def companies(count=40):
+    items = []
+    for number in range(count):
+        ticker = f"T{number:03d}"
+        articles = [make_article(ticker, i) for i in range(number % 5)]
+        items.append((ticker, {"earnings_date": "2025-09-23", "earnings_day": "Tuesday",
+                               "article_count": len(articles), "article_details": articles}))
+    return items
+
+
+def in_process(items):
+    return [text_workers.prepare_company(ticker, company_data) for ticker, company_data in items]
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setenv("TEXT_WORKERS", "2")
+    # Several blocks per run, so the next block is prepared while the caller works on one
+    monkeypatch.setattr(text_workers, "BLOCK_SIZE", 12)
+    monkeypatch.setattr(text_workers, "MIN_PARALLEL_COMPANIES", 4)
+    text_workers.shutdown()
+    yield
+    text_workers.shutdown()
+
+
+def test_pool_results_match_the_calling_process(pool):
+    items = companies()
+    assert text_workers.get_pool() is not None
+    assert text_workers.prepare_all(items) == in_process(items)
+
+
+def test_stream_keeps_order_and_skips(pool):
+    items = companies()
+    skip = {"T001", "T013", "T030"}
+    expected = dict(zip((ticker for ticker, _ in items), in_process(items)))
+
+    streamed = list(text_workers.prepared_stream(iter(items), skip=skip))
+    assert [ticker for ticker, _, _ in streamed] == [ticker for ticker, _ in items]
+    for ticker, company_data, prepared in streamed:
+        assert company_data is dict(items)[ticker]
+        assert prepared == (None if ticker in skip else expected[ticker])
+
+
+def test_stopping_early_drops_the_queued_work(pool):
+    stream = text_workers.prepared_stream(iter(companies()))
+    assert [next(stream)[0] for _ in range(3)] == ["T000", "T001", "T002"]
+    stream.close()
+    # The pool is still usable afterwards
+    assert text_workers.prepare_all(companies(8)) == in_process(companies(8))
+
+
+def test_no_pool_without_workers(monkeypatch):
+    monkeypatch.setenv("TEXT_WORKERS", "0")
+    assert text_workers.get_pool() is None
+    streamed = list(text_workers.prepared_stream(iter(companies(20))))
+    assert all(prepared is None for _, _, prepared in streamed)
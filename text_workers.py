@@ -0,0 +1,223 @@
+"""
+Process pool for the CPU-bound text stages of sentiment scoring
+
+Near-duplicate clustering (dedup.py), lexicon scoring (local_scorer.py) and
+prompt rendering (prompts.py) are pure Python and hold the GIL. Run inside the
+Flask process they compete with request threads, so for larger weeks they are
+run in worker processes instead: companies are sent in chunks, and while the
+caller works through one block (LLM calls) the next block is already being
+prepared.
+
+Workers are started with forkserver (spawn where unavailable) rather than fork,
+since the web process has scheduler and request threads running, and they run
+at a lower priority so the web workers stay responsive during a refresh.
+
+TEXT_WORKERS sets the number of worker processes (default: one less than the
+CPU count; 0 or 1 prepares everything in the calling process). As with any
+non-fork pool, workers import the entry script, so scripts keep their work under
+`if __name__ == "__main__"`.
+"""
+
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from local_scorer import score_company
+from prompts import build_company_prompt
+
+# Companies per task sent to a worker, and per block prepared ahead of the caller
+CHUNK_SIZE = 8
+BLOCK_SIZE = 128
+
+# Fewer companies than this are prepared in the calling process (not worth the round-trip)
+MIN_PARALLEL_COMPANIES = 16
+
+# Added to the workers' nice value
+WORKER_NICENESS = 5
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def worker_count():
+    value = os.getenv("TEXT_WORKERS")
+    if value:
+        return max(0, int(value))
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def _init_worker():
+    if hasattr(os, "nice"):
+        try:
+            os.nice(WORKER_NICENESS)
+        except OSError:
+            pass
+
+
+def get_pool():
+    """
+    The shared worker pool, started on first use (None when TEXT_WORKERS allows no parallelism)
+    """
+    global _pool
+    workers = worker_count()
+    if workers <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method),
+                                        initializer=_init_worker)
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown)
+
+
+def _payload(company_data):
+    """
+    The parts of a company record the text stages read, as plain picklable values
+    """
+    return {
+        "earnings_date": company_data.get('earnings_date', 'Unknown'),
+        "earnings_day": company_data.get('earnings_day', 'Unknown'),
+        "article_count": company_data.get('article_count', 0),
+        "article_details": [
+            {key: article[key] for key in ('headline', 'source', 'datetime') if key in article}
+            for article in company_data.get('article_details', [])
+        ]
+    }
+
+
+def prepare_company(ticker, company_data, local=True, prompt=True, collapse_duplicates=True):
+    """
+    Run the local text stages for one company
+
+    Args:
+        local (bool): Lexicon score (local_scorer.score_company), for cascade mode
+        prompt (bool): Render the company prompt (with near-duplicates collapsed unless collapse_duplicates is False)
+
+    Returns:
+        dict: local (score dict or None) and prompt (build_company_prompt output or None)
+    """
+    if company_data.get('article_count', 0) == 0:
+        return {"local": None, "prompt": None}
+    return {
+        "local": score_company(company_data) if local else None,
+        "prompt": build_company_prompt(company_data, ticker, collapse_duplicates=collapse_duplicates) if prompt else None
+    }
+
+
+def _prepare_chunk(chunk, local, prompt, collapse_duplicates):
+    return [prepare_company(ticker, payload, local, prompt, collapse_duplicates) for ticker, payload in chunk]
+
+
+def _submit_block(pool, block, local, prompt, collapse_duplicates):
+    """
+    Send a block of (ticker, company_data) pairs to the pool in chunks
+
+    Returns:
+        list: Futures, one per chunk
+    """
+    chunks = [[(ticker, _payload(company_data)) for ticker, company_data in block[start:start + CHUNK_SIZE]]
+              for start in range(0, len(block), CHUNK_SIZE)]
+    return [pool.submit(_prepare_chunk, chunk, local, prompt, collapse_duplicates) for chunk in chunks]
+
+
+def _collect(futures, block, local, prompt, collapse_duplicates):
+    """
+    Results of a submitted block, prepared in this process when the pool broke
+    """
+    try:
+        return [prepared for future in futures for prepared in future.result()]
+    except BrokenProcessPool:
+        shutdown()
+        return [prepare_company(ticker, company_data, local, prompt, collapse_duplicates) for ticker, company_data in block]
+
+
+def prepare_all(items, local=True, prompt=True, collapse_duplicates=True):
+    """
+    Prepare every company, spread over the worker pool
+
+    Args:
+        items (list): (ticker, company_data) pairs
+
+    Returns:
+        list: prepare_company results, in the order of items
+    """
+    items = list(items)
+    pool = get_pool() if len(items) >= MIN_PARALLEL_COMPANIES else None
+    if pool is None:
+        return [prepare_company(ticker, company_data, local, prompt, collapse_duplicates) for ticker, company_data in items]
+    return _collect(_submit_block(pool, items, local, prompt, collapse_duplicates), items, local, prompt, collapse_duplicates)
+
+
+def prepared_stream(items, local=True, prompt=True, collapse_duplicates=True, skip=()):
+    """
+    Yield (ticker, company_data, prepared) with the next block prepared in the pool while the caller works
+
+    prepared is None where nothing was prepared ahead (no pool, a small week, a skipped
+    ticker); the caller then runs the stages itself.
+
+    Args:
+        items (iterable): (ticker, company_data) pairs, e.g. news_store.iter_companies(...)
+        skip (set): Tickers that need no preparation (yielded with prepared None)
+
+    Yields:
+        tuple: (ticker, company_data, prepare_company result or None)
+    """
+    def blocks():
+        block = []
+        for item in items:
+            block.append(item)
+            if len(block) == BLOCK_SIZE:
+                yield block
+                block = []
+        if block:
+            yield block
+
+    pool = get_pool() if local or prompt else None
+    if pool is None:
+        for ticker, company_data in items:
+            yield ticker, company_data, None
+        return
+
+    pending = None
+    try:
+        for block in blocks():
+            wanted = [(ticker, company_data) for ticker, company_data in block if ticker not in skip]
+            if pending is not None or len(wanted) >= MIN_PARALLEL_COMPANIES:
+                submitted = (block, wanted, _submit_block(pool, wanted, local, prompt, collapse_duplicates))
+            else:
+                submitted = (block, wanted, None)
+
+            if pending is not None:
+                yield from _finish(pending, local, prompt, collapse_duplicates)
+            pending = submitted
+        if pending is not None:
+            yield from _finish(pending, local, prompt, collapse_duplicates)
+            pending = None
+    finally:
+        # The caller stopped early (e.g. a deadline): drop the work queued for it
+        if pending is not None and pending[2] is not None:
+            for future in pending[2]:
+                future.cancel()
+
+
+def _finish(submitted, local, prompt, collapse_duplicates):
+    block, wanted, futures = submitted
+    prepared = {}
+    if futures is not None:
+        prepared = dict(zip((ticker for ticker, _ in wanted), _collect(futures, wanted, local, prompt, collapse_duplicates)))
+    for ticker, company_data in block:
+        yield ticker, company_data, prepared.get(ticker)